@@ -0,0 +1,80 @@
+"""Awaiting many commands from asyncio, against run_in_executor().
+
+Elevation is stubbed out: each command is `sleep`, run with elevate.aio's
+portable backend, which on Linux watches each process through a pidfd. The
+modes compared, running -n commands of --seconds each at once, are:
+
+    executor  loop.run_in_executor() with a pool of --workers threads,
+              each blocking in subprocess.call(), as an asyncio service
+              wrapping each elevation would; the pool caps concurrency
+    aio       asyncio.gather() over aio.spawn(), with no thread per command
+
+Each mode reports its wall time and the most threads alive at once.
+
+Usage: python benchmarks/aio.py [-n COMMANDS] [--seconds S] [--workers N]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import aio  # noqa: E402
+
+
+async def count_threads(samples):
+    while True:
+        samples.append(threading.active_count())
+        await asyncio.sleep(0.01)
+
+
+async def timed(coroutine):
+    """Await |coroutine|, returning how long it took and the most threads
+    that were alive meanwhile."""
+    samples = []
+    sampler = asyncio.ensure_future(count_threads(samples))
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    return elapsed, max(samples)
+
+
+async def with_executor(commands, workers):
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(workers) as pool:
+        return await asyncio.gather(*(
+            loop.run_in_executor(pool, subprocess.call, command)
+            for command in commands))
+
+
+async def with_aio(commands):
+    return await asyncio.gather(*(aio.spawn(command)
+                                  for command in commands))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--commands', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    print('backend: {}'.format(aio._spawn.__name__))
+    commands = [['sleep', str(args.seconds)]] * args.commands
+
+    for label, coroutine in (
+            ('executor', with_executor(commands, args.workers)),
+            ('aio', with_aio(commands))):
+        elapsed, threads = await timed(coroutine)
+        print('{:<8} {:8.2f} s for {} commands, {:3} threads at most'.format(
+            label, elapsed, len(commands), threads))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
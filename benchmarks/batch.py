@@ -0,0 +1,116 @@
+"""Running a list of commands as one batch, against one call per command.
+
+Elevation is stubbed out: a helper process stands in for the elevated
+helper, and runs commands with subprocess instead of CreateProcess(). Each
+command is a Python one-liner that sleeps for --command-ms and prints. The
+modes compared are:
+
+    calls    a new helper per command, as a script calling elevate once per
+             command does (less a UAC prompt per call)
+    -j N     one helper running the whole batch, N commands at a time
+
+Usage: python benchmarks/batch.py [-n COMMANDS] [--command-ms MS]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+
+from elevate import broker, protocol  # noqa: E402
+from elevate.environment import EnvironmentBlock, serialize  # noqa: E402
+
+BASELINE = EnvironmentBlock(serialize([('PATH', '/usr/bin')]))
+
+HELPER = '''
+import os, socket, subprocess, sys, time
+sys.path.insert(0, {root!r})
+from elevate import batch, broker, protocol
+from elevate.environment import EnvironmentBlock
+
+def run_command(argv):
+    process = subprocess.Popen(argv, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT)
+    output = process.stdout.read()
+    # wait4() stands in for GetProcessTimes() and GetProcessMemoryInfo().
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, output, protocol.Usage(
+        rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss * 1024)
+
+def run(channel, request, environment_block):
+    if request.batch is not None:
+        batch.run(channel, request.batch, run_command)
+        return
+    start = time.perf_counter()
+    exit_code, _, usage = run_command(request.command)
+    protocol.send_result(channel, protocol.Result(
+        0, exit_code, time.perf_counter() - start, b'', usage=usage))
+
+sock = socket.socket(fileno=int(sys.argv[1]))
+with protocol.Channel(sock.makefile('rwb', buffering=0)) as channel:
+    sock.close()
+    broker.handle(channel, [EnvironmentBlock(bytes.fromhex(sys.argv[2]))],
+                  run)
+'''
+
+
+def sleeper(seconds, text):
+    return [sys.executable, '-c',
+            'import time; time.sleep({}); print({!r})'.format(seconds, text)]
+
+
+def call_helper(command=None, commands=None, jobs=None):
+    """Start a helper, hand it one request, and return the results in the
+    order they arrived."""
+    parent, child = socket.socketpair()
+    helper = subprocess.Popen(
+        [sys.executable, '-c', HELPER.format(root=os.path.abspath(root)),
+         str(child.fileno()), bytes(BASELINE).hex()],
+        pass_fds=[child.fileno()])
+    child.close()
+    request = protocol.Request(
+        os.getpid(), 0, (0, 0, 0), command, 'fail', {},
+        None if commands is None else protocol.Batch(commands, jobs))
+    results = []
+    with protocol.Channel(parent.makefile('rwb', buffering=0)) as channel:
+        parent.close()
+        if not broker.submit(channel, request, BASELINE, BASELINE,
+                             results.append):
+            sys.exit('helper dropped the request')
+    helper.wait()
+    return results
+
+
+def report(label, elapsed, count):
+    print('{:<6} {:8.1f} ms total {:8.1f} ms/command'.format(
+        label, elapsed * 1e3, elapsed / count * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--commands', type=int, default=24)
+    parser.add_argument('--command-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    commands = [sleeper(args.command_ms / 1e3, 'command {}'.format(i))
+                for i in range(args.commands)]
+
+    start = time.perf_counter()
+    for command in commands:
+        call_helper(command=command)
+    report('calls', time.perf_counter() - start, len(commands))
+
+    for jobs in (1, 4, 8):
+        start = time.perf_counter()
+        call_helper(commands=commands, jobs=jobs)
+        elapsed = time.perf_counter() - start
+        report('-j {}'.format(jobs), elapsed, len(commands))
+
+
+if __name__ == '__main__':
+    main()
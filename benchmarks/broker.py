@@ -0,0 +1,197 @@
+"""Serving elevate calls from a resident broker, with elevation stubbed out.
+
+A Broker runs in this process on a SocketListener, with a handler that
+stands in for running each request. Reports:
+
+    fresh    a new helper process per call, connecting back and taking one
+             request, as every call did before (less the UAC prompt,
+             which usually costs far more)
+    broker   one call at a time handed to the broker
+    N x M    N clients at once, each making M calls, against a broker
+             whose commands take --command-ms, showing the worker pool
+
+and how long after the last call the broker exits, once it has been idle
+for --idle seconds.
+
+Usage: python benchmarks/broker.py [-r ROUNDS] [-c CLIENTS] [-w WORKERS]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+
+from elevate import broker, protocol  # noqa: E402
+from elevate.environment import EnvironmentBlock, serialize  # noqa: E402
+
+BASELINE = EnvironmentBlock(serialize(
+    [('PATH', 'C:\\Windows\\system32'), ('TEMP', 'C:\\Temp')]))
+CLIENT_ENVIRONMENT = EnvironmentBlock(serialize(
+    [('PATH', 'C:\\venv\\Scripts;C:\\Windows\\system32'),
+     ('PROMPT', '$P$G'), ('TEMP', 'C:\\Temp')]))
+
+# A fresh helper: connect, authenticate, serve one request, exit.
+FRESH_HELPER = '''
+import socket, sys
+sys.path.insert(0, {root!r})
+from elevate import broker, protocol
+from elevate.environment import EnvironmentBlock
+sock = socket.socket(socket.AF_UNIX)
+sock.connect(sys.argv[1])
+with protocol.Channel(sock.makefile('rwb', buffering=0)) as channel:
+    protocol.greet(channel, bytes.fromhex(sys.argv[2]))
+    broker.handle(channel, [EnvironmentBlock(bytes.fromhex(sys.argv[3]))],
+                  lambda channel, request, block: None)
+'''
+
+
+def request(client, call):
+    return protocol.Request(1000 + client, call, (0, 0, 0),
+                            ['C:\\Windows\\system32\\cmd.exe', '/c',
+                             'echo {} {}'.format(client, call)],
+                            'fail', {'CLIENT': str(client)})
+
+
+def _socket_stream(sock):
+    stream = sock.makefile('rwb', buffering=0)
+    # The stream keeps the connection open until it is closed too.
+    sock.close()
+    return stream
+
+
+class SocketListener:
+
+    """A broker.Broker listener on a Unix domain socket at |path|."""
+
+    def __init__(self, path):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX)
+        self._socket.bind(path)
+        self._socket.listen()
+
+    def accept(self):
+        connection, _ = self._socket.accept()
+        return protocol.Channel(_socket_stream(connection))
+
+    def wake(self):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.path)
+
+    def close(self):
+        self._socket.close()
+        os.remove(self.path)
+
+
+def connect_socket(path):
+    """Connect to a SocketListener, or return None if nothing listens at
+    |path|."""
+    sock = socket.socket(socket.AF_UNIX)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return protocol.Channel(_socket_stream(sock))
+
+
+def report(label, elapsed, calls):
+    print('{:<9} {:10.1f} us/call {:10.0f} calls/s'.format(
+        label, elapsed / calls * 1e6, calls / elapsed))
+
+
+def run_fresh(directory, rounds):
+    path = os.path.join(directory, 'fresh')
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(path)
+    listener.listen()
+    code = FRESH_HELPER.format(root=os.path.abspath(root))
+    start = time.perf_counter()
+    for call in range(rounds):
+        token = os.urandom(protocol.TOKEN_SIZE)
+        helper = subprocess.Popen([sys.executable, '-c', code, path,
+                                   token.hex(), bytes(BASELINE).hex()])
+        connection, _ = listener.accept()
+        with protocol.Channel(connection.makefile('rwb', buffering=0)) as \
+                channel:
+            connection.close()
+            protocol.welcome(channel, token)
+            if not broker.submit(channel, request(0, call),
+                                 CLIENT_ENVIRONMENT, BASELINE):
+                sys.exit('fresh: helper dropped the request')
+        helper.wait()
+    report('fresh', time.perf_counter() - start, rounds)
+    listener.close()
+
+
+def call_broker(path, client, calls):
+    for call in range(calls):
+        channel = connect_socket(path)
+        if channel is None:
+            sys.exit('no broker listening')
+        with channel:
+            if not broker.submit(channel, request(client, call),
+                                 CLIENT_ENVIRONMENT, BASELINE):
+                sys.exit('broker dropped a request')
+
+
+def run_broker(directory, args):
+    path = os.path.join(directory, 'broker')
+    command_seconds = 0
+
+    def run(channel, request, environment_block):
+        time.sleep(command_seconds)
+
+    service = broker.Broker(
+        SocketListener(path),
+        lambda channel: broker.handle(channel, [BASELINE], run),
+        idle_timeout=args.idle, workers=args.workers)
+    thread = threading.Thread(target=service.serve)
+    thread.start()
+
+    start = time.perf_counter()
+    call_broker(path, 0, args.rounds)
+    report('broker', time.perf_counter() - start, args.rounds)
+
+    command_seconds = args.command_ms / 1e3
+    for clients in (1, args.clients):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=call_broker,
+                                    args=(path, client, args.calls))
+                   for client in range(clients)]
+        for client in threads:
+            client.start()
+        for client in threads:
+            client.join()
+        report('{} x {}'.format(clients, args.calls),
+               time.perf_counter() - start, clients * args.calls)
+
+    idle_start = time.perf_counter()
+    thread.join()
+    print('exited after {:.2f} s idle'.format(
+        time.perf_counter() - idle_start))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--rounds', type=int, default=50)
+    parser.add_argument('-c', '--clients', type=int, default=8)
+    parser.add_argument('-m', '--calls', type=int, default=10)
+    parser.add_argument('-w', '--workers', type=int,
+                        default=broker.DEFAULT_WORKERS)
+    parser.add_argument('--command-ms', type=float, default=20)
+    parser.add_argument('--idle', type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        run_fresh(directory, args.rounds)
+        run_broker(directory, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Encoding speed and length of argv_to_command_line(), against the previous
+always-quote implementation, over a large argv of file paths.
+
+Usage: python benchmarks/command_line.py [-n ARGS]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate.command_line import (  # noqa: E402
+    argv_to_command_line, command_line_to_argv)
+
+
+def previous_argv_to_command_line(args):
+    def escape_arg(arg):
+        arg = re.sub(r'(\\*)"', r'\1\1\"', arg)
+        arg = re.sub(r'(\\+)$', r'\1\1', arg)
+        return "".join(('"', arg, '"'))
+
+    return ' '.join(escape_arg(arg) for arg in args)
+
+
+def file_argv(count):
+    return ['C:\\Python\\python.exe', '-m', 'tool'] + [
+        'C:\\src\\project\\module{0}\\file {0}.cpp'.format(i)
+        if i % 10 == 0 else
+        'C:\\src\\project\\module{0}\\file{0}.cpp'.format(i)
+        for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--args', type=int, default=5000)
+    args = parser.parse_args()
+
+    argv = file_argv(args.args)
+    for label, encode in (('previous', previous_argv_to_command_line),
+                          ('current', argv_to_command_line)):
+        seconds = min(timeit.repeat(lambda: encode(argv), number=20,
+                                    repeat=5)) / 20
+        print('{:<9} encode {:8.2f} ms  {:8d} chars'.format(
+            label, seconds * 1e3, len(encode(argv))))
+
+    command_line = argv_to_command_line(argv)
+    seconds = min(timeit.repeat(lambda: command_line_to_argv(command_line),
+                                number=20, repeat=5)) / 20
+    print('{:<9} decode {:8.2f} ms'.format('current', seconds * 1e3))
+
+
+if __name__ == '__main__':
+    main()
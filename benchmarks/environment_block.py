@@ -0,0 +1,82 @@
+"""Sizing and looking up variables in a large environment block.
+
+Builds a synthetic UTF-16 block with many variables and a long PATH, then
+times:
+
+    walk    the previous sizing loop, one wcslen() call per variable
+            (needs Windows, where wchar_t is UTF-16)
+    scan    EnvironmentBlock.from_address(), one scan for the terminator
+    decode  decoding the whole block into a dict, for comparison
+    index   the first lookup in an EnvironmentBlock, which indexes names
+    lookup  later lookups
+
+Usage: python benchmarks/environment_block.py [-n VARIABLES]
+"""
+import argparse
+import ctypes
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate.environment import EnvironmentBlock, serialize  # noqa: E402
+
+
+def previous_length_of_environment_block(address):
+    from elevate import libc
+    n = 0
+    while True:
+        current_length = libc.wcslen(ctypes.c_wchar_p(address + n))
+        n += (current_length + 1) * ctypes.sizeof(ctypes.c_wchar)
+        if current_length == 0:
+            break
+    return n
+
+
+def large_block(count):
+    items = [('PATH', ';'.join('C:\\Tools\\tool{}\\bin'.format(i)
+                               for i in range(400)))]
+    items += [('VARIABLE_{}'.format(i), 'value {}'.format(i) * 10)
+              for i in range(count)]
+    return serialize(items)
+
+
+def report(label, seconds, number):
+    print('{:<7} {:10.2f} us'.format(label, seconds / number * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--variables', type=int, default=500)
+    args = parser.parse_args()
+
+    data = large_block(args.variables)
+    buffer = ctypes.create_string_buffer(data)
+    address = ctypes.addressof(buffer)
+    print('block: {} variables, {} bytes'.format(args.variables + 1,
+                                                 len(data)))
+
+    def best(fn, number):
+        return min(timeit.repeat(fn, number=number, repeat=5))
+
+    if sys.platform == 'win32':
+        report('walk', best(
+            lambda: previous_length_of_environment_block(address), 20), 20)
+    else:
+        print('walk    skipped (needs Windows)')
+    report('scan', best(lambda: EnvironmentBlock.from_address(address),
+                        200), 200)
+    report('decode', best(
+        lambda: dict(entry.split('=', 1) for entry in
+                     data.decode('utf-16-le').split('\0') if entry), 200),
+        200)
+    report('index', best(
+        lambda: EnvironmentBlock.from_address(address)['path'], 200), 200)
+    block = EnvironmentBlock.from_address(address)
+    block['path']
+    report('lookup', best(lambda: block['variable_7'], 100000), 100000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Sending an environment block to another process: whole, or as a delta.
+
+A child process plays the helper. It runs protocol.receive_environment()
+against a baseline that either matches the one the parent used (so a
+delta is enough) or doesn't (so it has to ask for the whole block). For
+each case, reports the bytes sent and the time per transfer. The original
+protocol, pickling the whole block over a multiprocessing connection, is
+shown for comparison.
+
+Usage: python benchmarks/environment_transfer.py [-n VARIABLES] [-r ROUNDS]
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import environment, protocol  # noqa: E402
+from elevate.environment import EnvironmentBlock, serialize  # noqa: E402
+
+
+class CountingStream:
+
+    """Counts the bytes written to a binary stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.written = 0
+
+    def write(self, data):
+        written = self.stream.write(data)
+        self.written += written
+        return written
+
+    def readinto(self, buffer):
+        return self.stream.readinto(buffer)
+
+    def close(self):
+        self.stream.close()
+
+
+def pickle_helper(connection):
+    while True:
+        data = connection.recv()
+        if data is None:
+            return
+        block = environment.build(EnvironmentBlock(data['environment_block']))
+        connection.send(block.digest())
+
+
+def protocol_helper(sock, parent_sock, baseline_data):
+    # Our copy of the parent's end would stop us from seeing it close.
+    parent_sock.close()
+    baseline = EnvironmentBlock(baseline_data)
+    with protocol.Channel(sock.makefile('rwb', buffering=0)) as channel:
+        while True:
+            try:
+                block = protocol.receive_environment(channel, [baseline])
+            except protocol.ProtocolError:
+                return
+            channel.send(protocol.KIND_ENVIRONMENT_REPLY, block.digest())
+
+
+def blocks(count):
+    base = [('PATH', ';'.join('C:\\Tools\\tool{}\\bin'.format(i)
+                              for i in range(400)))]
+    base += [('VARIABLE_{}'.format(i), 'value {}'.format(i) * 10)
+             for i in range(count)]
+    # What a shell typically adds on top of the user's default environment.
+    client = [('=C:', 'C:\\src\\project'), ('PROMPT', '$P$G')] + base
+    client[2] = ('PATH', 'C:\\venv\\Scripts;' + base[0][1])
+    return (EnvironmentBlock(serialize(sorted(base))),
+            EnvironmentBlock(serialize(sorted(client))))
+
+
+def report(label, sent, elapsed, rounds):
+    print('{:<9} {:8d} bytes {:10.1f} us'.format(
+        label, sent // rounds, elapsed / rounds * 1e6))
+
+
+def run_pickle(block, rounds):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=pickle_helper, args=(child,))
+    process.start()
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        message = {'environment_block': bytes(block)}
+        sent += len(pickle.dumps(message))
+        parent.send(message)
+        parent.recv()
+    elapsed = time.perf_counter() - start
+    parent.send(None)
+    process.join()
+    report('previous', sent, elapsed, rounds)
+
+
+def run_protocol(label, helper_baseline, block, baseline, rounds):
+    parent, child = socket.socketpair()
+    process = multiprocessing.Process(
+        target=protocol_helper,
+        args=(child, parent, bytes(helper_baseline)))
+    process.start()
+    child.close()
+    stream = CountingStream(parent.makefile('rwb', buffering=0))
+    with protocol.Channel(stream) as channel:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            protocol.send_environment(channel, block, baseline)
+            channel.receive(protocol.KIND_ENVIRONMENT_REPLY)
+        elapsed = time.perf_counter() - start
+    parent.close()
+    process.join()
+    report(label, stream.written, elapsed, rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--variables', type=int, default=500)
+    parser.add_argument('-r', '--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    baseline, block = blocks(args.variables)
+    other = EnvironmentBlock(serialize([('OTHER', '1')]))
+    print('block: {} bytes'.format(len(block.buffer)))
+    run_pickle(block, args.rounds)
+    run_protocol('delta', baseline, block, baseline, args.rounds)
+    run_protocol('fallback', other, block, baseline, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
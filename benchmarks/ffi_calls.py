@@ -0,0 +1,77 @@
+"""Per-call overhead of ctypes_utils bindings, in isolation.
+
+Calls strlen() and wcslen() through CFunc() bindings against 'msvcrt' (which
+is mapped to the C library when not on Windows) in each of the ways the
+binding layer offers, plus a bare ctypes function as a baseline:
+
+    ctypes      plain ctypes function with argtypes, no errcheck
+    paramflags  CFunc binding with named descriptors, no errcheck
+    unsigned    CFunc binding with the default predicate and a size_t result,
+                which gets no errcheck because the check can't fail
+    errcheck    CFunc binding with an ssize_t result and the default errcheck
+    raw         .raw variant of the unsigned binding (no paramflags)
+    raw+check   .raw variant of the errcheck binding
+
+Usage: python benchmarks/ffi_calls.py [-n CALLS] [--lazy]
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import sys
+import timeit
+from ctypes import c_char_p, c_size_t, c_ssize_t, c_wchar_p
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import ctypes_utils  # noqa: E402
+from elevate.ctypes_utils import CFunc  # noqa: E402
+
+if sys.platform != 'win32':
+    ctypes_utils.library_overrides['msvcrt'] = ctypes.util.find_library('c')
+
+FUNCTIONS = (
+    ('strlen', c_char_p, b'x' * 64),
+    ('wcslen', c_wchar_p, 'x' * 64),
+)
+
+
+def variants(function_name, arg_type, lazy):
+    library = ctypes_utils._load_library(ctypes.cdll, 'msvcrt')
+    plain = getattr(library, function_name)
+    plain.restype, plain.argtypes = c_size_t, (arg_type,)
+    yield 'ctypes', plain
+
+    yield 'paramflags', CFunc(function_name, 'msvcrt', c_size_t,
+                              [('s', arg_type)], success_predicate=None,
+                              lazy=lazy)
+
+    unsigned = CFunc(function_name, 'msvcrt', c_size_t, [('s', arg_type)],
+                     lazy=lazy)
+    yield 'unsigned', unsigned
+
+    checked = CFunc(function_name, 'msvcrt', c_ssize_t, [('s', arg_type)],
+                    lazy=lazy)
+    yield 'errcheck', checked
+    yield 'raw', unsigned.raw
+    yield 'raw+check', checked.raw
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--calls', type=int, default=200000)
+    parser.add_argument('--lazy', action='store_true',
+                        help='call through unresolved lazy proxies')
+    args = parser.parse_args()
+
+    for function_name, arg_type, argument in FUNCTIONS:
+        print(function_name)
+        for label, function in variants(function_name, arg_type, args.lazy):
+            seconds = min(timeit.repeat(lambda: function(argument),
+                                        number=args.calls, repeat=5))
+            print('  {:<12} {:7.0f} ns/call'.format(
+                label, seconds / args.calls * 1e9))
+
+
+if __name__ == '__main__':
+    main()
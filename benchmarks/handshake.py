@@ -0,0 +1,102 @@
+"""Connection setup latency of the helper channel.
+
+A child process plays the helper over a socket pair. Each round, it
+authenticates and then reads a small request, and the time from the
+parent starting the round to the helper holding the authenticated
+request is reported. The two handshakes compared are:
+
+    hmac    multiprocessing.connection's challenge/response in both
+            directions, as the helper used before
+    token   protocol.greet()/welcome() with a one-time token, a single
+            round trip
+
+Usage: python benchmarks/handshake.py [-r ROUNDS]
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from multiprocessing.connection import (Connection, answer_challenge,
+                                        deliver_challenge)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import protocol  # noqa: E402
+
+REQUEST = protocol.Request(1234, 0, (0, 0, 0), ['C:\\Windows\\notepad.exe'],
+                           'fail', {})
+
+
+def hmac_helper(sock, parent_sock, key, rounds):
+    parent_sock.close()
+    connection = Connection(sock.detach())
+    for _ in range(rounds):
+        answer_challenge(connection, key)
+        deliver_challenge(connection, key)
+        connection.recv()
+        connection.send_bytes(b'done')
+
+
+def token_helper(sock, parent_sock, token, rounds):
+    parent_sock.close()
+    with protocol.Channel(sock.makefile('rwb', buffering=0)) as channel:
+        for _ in range(rounds):
+            protocol.greet(channel, token)
+            protocol.receive_request(channel)
+            channel.send(protocol.KIND_ENVIRONMENT_REPLY)
+
+
+def hmac_client(parent, key):
+    connection = Connection(parent.detach())
+
+    def round_trip():
+        deliver_challenge(connection, key)
+        answer_challenge(connection, key)
+        connection.send({'command': REQUEST.command})
+        connection.recv_bytes()
+    return round_trip
+
+
+def token_client(parent, token):
+    channel = protocol.Channel(parent.makefile('rwb', buffering=0))
+
+    def round_trip():
+        protocol.welcome(channel, token)
+        protocol.send_request(channel, REQUEST)
+        channel.receive(protocol.KIND_ENVIRONMENT_REPLY)
+    return round_trip
+
+
+def run(label, helper, client, rounds):
+    secret = os.urandom(protocol.TOKEN_SIZE)
+    parent, child = socket.socketpair()
+    process = multiprocessing.Process(
+        target=helper, args=(child, parent, secret, rounds))
+    process.start()
+    child.close()
+    round_trip = client(parent, secret)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        round_trip()
+        timings.append(time.perf_counter() - start)
+    process.join()
+    timings.sort()
+    print('{:<6} median {:7.1f} us  p90 {:7.1f} us'.format(
+        label, timings[len(timings) // 2] * 1e6,
+        timings[len(timings) * 9 // 10] * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    run('hmac', hmac_helper, hmac_client, args.rounds)
+    run('token', token_helper, token_client, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Cold import time of elevate modules, measured in fresh interpreters.
+
+Each module is imported twice per run: once as shipped, and once with
+elevate._winerror replaced by the old executed module (tools/winerror.py),
+so the difference is the cost the lazy table saves on every launch.
+
+Usage: python benchmarks/import_time.py [-n RUNS] [module ...]
+
+elevate.win32 and elevate.elevate can only be imported on Windows; elsewhere
+they are skipped.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+here = os.path.abspath(os.path.dirname(__file__))
+root = os.path.join(here, os.pardir)
+
+_CHILD = r'''
+import importlib, importlib.util, sys, time
+module, legacy = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if legacy:
+    import elevate
+    spec = importlib.util.spec_from_file_location('elevate._winerror', legacy)
+    sys.modules[spec.name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules[spec.name])
+importlib.import_module(module)
+print(time.perf_counter() - start)
+'''
+
+DEFAULT_MODULES = ('elevate._winerror', 'elevate.win32', 'elevate.elevate')
+
+
+def time_import(module, legacy_winerror=''):
+    output = subprocess.check_output(
+        [sys.executable, '-c', _CHILD, module, legacy_winerror], cwd=root,
+        stderr=subprocess.DEVNULL)
+    return float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=20)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    legacy = os.path.join(root, 'tools', 'winerror.py')
+    for module in args.modules:
+        if module != 'elevate._winerror' and sys.platform != 'win32':
+            print('{:<20} skipped (needs Windows)'.format(module))
+            continue
+
+        after = statistics.median(
+            time_import(module) for _ in range(args.runs))
+        before = statistics.median(
+            time_import(module, legacy) for _ in range(args.runs))
+        print('{:<20} {:8.2f} ms -> {:8.2f} ms'.format(
+            module, before * 1e3, after * 1e3))
+
+
+if __name__ == '__main__':
+    main()
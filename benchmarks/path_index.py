@@ -0,0 +1,117 @@
+"""Resolving commands with a PathIndex, against shutil.which().
+
+Builds a synthetic PATH of --dirs directories of --files files each, in a
+temporary directory, then times looking up a command in the last directory
+and a command that's nowhere:
+
+    which   shutil.which()
+    cold    PathIndex.which() on a new index, which lists every directory
+    warm    PathIndex.which() on an index loaded from its cache file, as a
+            later elevate run does
+
+It does so twice: as on Linux, where each directory has one candidate name,
+and with the default PATHEXT, as on Windows, where each has eight. For the
+latter, `which` is shutil.which()'s Windows search, run here.
+
+Usage: python benchmarks/path_index.py [--dirs N] [--files N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import path_index  # noqa: E402
+
+# Older than path_index's window for directories that just changed.
+OLD = 1_000_000_000
+
+PATHEXT = path_index._DEFAULT_PATHEXT.split(';')
+
+
+def windows_which(cmd, path, pathext=PATHEXT):
+    """shutil.which()'s search on Windows, less the current directory."""
+    mode = os.F_OK | os.X_OK
+    if os.path.dirname(cmd):
+        return cmd if path_index._access_check(cmd, mode) else None
+    if any(cmd.lower().endswith(ext.lower()) for ext in pathext):
+        files = [cmd]
+    else:
+        files = [cmd + ext for ext in pathext]
+    seen = set()
+    for directory in path.split(os.pathsep):
+        if directory not in seen:
+            seen.add(directory)
+            for thefile in files:
+                name = os.path.join(directory, thefile)
+                if path_index._access_check(name, mode):
+                    return name
+    return None
+
+
+def make_file(path, executable):
+    with open(path, 'w'):
+        pass
+    os.chmod(path, 0o755 if executable else 0o644)
+
+
+def settle(directories):
+    """Backdate |directories|' mtimes, as if they hadn't changed lately."""
+    for directory in directories:
+        os.utime(directory, (OLD, OLD))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dirs', type=int, default=64)
+    parser.add_argument('--files', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        directories = []
+        for i in range(args.dirs):
+            directory = os.path.join(root, 'dir{}'.format(i))
+            os.mkdir(directory)
+            directories.append(directory)
+            for j in range(args.files):
+                # A quarter of the files look executable to Windows.
+                name = 'file{}-{}{}'.format(i, j, '.EXE' if j % 4 else '')
+                make_file(os.path.join(directory, name),
+                          executable=j % 2 == 0)
+        settle(directories)
+        path = os.pathsep.join(directories)
+        last = 'file{}-0'.format(args.dirs - 1)
+
+        print('{} directories of {} files'.format(args.dirs, args.files))
+        for label, pathext, which in (
+                ('Linux', None, shutil.which),
+                ('PATHEXT', PATHEXT, windows_which)):
+            cache_path = os.path.join(root, '{}.json'.format(label))
+            index = path_index.PathIndex(pathext=pathext)
+            index.which('missing', path=path)
+            index.save(cache_path)
+
+            def cold(name):
+                return path_index.PathIndex(pathext=pathext).which(
+                    name, path=path)
+
+            def warm(name):
+                return path_index.PathIndex.load(
+                    cache_path, path, pathext).which(name, path=path)
+
+            for mode, function in (
+                    ('which', lambda name: which(name, path=path)),
+                    ('cold', cold), ('warm', warm)):
+                for name in (last, 'missing'):
+                    count, elapsed = timeit.Timer(
+                        lambda: function(name)).autorange()
+                    print('{:<8} {:<6} {:<8} {:10.1f} us'.format(
+                        label, mode, 'found' if name == last else 'missing',
+                        elapsed / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Running a machine-setup plan as a graph of steps, against serially.
+
+Elevation is stubbed out as in benchmarks/batch.py: a helper process runs
+the steps with subprocess. The plan is shaped like a typical setup: a few
+downloads, each followed by its install, then configuration steps that
+need several installs. Each step is a Python one-liner that sleeps for its
+cost. The modes compared are:
+
+    serial   the steps one at a time in dependency order, as a script
+             calling elevate once per step would run them, but in one
+             helper
+    plan     the plan's own scheduling, every ready step at once
+
+Usage: python benchmarks/plan.py [--scale SECONDS]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+
+from elevate import batch, broker, plan, protocol  # noqa: E402
+from elevate.environment import EnvironmentBlock, serialize  # noqa: E402
+
+BASELINE = EnvironmentBlock(serialize([('PATH', '/usr/bin')]))
+
+HELPER = '''
+import socket, subprocess, sys
+sys.path.insert(0, {root!r})
+from elevate import batch, broker, protocol
+from elevate.environment import EnvironmentBlock
+
+def run_command(argv):
+    process = subprocess.run(argv, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+    return process.returncode, process.stdout, None
+
+sock = socket.socket(fileno=int(sys.argv[1]))
+with protocol.Channel(sock.makefile('rwb', buffering=0)) as channel:
+    sock.close()
+    broker.handle(channel, [EnvironmentBlock(bytes.fromhex(sys.argv[2]))],
+                  lambda channel, request, block: batch.run(
+                      channel, request.batch, run_command))
+'''
+
+# name: (cost in units of --scale, steps it comes after)
+SETUP = {
+    'fetch-python': (3, []),
+    'fetch-git': (2, []),
+    'fetch-vs': (6, []),
+    'install-python': (4, ['fetch-python']),
+    'install-git': (2, ['fetch-git']),
+    'install-vs': (8, ['fetch-vs']),
+    'pip-packages': (3, ['install-python']),
+    'clone-repos': (3, ['install-git']),
+    'configure': (1, ['pip-packages', 'clone-repos', 'install-vs']),
+}
+
+
+def step(seconds):
+    return [sys.executable, '-c',
+            'import time; time.sleep({})'.format(seconds)]
+
+
+def make_plan(spec, scale):
+    return plan.parse({'steps': {
+        name: {'command': step(cost * scale), 'after': after}
+        for name, (cost, after) in spec.items()}})
+
+
+def run(steps, jobs, dependencies):
+    parent, child = socket.socketpair()
+    helper = subprocess.Popen(
+        [sys.executable, '-c', HELPER.format(root=os.path.abspath(root)),
+         str(child.fileno()), bytes(BASELINE).hex()],
+        pass_fds=[child.fileno()])
+    child.close()
+    request = protocol.Request(
+        os.getpid(), 0, (0, 0, 0), None, 'fail', {},
+        protocol.Batch(steps.commands, jobs, dependencies))
+    results = []
+    with protocol.Channel(parent.makefile('rwb', buffering=0)) as channel:
+        parent.close()
+        if not broker.submit(channel, request, BASELINE, BASELINE,
+                             results.append):
+            sys.exit('helper dropped the request')
+    helper.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=0.05,
+                        help='seconds per unit of step cost')
+    args = parser.parse_args()
+
+    steps = make_plan(SETUP, args.scale)
+
+    # Serially: one step at a time, in an order that respects the
+    # dependencies.
+    order = batch.topological_order(steps.dependencies)
+    serial = steps._replace(commands=[steps.commands[i] for i in order])
+    start = time.perf_counter()
+    run(serial, 1, None)
+    print('serial {:8.2f} s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    results = run(steps, steps.jobs, steps.dependencies)
+    elapsed = time.perf_counter() - start
+    print('plan   {:8.2f} s'.format(elapsed))
+    print(plan.summary(steps, results, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Allocations and time per call for OUTPUT_PARAM bindings, called normally
+and through .pooled.
+
+Allocations are measured with tracemalloc while every result is kept alive,
+so each fresh output object a call creates shows up as retained memory.
+
+Usage: python benchmarks/pooled_calls.py [-n CALLS]
+
+Needs Windows.
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import win32  # noqa: E402
+
+
+def cases():
+    process = win32.GetCurrentProcess()
+
+    yield ('GetProcessTimes',
+           lambda: win32.GetProcessTimes(process),
+           lambda: win32.GetProcessTimes.pooled(process))
+    yield ('GetModuleHandleEx',
+           lambda: win32.GetModuleHandleEx(
+               win32.GET_MODULE_HANDLE_EX_FLAG_UNCHANGED_REFCOUNT, None),
+           lambda: win32.GetModuleHandleEx.pooled(
+               win32.GET_MODULE_HANDLE_EX_FLAG_UNCHANGED_REFCOUNT, None))
+
+
+def allocated_per_call(fn, calls):
+    fn()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        results = [fn() for _ in range(calls)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Don't count the list holding the results.
+    return (after - before - len(results) * 8) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--calls', type=int, default=10000)
+    args = parser.parse_args()
+
+    for name, call, pooled_call in cases():
+        print(name)
+        for label, fn in (('normal', call), ('pooled', pooled_call)):
+            seconds = min(timeit.repeat(fn, number=args.calls, repeat=5))
+            print('  {:<8} {:7.0f} ns/call {:8.1f} bytes/call'.format(
+                label, seconds / args.calls * 1e9,
+                allocated_per_call(fn, args.calls)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Encoding and decoding helper messages, and the cost of importing the
+channel code.
+
+Times a request carrying a large argv, followed by a whole environment
+block, through protocol.Channel (over an in-memory stream), against
+pickling and unpickling the same data as one dict, which is what the
+multiprocessing connection did. Then measures, in fresh interpreters, how
+long importing elevate.protocol takes compared with
+multiprocessing.connection.
+
+Usage: python benchmarks/protocol.py [-n ARGS] [-r RUNS]
+"""
+import argparse
+import io
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import timeit
+
+here = os.path.abspath(os.path.dirname(__file__))
+root = os.path.join(here, os.pardir)
+sys.path.insert(0, root)
+
+from elevate import protocol  # noqa: E402
+from elevate.environment import EnvironmentBlock, serialize  # noqa: E402
+
+# The helper needs elevate.environment (and so ctypes) either way, so it's
+# imported first and only the rest is timed.
+_CHILD = r'''
+import importlib, sys, time
+import elevate.environment
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(time.perf_counter() - start)
+'''
+
+
+def message(args):
+    request = protocol.Request(
+        process_id=1234, process_start_time=132000000000000000,
+        std_handles=(0x10, 0x14, 0x18),
+        command=['C:\\Python\\python.exe'] + [
+            'C:\\src\\project\\file{}.cpp'.format(i) for i in range(args)],
+        spill='fail', environment_overrides={'FOO': '1', 'BAR': None})
+    block = EnvironmentBlock(serialize(
+        [('PATH', ';'.join('C:\\Tools\\tool{}\\bin'.format(i)
+                           for i in range(400)))] +
+        [('VARIABLE_{}'.format(i), 'value {}'.format(i) * 10)
+         for i in range(500)]))
+    return request, block
+
+
+def framed(request, block):
+    stream = io.BytesIO()
+    channel = protocol.Channel(stream)
+    protocol.send_request(channel, request)
+    channel.send(protocol.KIND_ENVIRONMENT, sections=[
+        (protocol.SECTION_ENVIRONMENT, block.buffer)])
+    stream.seek(0)
+    received = protocol.receive_request(channel)
+    frame = channel.receive(protocol.KIND_ENVIRONMENT)
+    return received, EnvironmentBlock(
+        frame.sections[protocol.SECTION_ENVIRONMENT]), stream.tell()
+
+
+def pickled(request, block):
+    data = pickle.dumps({
+        'process_id': request.process_id,
+        'process_start_time': request.process_start_time,
+        'environment_block': bytes(block),
+        'environment_overrides': request.environment_overrides,
+        'std_handles': request.std_handles,
+        'command': request.command,
+        'spill': request.spill,
+    }, pickle.HIGHEST_PROTOCOL)
+    return pickle.loads(data), len(data)
+
+
+def time_import(module):
+    output = subprocess.check_output(
+        [sys.executable, '-c', _CHILD, module], cwd=root)
+    return float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--args', type=int, default=5000)
+    parser.add_argument('-r', '--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    request, block = message(args.args)
+    _, _, size = framed(request, block)
+
+    for label, fn, size in (
+            ('pickle', lambda: pickled(request, block), pickled(request,
+                                                               block)[1]),
+            ('framed', lambda: framed(request, block), size)):
+        seconds = min(timeit.repeat(fn, number=50, repeat=5)) / 50
+        print('{:<8} {:8.1f} us {:8d} bytes'.format(label, seconds * 1e6,
+                                                    size))
+
+    for module in ('multiprocessing.connection', 'elevate.protocol'):
+        seconds = statistics.median(
+            time_import(module) for _ in range(args.runs))
+        print('import {:<28} {:6.2f} ms'.format(module, seconds * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Per-call cost of Win32Func bindings versus their .raw variants.
+
+Usage: python benchmarks/raw_calls.py [-n CALLS]
+
+Needs Windows.
+"""
+import argparse
+import ctypes
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import win32  # noqa: E402
+
+
+def cases():
+    message = win32.MSG()
+    message_ptr = ctypes.byref(message)
+    stdout = win32.STD_OUTPUT_HANDLE
+
+    yield ('GetCurrentProcessId',
+           lambda: win32.GetCurrentProcessId(),
+           lambda: win32.GetCurrentProcessId.raw())
+    yield ('GetStdHandle',
+           lambda: win32.GetStdHandle(stdout),
+           lambda: win32.GetStdHandle.raw(stdout))
+    yield ('PeekMessage',
+           lambda: win32.PeekMessage(message_ptr,
+                                     remove_msg=win32.PM_NOREMOVE),
+           lambda: win32.PeekMessage.raw(message_ptr, None, 0, 0,
+                                         win32.PM_NOREMOVE))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, call, raw_call in cases():
+        timings = [min(timeit.repeat(fn, number=args.calls, repeat=5))
+                   / args.calls for fn in (call, raw_call)]
+        print('{:<20} {:7.0f} ns -> {:7.0f} ns (raw)'.format(
+            name, *(t * 1e9 for t in timings)))
+
+
+if __name__ == '__main__':
+    main()
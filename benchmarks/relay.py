@@ -0,0 +1,186 @@
+"""Throughput of relaying a command's std streams over the helper channel.
+
+Windows is stubbed out: a helper process stands in for the elevated helper
+and runs a relay.HelperRelay over a socketpair, and a fake command of three
+threads stands in for the command, writing --stdout-mib and --stderr-mib to
+its os.pipe() stdout and stderr and reading everything from its stdin. This
+process is the client, with a relay.ClientRelay whose stdin, stdout and
+stderr are os.pipe()s too, fed with --stdin-mib and drained by threads.
+
+Each run reports what every stream moved and the aggregate MB/s through the
+channel, for each --buffer-kib (pipes are enlarged to match, where the
+kernel allows).
+
+Usage: python benchmarks/relay.py [--stdout-mib N] [--stderr-mib N]
+                                  [--stdin-mib N] [--buffer-kib KIB ...]
+"""
+import argparse
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+
+from elevate import protocol, relay  # noqa: E402
+
+MIB = 1 << 20
+
+# Not a multiple of any buffer size.
+BLOCK = bytes(MIB + 7)
+
+
+def pipe(size):
+    read_fd, write_fd = os.pipe()
+    try:
+        fcntl.fcntl(write_fd, fcntl.F_SETPIPE_SZ, size)
+    except (AttributeError, OSError):
+        pass
+    return read_fd, write_fd
+
+
+def produce(fd, size, results):
+    view = memoryview(BLOCK)
+    with open(fd, 'wb', buffering=0) as f:
+        remaining = size
+        while remaining:
+            chunk = view[:min(remaining, len(view))]
+            while chunk:
+                written = f.write(chunk)
+                chunk = chunk[written:]
+                remaining -= written
+    results.append(size)
+
+
+def consume(fd, results):
+    count = 0
+    view = memoryview(bytearray(MIB))
+    with open(fd, 'rb', buffering=0) as f:
+        while True:
+            length = f.readinto(view)
+            if not length:
+                break
+            count += length
+    results.append(count)
+
+
+def helper(fd, buffer_size, stdout_size, stderr_size):
+    """The helper's end: runs the fake command with its streams relayed
+    over the socket |fd|, then prints what each stream moved as JSON."""
+    sock = socket.socket(fileno=fd)
+    stdin_read, stdin_write = pipe(buffer_size)
+    stdout_read, stdout_write = pipe(buffer_size)
+    stderr_read, stderr_write = pipe(buffer_size)
+    produced_stdout, produced_stderr, consumed_stdin = [], [], []
+    command = [
+        threading.Thread(target=produce, args=(stdout_write, stdout_size,
+                                               produced_stdout)),
+        threading.Thread(target=produce, args=(stderr_write, stderr_size,
+                                               produced_stderr)),
+        threading.Thread(target=consume, args=(stdin_read, consumed_stdin)),
+    ]
+
+    with protocol.Channel(sock.makefile('rwb', buffering=0)) as channel:
+        sock.close()
+        streams = relay.HelperRelay(
+            channel, open(stdin_write, 'wb', buffering=0),
+            open(stdout_read, 'rb', buffering=0),
+            open(stderr_read, 'rb', buffering=0), buffer_size)
+        streams.start()
+        for thread in command:
+            thread.start()
+        for thread in command:
+            thread.join()
+        streams.join()
+        protocol.send_done(channel)
+
+    print(json.dumps({
+        'stdout': produced_stdout[0], 'stderr': produced_stderr[0],
+        'stdin': consumed_stdin[0],
+        'pumps': [pump.describe() for pump in streams.pumps]}))
+
+
+def run(buffer_size, stdout_size, stderr_size, stdin_size):
+    """Relay the streams once. Returns the seconds taken, the byte count of
+    each stream at the sending and receiving ends, and each pump's
+    description of itself."""
+    parent, child = socket.socketpair()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--helper',
+         str(child.fileno()), str(buffer_size), str(stdout_size),
+         str(stderr_size)],
+        pass_fds=[child.fileno()], stdout=subprocess.PIPE)
+    child.close()
+
+    stdin_read, stdin_write = pipe(buffer_size)
+    stdout_read, stdout_write = pipe(buffer_size)
+    stderr_read, stderr_write = pipe(buffer_size)
+    produced_stdin, consumed_stdout, consumed_stderr = [], [], []
+    threads = [
+        threading.Thread(target=produce, args=(stdin_write, stdin_size,
+                                               produced_stdin)),
+        threading.Thread(target=consume, args=(stdout_read, consumed_stdout)),
+        threading.Thread(target=consume, args=(stderr_read, consumed_stderr)),
+    ]
+    for thread in threads:
+        thread.start()
+
+    stdout = open(stdout_write, 'wb', buffering=0)
+    stderr = open(stderr_write, 'wb', buffering=0)
+    with protocol.Channel(parent.makefile('rwb', buffering=0)) as channel:
+        parent.close()
+        client = relay.ClientRelay(
+            channel, open(stdin_read, 'rb', buffering=0), stdout, stderr,
+            buffer_size)
+        start = time.perf_counter()
+        client.start()
+        for _ in protocol.receive_results(channel, client.on_stream):
+            sys.exit('unexpected result')
+        elapsed = time.perf_counter() - start
+    stdout.close()
+    stderr.close()
+    for thread in threads:
+        thread.join()
+
+    report = json.loads(process.communicate()[0])
+    if process.returncode:
+        sys.exit('helper failed')
+    streams = {
+        'stdout': (report['stdout'], consumed_stdout[0]),
+        'stderr': (report['stderr'], consumed_stderr[0]),
+        'stdin': (produced_stdin[0], report['stdin']),
+    }
+    return elapsed, streams, report['pumps'] + [client.pump.describe()]
+
+
+def main():
+    if sys.argv[1:2] == ['--helper']:
+        helper(*map(int, sys.argv[2:]))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stdout-mib', type=int, default=1024)
+    parser.add_argument('--stderr-mib', type=int, default=256)
+    parser.add_argument('--stdin-mib', type=int, default=256)
+    parser.add_argument('--buffer-kib', type=int, nargs='+',
+                        default=[4, 64, relay.BUFFER_SIZE // 1024])
+    args = parser.parse_args()
+
+    sizes = (args.stdout_mib * MIB, args.stderr_mib * MIB,
+             args.stdin_mib * MIB)
+    for buffer_kib in args.buffer_kib:
+        elapsed, streams, pumps = run(buffer_kib * 1024, *sizes)
+        total = sum(received for _, received in streams.values())
+        print('{:>5} KiB buffers: {} MiB in {:.2f} s, {:8.1f} MB/s'.format(
+            buffer_kib, total // MIB, elapsed, total / elapsed / 1e6))
+        for pump in pumps:
+            print('    ' + pump)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Finding the UNC path of a script on a mapped drive, with UncPrefixes.
+
+WNetGetUniversalName() is stood in for by a fake redirector which takes
+--latency ms a call, and needs a second call when the buffer it's given is
+too small, as the real one does. Each launch of elevate translates the
+path of its script once; the modes compared, over -n launches, are:
+
+    direct  ask for the script's UNC name, starting with no buffer, as
+            path_to_current_script() used to
+    cached  load UncPrefixes from their file, translate and save, as
+            path_to_current_script() does; the drive's share is asked for
+            again once --ttl s have passed
+
+Usage: python benchmarks/unc_prefixes.py [-n LAUNCHES] [--latency MS]
+                                         [--ttl S]
+"""
+import argparse
+import ntpath
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from elevate import unc_prefixes  # noqa: E402
+
+# sizeof(UNIVERSAL_NAME_INFO) on 64-bit Windows.
+INFO_SIZE = 8
+
+
+class FakeRedirector:
+
+    """WNetGetUniversalName() over |mappings|, {drive: share}, as
+    utilities.unc_name_for_path() calls it."""
+
+    def __init__(self, mappings, latency=0):
+        self.mappings = mappings
+        self.latency = latency
+        self.calls = 0
+        self.error = None
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error:
+            raise self.error
+
+    def __call__(self, path, buffer_size=0):
+        self._call()
+        drive, rest = ntpath.splitdrive(path)
+        share = self.mappings.get(drive.upper())
+        if share is None:
+            return None, buffer_size
+        name = share + rest
+        needed = INFO_SIZE + 2 * (len(name) + 1)
+        if buffer_size < needed:
+            # ERROR_MORE_DATA, then again with the size it asked for.
+            self._call()
+            buffer_size = needed
+        return name, buffer_size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--launches', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=20)
+    parser.add_argument('--ttl', type=float, default=unc_prefixes.DEFAULT_TTL)
+    args = parser.parse_args()
+
+    script = r'Z:\src\elevate\elevate\__main__.py'
+    session = 'S-1-5-5-0-1'
+    with tempfile.TemporaryDirectory() as root:
+        cache_path = os.path.join(root, 'unc-prefixes.json')
+
+        def direct(redirector):
+            return redirector(script)[0]
+
+        def cached(redirector):
+            prefixes = unc_prefixes.UncPrefixes.load(
+                cache_path, redirector, session, ttl=args.ttl)
+            path = prefixes.translate(script)
+            prefixes.save(cache_path)
+            return path
+
+        for label, launch in (('direct', direct), ('cached', cached)):
+            redirector = FakeRedirector({'Z:': r'\\build\src'},
+                                        args.latency / 1e3)
+            start = time.perf_counter()
+            for _ in range(args.launches):
+                launch(redirector)
+            elapsed = time.perf_counter() - start
+            print('{:<6} {:8.3f} ms a launch, {:4} redirector calls'.format(
+                label, elapsed / args.launches * 1e3, redirector.calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+if not __package__:
+    # Run as a script, as the privileged helper is when the client ran with
+    # -m (see path_to_current_script()); make the package importable.
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elevate.elevate import main
+
+main()
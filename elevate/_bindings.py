@@ -0,0 +1,776 @@
+# Generated by tools/gen_bindings.py from win32.py, libc.py. Do not edit.
+from ._constants import DUPLICATE_SAME_ACCESS, INFINITE, OPEN_EXISTING, PM_REMOVE, WT_EXECUTEONLYONCE
+from .ctypes_utils import OUTPUT_PARAM
+
+# (module_name, function_name):
+#     (descriptors less their types, paramflags)
+PARAM_FLAGS = {
+    ('user32', 'RegisterClassExW'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('user32', 'GetWindowLongPtrW'): (
+        (
+            ('wnd',),
+            ('index',),
+        ),
+        (
+            (1, 'wnd'),
+            (1, 'index'),
+        ),
+    ),
+    ('user32', 'SetWindowLongPtrW'): (
+        (
+            ('wnd',),
+            ('index',),
+            ('new_long',),
+        ),
+        (
+            (1, 'wnd'),
+            (1, 'index'),
+            (1, 'new_long'),
+        ),
+    ),
+    ('user32', 'CreateWindowExW'): (
+        (
+            ('ex_style',),
+            ('class_name',),
+            ('window_name', None),
+            ('style',),
+            ('x', 0),
+            ('y', 0),
+            ('width', 0),
+            ('height', 0),
+            ('wnd_parent', None),
+            ('menu', None),
+            ('instance',),
+            ('param',),
+        ),
+        (
+            (1, 'ex_style'),
+            (1, 'class_name'),
+            (1, 'window_name', None),
+            (1, 'style'),
+            (1, 'x', 0),
+            (1, 'y', 0),
+            (1, 'width', 0),
+            (1, 'height', 0),
+            (1, 'wnd_parent', None),
+            (1, 'menu', None),
+            (1, 'instance'),
+            (1, 'param'),
+        ),
+    ),
+    ('user32', 'DefWindowProcW'): (
+        (
+            ('wnd',),
+            ('Msg',),
+            ('param',),
+            ('param',),
+        ),
+        (
+            (1, 'wnd'),
+            (1, 'Msg'),
+            (1, 'param'),
+            (1, 'param'),
+        ),
+    ),
+    ('user32', 'PeekMessageW'): (
+        (
+            ('msg',),
+            ('wnd', None),
+            ('msg_filter_min', 0),
+            ('msg_filter_max', 0),
+            ('remove_msg', PM_REMOVE),
+        ),
+        (
+            (1, 'msg'),
+            (1, 'wnd', None),
+            (1, 'msg_filter_min', 0),
+            (1, 'msg_filter_max', 0),
+            (1, 'remove_msg', PM_REMOVE),
+        ),
+    ),
+    ('user32', 'TranslateMessage'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('user32', 'DispatchMessageW'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('kernel32', 'DuplicateHandle'): (
+        (
+            ('source_process_handle',),
+            ('source_handle',),
+            ('target_process_handle',),
+            ('target_handle', OUTPUT_PARAM),
+            ('desired_access', 0),
+            ('inherit_handle', False),
+            ('options', DUPLICATE_SAME_ACCESS),
+        ),
+        (
+            (1, 'source_process_handle'),
+            (1, 'source_handle'),
+            (1, 'target_process_handle'),
+            (2, 'target_handle'),
+            (1, 'desired_access', 0),
+            (1, 'inherit_handle', False),
+            (1, 'options', DUPLICATE_SAME_ACCESS),
+        ),
+    ),
+    ('kernel32', 'CloseHandle'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('kernel32', 'SetHandleInformation'): (
+        (
+            ('object',),
+            ('mask',),
+            ('flags',),
+        ),
+        (
+            (1, 'object'),
+            (1, 'mask'),
+            (1, 'flags'),
+        ),
+    ),
+    ('kernel32', 'CreateFileW'): (
+        (
+            ('file_name',),
+            ('desired_access',),
+            ('share_mode', 0),
+            ('security_attributes', None),
+            ('creation_disposition', OPEN_EXISTING),
+            ('flags_and_attributes', 0),
+            ('template_file', None),
+        ),
+        (
+            (1, 'file_name'),
+            (1, 'desired_access'),
+            (1, 'share_mode', 0),
+            (1, 'security_attributes', None),
+            (1, 'creation_disposition', OPEN_EXISTING),
+            (1, 'flags_and_attributes', 0),
+            (1, 'template_file', None),
+        ),
+    ),
+    ('kernel32', 'ReadFile'): (
+        (
+            ('file',),
+            ('buffer',),
+            ('number_of_bytes_to_read',),
+            ('number_of_bytes_read', None),
+            ('overlapped', None),
+        ),
+        (
+            (1, 'file'),
+            (1, 'buffer'),
+            (1, 'number_of_bytes_to_read'),
+            (1, 'number_of_bytes_read', None),
+            (1, 'overlapped', None),
+        ),
+    ),
+    ('kernel32', 'WriteFile'): (
+        (
+            ('file',),
+            ('buffer',),
+            ('number_of_bytes_to_write',),
+            ('number_of_bytes_written', None),
+            ('overlapped', None),
+        ),
+        (
+            (1, 'file'),
+            (1, 'buffer'),
+            (1, 'number_of_bytes_to_write'),
+            (1, 'number_of_bytes_written', None),
+            (1, 'overlapped', None),
+        ),
+    ),
+    ('kernel32', 'GetOverlappedResult'): (
+        (
+            ('file',),
+            ('overlapped',),
+            ('number_of_bytes_transferred', OUTPUT_PARAM),
+            ('wait', True),
+        ),
+        (
+            (1, 'file'),
+            (1, 'overlapped'),
+            (2, 'number_of_bytes_transferred'),
+            (1, 'wait', True),
+        ),
+    ),
+    ('kernel32', 'CreateEventW'): (
+        (
+            ('event_attributes', None),
+            ('manual_reset', True),
+            ('initial_state', False),
+            ('name', None),
+        ),
+        (
+            (1, 'event_attributes', None),
+            (1, 'manual_reset', True),
+            (1, 'initial_state', False),
+            (1, 'name', None),
+        ),
+    ),
+    ('kernel32', 'GetFileType'): (
+        (
+            ('file',),
+        ),
+        (
+            (1, 'file'),
+        ),
+    ),
+    ('advapi32', 'AllocateAndInitializeSid'): (
+        (
+            ('identifier_authority',),
+            ('sub_authority_count', 0),
+            ('sub_authority0', 0),
+            ('sub_authority1', 0),
+            ('sub_authority2', 0),
+            ('sub_authority3', 0),
+            ('sub_authority4', 0),
+            ('sub_authority5', 0),
+            ('sub_authority6', 0),
+            ('sub_authority7', 0),
+            ('sid', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'identifier_authority'),
+            (1, 'sub_authority_count', 0),
+            (1, 'sub_authority0', 0),
+            (1, 'sub_authority1', 0),
+            (1, 'sub_authority2', 0),
+            (1, 'sub_authority3', 0),
+            (1, 'sub_authority4', 0),
+            (1, 'sub_authority5', 0),
+            (1, 'sub_authority6', 0),
+            (1, 'sub_authority7', 0),
+            (2, 'sid'),
+        ),
+    ),
+    ('advapi32', 'FreeSid'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('advapi32', 'CheckTokenMembership'): (
+        (
+            ('token_handle', None),
+            ('sid_to_check',),
+            ('is_member', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'token_handle', None),
+            (1, 'sid_to_check'),
+            (2, 'is_member'),
+        ),
+    ),
+    ('advapi32', 'OpenProcessToken'): (
+        (
+            ('process_handle',),
+            ('desired_access',),
+            ('token_handle', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'process_handle'),
+            (1, 'desired_access'),
+            (2, 'token_handle'),
+        ),
+    ),
+    ('advapi32', 'GetTokenInformation'): (
+        (
+            ('token_handle',),
+            ('token_information_class',),
+            ('token_information',),
+            ('token_information_length',),
+            ('return_length',),
+        ),
+        (
+            (1, 'token_handle'),
+            (1, 'token_information_class'),
+            (1, 'token_information'),
+            (1, 'token_information_length'),
+            (1, 'return_length'),
+        ),
+    ),
+    ('advapi32', 'ConvertSidToStringSidW'): (
+        (
+            ('sid',),
+            ('string_sid', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'sid'),
+            (2, 'string_sid'),
+        ),
+    ),
+    ('advapi32', 'ConvertStringSecurityDescriptorToSecurityDescriptorW'): (
+        (
+            ('string_security_descriptor',),
+            ('string_sd_revision',),
+            ('security_descriptor', OUTPUT_PARAM),
+            ('security_descriptor_size', None),
+        ),
+        (
+            (1, 'string_security_descriptor'),
+            (1, 'string_sd_revision'),
+            (2, 'security_descriptor'),
+            (1, 'security_descriptor_size', None),
+        ),
+    ),
+    ('kernel32', 'LocalFree'): (
+        (
+            ('mem',),
+        ),
+        (
+            (1, 'mem'),
+        ),
+    ),
+    ('kernel32', 'SetStdHandle'): (
+        (
+            (),
+            (),
+        ),
+        (
+            (1,),
+            (1,),
+        ),
+    ),
+    ('kernel32', 'GetStdHandle'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('kernel32', 'AttachConsole'): (
+        (
+            ('process_id',),
+        ),
+        (
+            (1, 'process_id'),
+        ),
+    ),
+    ('kernel32', 'FreeConsole'): (
+        (
+        ),
+        (
+        ),
+    ),
+    ('kernel32', 'WriteConsoleW'): (
+        (
+            ('console_output',),
+            ('buffer',),
+            ('number_of_chars_to_write',),
+            ('number_of_chars_written', OUTPUT_PARAM),
+            ('reserved', None),
+        ),
+        (
+            (1, 'console_output'),
+            (1, 'buffer'),
+            (1, 'number_of_chars_to_write'),
+            (2, 'number_of_chars_written'),
+            (1, 'reserved', None),
+        ),
+    ),
+    ('kernel32', 'CreateProcessW'): (
+        (
+            ('application_name',),
+            ('command_line',),
+            ('process_attributes', None),
+            ('thread_attributes', None),
+            ('inherit_handles', False),
+            ('creation_flags', 0),
+            ('environment', None),
+            ('current_directory', None),
+            ('startup_info',),
+            ('process_information', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'application_name'),
+            (1, 'command_line'),
+            (1, 'process_attributes', None),
+            (1, 'thread_attributes', None),
+            (1, 'inherit_handles', False),
+            (1, 'creation_flags', 0),
+            (1, 'environment', None),
+            (1, 'current_directory', None),
+            (1, 'startup_info'),
+            (2, 'process_information'),
+        ),
+    ),
+    ('shell32', 'ShellExecuteExW'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('kernel32', 'GetModuleHandleExW'): (
+        (
+            ('flags',),
+            ('module_name',),
+            ('module', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'flags'),
+            (1, 'module_name'),
+            (2, 'module'),
+        ),
+    ),
+    ('kernel32', 'GetEnvironmentStringsW'): (
+        (
+        ),
+        (
+        ),
+    ),
+    ('kernel32', 'FreeEnvironmentStringsW'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('userenv', 'CreateEnvironmentBlock'): (
+        (
+            ('environment', OUTPUT_PARAM),
+            ('token',),
+            ('inherit', False),
+        ),
+        (
+            (2, 'environment'),
+            (1, 'token'),
+            (1, 'inherit', False),
+        ),
+    ),
+    ('userenv', 'DestroyEnvironmentBlock'): (
+        (
+            ('environment',),
+        ),
+        (
+            (1, 'environment'),
+        ),
+    ),
+    ('kernel32', 'GetProcessTimes'): (
+        (
+            ('process',),
+            ('creation_time', OUTPUT_PARAM),
+            ('exit_time', OUTPUT_PARAM),
+            ('kernel_time', OUTPUT_PARAM),
+            ('user_time', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'process'),
+            (2, 'creation_time'),
+            (2, 'exit_time'),
+            (2, 'kernel_time'),
+            (2, 'user_time'),
+        ),
+    ),
+    ('kernel32', 'GetExitCodeProcess'): (
+        (
+            ('process',),
+            ('exit_code', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'process'),
+            (2, 'exit_code'),
+        ),
+    ),
+    ('kernel32', 'K32GetProcessMemoryInfo'): (
+        (
+            ('process',),
+            ('counters', OUTPUT_PARAM),
+            ('cb',),
+        ),
+        (
+            (1, 'process'),
+            (2, 'counters'),
+            (1, 'cb'),
+        ),
+    ),
+    ('kernel32', 'GetCurrentProcessId'): (
+        (
+        ),
+        (
+        ),
+    ),
+    ('kernel32', 'GetCurrentProcess'): (
+        (
+        ),
+        (
+        ),
+    ),
+    ('kernel32', 'OpenProcess'): (
+        (
+            ('desired_access',),
+            ('inherit_handle',),
+            ('process_id',),
+        ),
+        (
+            (1, 'desired_access'),
+            (1, 'inherit_handle'),
+            (1, 'process_id'),
+        ),
+    ),
+    ('user32', 'MsgWaitForMultipleObjectsEx'): (
+        (
+            ('count',),
+            ('handles',),
+            ('milliseconds',),
+            ('wake_mask',),
+            ('flags',),
+        ),
+        (
+            (1, 'count'),
+            (1, 'handles'),
+            (1, 'milliseconds'),
+            (1, 'wake_mask'),
+            (1, 'flags'),
+        ),
+    ),
+    ('kernel32', 'CreatePipe'): (
+        (
+            ('read_pipe', OUTPUT_PARAM),
+            ('write_pipe', OUTPUT_PARAM),
+            ('pipe_attributes', None),
+            ('size', 0),
+        ),
+        (
+            (2, 'read_pipe'),
+            (2, 'write_pipe'),
+            (1, 'pipe_attributes', None),
+            (1, 'size', 0),
+        ),
+    ),
+    ('kernel32', 'CreateNamedPipeW'): (
+        (
+            ('name',),
+            ('open_mode',),
+            ('pipe_mode',),
+            ('max_instances',),
+            ('out_buffer_size',),
+            ('in_buffer_size',),
+            ('default_timeout',),
+            ('security_attributes', None),
+        ),
+        (
+            (1, 'name'),
+            (1, 'open_mode'),
+            (1, 'pipe_mode'),
+            (1, 'max_instances'),
+            (1, 'out_buffer_size'),
+            (1, 'in_buffer_size'),
+            (1, 'default_timeout'),
+            (1, 'security_attributes', None),
+        ),
+    ),
+    ('kernel32', 'ConnectNamedPipe'): (
+        (
+            ('pipe',),
+            ('overlapped', None),
+        ),
+        (
+            (1, 'pipe'),
+            (1, 'overlapped', None),
+        ),
+    ),
+    ('kernel32', 'GetNamedPipeServerProcessId'): (
+        (
+            ('pipe',),
+            ('server_process_id', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'pipe'),
+            (2, 'server_process_id'),
+        ),
+    ),
+    ('kernel32', 'GetNamedPipeClientProcessId'): (
+        (
+            ('pipe',),
+            ('client_process_id', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'pipe'),
+            (2, 'client_process_id'),
+        ),
+    ),
+    ('kernel32', 'WaitForSingleObject'): (
+        (
+            (),
+            (),
+        ),
+        (
+            (1,),
+            (1,),
+        ),
+    ),
+    ('kernel32', 'RegisterWaitForSingleObject'): (
+        (
+            ('new_wait_object', OUTPUT_PARAM),
+            ('object',),
+            ('callback',),
+            ('context', None),
+            ('milliseconds', INFINITE),
+            ('flags', WT_EXECUTEONLYONCE),
+        ),
+        (
+            (2, 'new_wait_object'),
+            (1, 'object'),
+            (1, 'callback'),
+            (1, 'context', None),
+            (1, 'milliseconds', INFINITE),
+            (1, 'flags', WT_EXECUTEONLYONCE),
+        ),
+    ),
+    ('kernel32', 'UnregisterWaitEx'): (
+        (
+            ('wait_handle',),
+            ('completion_event', None),
+        ),
+        (
+            (1, 'wait_handle'),
+            (1, 'completion_event', None),
+        ),
+    ),
+    ('user32', 'PostMessageW'): (
+        (
+            ('hwnd',),
+            ('msg',),
+            ('w_param',),
+            ('l_param',),
+        ),
+        (
+            (1, 'hwnd'),
+            (1, 'msg'),
+            (1, 'w_param'),
+            (1, 'l_param'),
+        ),
+    ),
+    ('user32', 'MessageBoxW'): (
+        (
+            ('wnd', None),
+            ('text',),
+            ('caption', None),
+            ('type', 0),
+        ),
+        (
+            (1, 'wnd', None),
+            (1, 'text'),
+            (1, 'caption', None),
+            (1, 'type', 0),
+        ),
+    ),
+    ('user32', 'LoadCursorW'): (
+        (
+            ('instance',),
+            ('cursor_name',),
+        ),
+        (
+            (1, 'instance'),
+            (1, 'cursor_name'),
+        ),
+    ),
+    ('mpr', 'WNetGetUniversalNameW'): (
+        (
+            ('local_path',),
+            ('info_level',),
+            ('buffer',),
+            ('buffer_size',),
+        ),
+        (
+            (1, 'local_path'),
+            (1, 'info_level'),
+            (1, 'buffer'),
+            (1, 'buffer_size'),
+        ),
+    ),
+    ('ole32', 'CoTaskMemFree'): (
+        (
+            ('ptr',),
+        ),
+        (
+            (1, 'ptr'),
+        ),
+    ),
+    ('shell32', 'SHGetKnownFolderPath'): (
+        (
+            ('rfid',),
+            ('flags', 0),
+            ('token', None),
+            ('path', OUTPUT_PARAM),
+        ),
+        (
+            (1, 'rfid'),
+            (1, 'flags', 0),
+            (1, 'token', None),
+            (2, 'path'),
+        ),
+    ),
+    ('msvcrt', '_wfreopen'): (
+        (
+            (),
+            (),
+            (),
+        ),
+        (
+            (1,),
+            (1,),
+            (1,),
+        ),
+    ),
+    ('msvcrt', '_fileno'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('msvcrt', 'wprintf'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('msvcrt', 'wcslen'): (
+        (
+            (),
+        ),
+        (
+            (1,),
+        ),
+    ),
+    ('msvcrt', '__iob_func'): (
+        (
+        ),
+        (
+        ),
+    ),
+}
@@ -1,6 +1,5 @@
 import ctypes
 from ctypes.wintypes import BYTE, LPCWSTR
-from ._winerror import *
 
 # ShellExecuteEx()
 SEE_MASK_DEFAULT = 0x00000000
@@ -39,6 +38,8 @@ SW_SHOWNORMAL = 1
 
 # CreateProcess
 CREATE_UNICODE_ENVIRONMENT = 0x400
+CREATE_NO_WINDOW = 0x08000000
+STARTF_USESTDHANDLES = 0x00000100
 
 
 # GetStdHandle()
@@ -54,10 +55,17 @@ ATTACH_PARENT_PROCESS = -1
 # Timeouts
 INFINITE = 0xFFFFFFFF
 
+# RegisterWaitForSingleObject()
+WT_EXECUTEDEFAULT = 0x00000000
+WT_EXECUTEONLYONCE = 0x00000008
+
 # DuplicateHandle()
 DUPLICATE_CLOSE_SOURCE = 0x00000001
 DUPLICATE_SAME_ACCESS = 0x00000002
 
+# SetHandleInformation()
+HANDLE_FLAG_INHERIT = 0x00000001
+
 # Sids, impersonation tokens, yadda yadda yadda
 SECURITY_BUILTIN_DOMAIN_RID = 0x00000020
 
@@ -111,6 +119,39 @@ GET_MODULE_HANDLE_EX_FLAG_UNCHANGED_REFCOUNT = 0x00000002
 PROCESS_DUP_HANDLE = 0x0040
 PROCESS_QUERY_INFORMATION = 0x0400
 
+# CreateFile
+GENERIC_READ = 0x80000000
+GENERIC_WRITE = 0x40000000
+OPEN_EXISTING = 3
+FILE_FLAG_OVERLAPPED = 0x40000000
+
+# GetFileType()
+FILE_TYPE_UNKNOWN = 0x0000
+FILE_TYPE_DISK = 0x0001
+FILE_TYPE_CHAR = 0x0002
+FILE_TYPE_PIPE = 0x0003
+
+# CreateNamedPipe
+PIPE_ACCESS_DUPLEX = 0x00000003
+FILE_FLAG_FIRST_PIPE_INSTANCE = 0x00080000
+PIPE_TYPE_BYTE = 0x00000000
+PIPE_READMODE_BYTE = 0x00000000
+PIPE_WAIT = 0x00000000
+PIPE_REJECT_REMOTE_CLIENTS = 0x00000008
+PIPE_UNLIMITED_INSTANCES = 255
+
+# Token rights
+TOKEN_DUPLICATE = 0x0002
+TOKEN_IMPERSONATE = 0x0004
+TOKEN_QUERY = 0x0008
+
+# GetTokenInformation()
+TokenElevation = 20
+TokenLogonSid = 28
+
+# ConvertStringSecurityDescriptorToSecurityDescriptor()
+SDDL_REVISION_1 = 1
+
 # Get/SetWindowLongPtr
 GWLP_USERDATA = -21
 
@@ -0,0 +1,216 @@
+"""asyncio support: running commands elevated from an event loop.
+
+    completed = await elevate.aio.run(['msbuild', 'app.sln'], broker=True)
+
+run() starts the elevate command, which exits with the elevated command's
+exit code, and awaits it without tying up a thread per command. On Windows,
+the wait is registered with RegisterWaitForSingleObject(), whose thread pool
+callback wakes the event loop. Elsewhere, the process is watched through a
+pidfd, or asyncio's child watcher if there are no pidfds, so this module
+also runs on Linux, for benchmarks.
+
+With broker=True, concurrent runs share one UAC prompt: until a run in
+this event loop has finished with a broker to show for it, broker runs go
+one at a time, so only the first launches a helper, and the rest find it
+resident (see elevate.broker). After that they run at once.
+"""
+import asyncio
+import ctypes
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+from . import command_line
+from .broker import DEFAULT_IDLE_TIMEOUT
+
+if sys.platform == 'win32':
+    from . import win32
+
+# exit_code is the elevated command's, or 1 if elevate itself failed, e.g.
+# because the UAC prompt was declined; duration is in seconds.
+Completed = namedtuple('Completed', 'argv exit_code duration')
+
+
+def client_argv(argv, spill='fail', environment_overrides=None,
+                broker=False, broker_timeout=None):
+    """The elevate command line that runs |argv| elevated. A value of None
+    in |environment_overrides| unsets that variable."""
+    # Run the client with our interpreter, whether or not the elevate
+    # console script is installed or on PATH.
+    args = [sys.executable, '-m', 'elevate.elevate', '--spill', spill]
+    for name, value in (environment_overrides or {}).items():
+        if value is None:
+            args += ['--unset', name]
+        else:
+            args += ['--env', '{}={}'.format(name, value)]
+    if broker:
+        args.append('--broker')
+        if broker_timeout is not None:
+            args += ['--broker-timeout', str(broker_timeout)]
+    return args + list(argv)
+
+
+async def run(argv, **options):
+    """Run |argv| elevated and return its Completed. |options| are those of
+    client_argv().
+
+    Cancelling stops the wait, not the command.
+    """
+    start = time.perf_counter()
+    client = client_argv(argv, **options)
+    if options.get('broker'):
+        gate = _broker_gates.setdefault(asyncio.get_running_loop(),
+                                        _BrokerGate())
+        exit_code = await gate.spawn(client, options.get('broker_timeout'))
+    else:
+        exit_code = await spawn(client)
+    return Completed(argv, exit_code, time.perf_counter() - start)
+
+
+async def spawn(argv):
+    """Run |argv| as it is, not elevated, and return its exit code, waiting
+    for it as run() does."""
+    return await _spawn(argv)
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+class _BrokerGate:
+
+    """Lets broker runs through one at a time until one of them has left a
+    broker running. Runs that all missed the broker at once would each
+    launch a helper, and the user would get a UAC prompt apiece."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        # Runs under way since a broker was known to be running, which keep
+        # it from going idle.
+        self._active = 0
+        self._last_finished = None
+
+    def _broker_running(self, idle_timeout):
+        if self._active:
+            return True
+        # Allow for the broker's timer having started a little before our
+        # run saw its client exit.
+        return (self._last_finished is not None and time.monotonic()
+                - self._last_finished < idle_timeout / 2)
+
+    async def spawn(self, argv, idle_timeout=None):
+        if idle_timeout is None:
+            idle_timeout = DEFAULT_IDLE_TIMEOUT
+        if not self._broker_running(idle_timeout):
+            async with self._lock:
+                if not self._broker_running(idle_timeout):
+                    exit_code = await spawn(argv)
+                    # elevate exits with 1 when the UAC prompt is declined,
+                    # leaving no broker; the next run will ask again.
+                    if exit_code != 1:
+                        self._last_finished = time.monotonic()
+                    return exit_code
+        self._active += 1
+        try:
+            return await spawn(argv)
+        finally:
+            self._active -= 1
+            self._last_finished = time.monotonic()
+
+
+_broker_gates = weakref.WeakKeyDictionary()
+
+
+###############################################################################
+# Windows: thread pool waits
+
+class _HandleWaits:
+
+    """Bridges waits on handles to event loops. Every wait shares one thread
+    pool callback, which finds its waiter by the key it was registered
+    with."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+        self._keys = itertools.count(1)
+        self._callback = win32.WAITORTIMERCALLBACK(self._signalled)
+
+    def _signalled(self, key, timed_out):
+        with self._lock:
+            loop, future = self._waiters[key]
+        loop.call_soon_threadsafe(_set_result, future, None)
+
+    async def wait(self, handle):
+        """Wait for |handle| to be signalled."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = next(self._keys)
+        with self._lock:
+            self._waiters[key] = loop, future
+        try:
+            wait = win32.RegisterWaitForSingleObject(handle, self._callback,
+                                                     key)
+            try:
+                await future
+            finally:
+                # Returns once the callback can no longer be running.
+                win32.UnregisterWaitEx(wait, win32.INVALID_HANDLE_VALUE)
+        finally:
+            with self._lock:
+                del self._waiters[key]
+
+
+async def _spawn_with_registered_wait(argv):
+    cmd_line = ctypes.create_unicode_buffer(
+        command_line.argv_to_command_line(argv))
+    startup_info = win32.STARTUPINFO()
+    startup_info.cb = ctypes.sizeof(win32.STARTUPINFO)
+    proc_info = win32.CreateProcess(argv[0], cmd_line,
+                                    startup_info=startup_info)
+    win32.CloseHandle(proc_info.thread)
+    try:
+        await _handle_waits.wait(proc_info.process)
+        return win32.GetExitCodeProcess(proc_info.process)
+    finally:
+        win32.CloseHandle(proc_info.process)
+
+
+###############################################################################
+# Elsewhere: pidfds and child watchers
+
+async def _spawn_with_pidfd(argv):
+    loop = asyncio.get_running_loop()
+    process = subprocess.Popen(argv)
+    pidfd = os.pidfd_open(process.pid)
+    try:
+        # A pidfd becomes readable when its process exits.
+        exited = loop.create_future()
+        loop.add_reader(pidfd, _set_result, exited, None)
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+    finally:
+        os.close(pidfd)
+    return process.wait()
+
+
+async def _spawn_with_child_watcher(argv):
+    process = await asyncio.create_subprocess_exec(*argv)
+    return await process.wait()
+
+
+if sys.platform == 'win32':
+    _handle_waits = _HandleWaits()
+    _spawn = _spawn_with_registered_wait
+elif hasattr(os, 'pidfd_open'):
+    _spawn = _spawn_with_pidfd
+else:
+    _spawn = _spawn_with_child_watcher
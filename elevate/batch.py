@@ -0,0 +1,179 @@
+"""Running many commands under one elevation.
+
+`elevate --batch FILE` reads one command per line, written as a Windows
+command line, and sends them all in one request. The helper runs them up to
+--jobs at a time, capturing each command's output, and sends each result
+back as soon as that command finishes, so results arrive in the order the
+commands finish rather than the order they were listed.
+
+A batch may also say which commands wait for which (see elevate.plan). A
+command then starts once everything it depends on has succeeded, and is
+skipped if any of it fails.
+
+Nothing here calls Windows.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import protocol
+from .command_line import argv_to_command_line, command_line_to_argv
+
+
+def read_commands(lines):
+    """Parse the lines of a batch file: one command line each, skipping
+    blank lines and lines starting with '#'."""
+    commands = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            commands.append(command_line_to_argv(line))
+    return commands
+
+
+def _dependents(dependencies):
+    dependents = [[] for _ in dependencies]
+    for index, indices in enumerate(dependencies):
+        for dependency in set(indices):
+            dependents[dependency].append(index)
+    return dependents
+
+
+def topological_order(dependencies):
+    """Return the indices of |dependencies|, a list of the indices each
+    command waits for, so that every command comes after those it waits
+    for. Raises ValueError if there's a cycle."""
+    waiting = [len(set(indices)) for indices in dependencies]
+    dependents = _dependents(dependencies)
+    order = [index for index, count in enumerate(waiting) if not count]
+    for index in order:
+        for dependent in dependents[index]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                order.append(dependent)
+    if len(order) != len(dependencies):
+        raise ValueError('the commands\' dependencies form a cycle')
+    return order
+
+
+class _Scheduler:
+
+    """Runs a batch's commands on |pool| as their dependencies allow."""
+
+    def __init__(self, channel, batch, run_command, pool):
+        self.channel = channel
+        self.commands = batch.commands
+        self.run_command = run_command
+        self.pool = pool
+        dependencies = batch.dependencies or [()] * len(self.commands)
+        topological_order(dependencies)
+        self.waiting = [len(set(indices)) for indices in dependencies]
+        self.dependents = _dependents(dependencies)
+        self.blocked = [False] * len(self.commands)
+        self.remaining = len(self.commands)
+        self.error = None
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def run(self):
+        if not self.commands:
+            return
+        # Find them all before starting any: a command that finishes fast
+        # readies its dependents itself.
+        ready = [index for index, count in enumerate(self.waiting)
+                 if not count]
+        for index in ready:
+            self.pool.submit(self._run_one, index)
+        self.finished.wait()
+        if self.error:
+            raise self.error
+
+    def _run_one(self, index):
+        start = time.perf_counter()
+        try:
+            exit_code, output, usage = self.run_command(self.commands[index])
+        except Exception as e:
+            exit_code, output, usage = (
+                None, '{}\n'.format(e).encode('utf-8'), None)
+        self._finish(protocol.Result(index, exit_code,
+                                     time.perf_counter() - start, output,
+                                     usage=usage))
+
+    def _finish(self, result):
+        results = [result]
+        while results:
+            result = results.pop()
+            ready = []
+            with self.lock:
+                if self.error:
+                    return
+                try:
+                    protocol.send_result(self.channel, result)
+                except Exception as e:
+                    # Most likely the client went away; stop scheduling.
+                    self.error = e
+                    self.finished.set()
+                    return
+                for dependent in self.dependents[result.index]:
+                    if not succeeded(result):
+                        self.blocked[dependent] = True
+                    self.waiting[dependent] -= 1
+                    if not self.waiting[dependent]:
+                        ready.append(dependent)
+                self.remaining -= 1
+                if not self.remaining:
+                    self.finished.set()
+
+            for index in ready:
+                if self.blocked[index]:
+                    results.append(protocol.Result(index, None, 0.0, b'',
+                                                   skipped=True))
+                else:
+                    self.pool.submit(self._run_one, index)
+
+
+def run(channel, batch, run_command):
+    """Run |batch|'s commands with run_command(argv), which returns its exit
+    code, output and protocol.Usage (or None), up to batch.jobs at a time
+    and as their dependencies allow. Sends a protocol.Result on |channel| as
+    each one finishes or is skipped."""
+    with ThreadPoolExecutor(max(batch.jobs, 1)) as pool:
+        _Scheduler(channel, batch, run_command, pool).run()
+
+
+def describe(result, commands, names=None):
+    """A one-line summary of |result|, for the client to print before the
+    command's output. Commands are numbered unless they have |names|."""
+    if names:
+        label = names[result.index]
+    else:
+        label = '{}/{}'.format(result.index + 1, len(commands))
+    if result.skipped:
+        return '[{}] skipped, as a step it depends on failed: {}'.format(
+            label, argv_to_command_line(commands[result.index]))
+    if result.exit_code is None:
+        status = 'failed to start'
+    else:
+        status = 'exit {}'.format(result.exit_code)
+    return '[{}] {} in {:.2f} s: {}'.format(
+        label, status, result.duration,
+        argv_to_command_line(commands[result.index]))
+
+
+def succeeded(result):
+    return result.exit_code == 0
+
+
+def _minutes(seconds):
+    return '{}m{:.3f}s'.format(int(seconds // 60), seconds % 60)
+
+
+def time_summary(result):
+    """A time(1)-style report of |result|'s wall time, CPU times and peak
+    memory, as `elevate --time` prints."""
+    lines = ['real\t' + _minutes(result.duration)]
+    if result.usage:
+        lines += ['user\t' + _minutes(result.usage.user_time),
+                  'sys\t' + _minutes(result.usage.kernel_time),
+                  'peak\t{:.1f} MiB'.format(result.usage.peak_memory / 2**20)]
+    return '\n'.join(lines)
@@ -0,0 +1,145 @@
+"""A resident privileged helper that serves later elevate calls.
+
+Every elevate call normally costs a UAC prompt and a new helper process.
+With --broker, the helper stays resident after its first command instead,
+listening on a named pipe that only the user's logon session can open, and
+later calls from that session hand their requests to it. Like sudo's
+timestamp_timeout, it exits once it has been idle for a while.
+
+Broker only deals in listeners and protocol channels, so it runs anywhere:
+utilities.PipeListener is the Windows listener, and the tests and
+benchmarks serve over Unix domain sockets.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import protocol
+
+# sudo's default timestamp_timeout is five minutes.
+DEFAULT_IDLE_TIMEOUT = 5 * 60
+DEFAULT_WORKERS = 4
+
+
+class Broker:
+
+    """Serves the clients a listener accepts, calling |handler| with each
+    one's protocol.Channel on a pool of |workers| threads, until no client
+    has been served for |idle_timeout| seconds.
+
+    A listener has accept(), which waits for a client and returns its
+    Channel; wake(), which makes a pending accept() return; and close().
+    """
+
+    def __init__(self, listener, handler, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 workers=DEFAULT_WORKERS):
+        self.listener = listener
+        self.handler = handler
+        self.idle_timeout = idle_timeout
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._active = 0
+        self._timer = None
+        self._stopping = False
+
+    def serve(self):
+        """Serve clients until the broker is stopped or times out, then wait
+        for those already accepted. Returns how many clients were served."""
+        served = 0
+        with ThreadPoolExecutor(self.workers) as pool:
+            with self._lock:
+                self._arm_timer()
+            while True:
+                channel = self.listener.accept()
+                with self._lock:
+                    if self._stopping:
+                        # Either our own wake-up call or a client that was
+                        # just too late; it sees the channel close unread,
+                        # and can start a helper of its own.
+                        channel.close()
+                        break
+                    self._cancel_timer()
+                    self._active += 1
+                pool.submit(self._serve_client, channel)
+                served += 1
+        self.listener.close()
+        return served
+
+    def stop(self):
+        """Stop accepting clients."""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cancel_timer()
+        self.listener.wake()
+
+    def _serve_client(self, channel):
+        try:
+            with channel:
+                self.handler(channel)
+        except Exception:
+            logging.exception('Broker failed to serve a client')
+        finally:
+            with self._lock:
+                self._active -= 1
+                if not self._active and not self._stopping:
+                    self._arm_timer()
+
+    def _arm_timer(self):
+        timer = threading.Timer(self.idle_timeout,
+                                lambda: self._expire(timer))
+        timer.daemon = True
+        self._timer = timer
+        timer.start()
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _expire(self, timer):
+        with self._lock:
+            # A cancelled timer can still fire if it was already running.
+            if timer is not self._timer:
+                return
+            self._timer = None
+        logging.debug('Broker idle for {} seconds; exiting'.format(
+            self.idle_timeout))
+        self.stop()
+
+
+def handle(channel, baselines, run):
+    """Serve one client: receive its request and environment (rebuilt from
+    one of |baselines|, see protocol.receive_environment()), call
+    run(channel, request, environment_block), which may send results, and
+    tell the client it's done."""
+    request = protocol.receive_request(channel)
+    environment_block = protocol.receive_environment(channel, baselines)
+    run(channel, request, environment_block)
+    protocol.send_done(channel)
+
+
+def submit(channel, request, environment_block, baseline, on_result=None,
+           relay=None):
+    """The client's side of handle(): send |request| and wait for it to
+    finish, calling on_result() with each protocol.Result as it arrives.
+    For a request with |relay| set, |relay| is the relay.ClientRelay for
+    the command's streams.
+
+    Returns False, with nothing run, if the broker closed the channel before
+    taking the request, as it does when it's shutting down.
+    """
+    try:
+        protocol.send_request(channel, request)
+        protocol.send_environment(channel, environment_block, baseline)
+    except (protocol.ProtocolError, OSError):
+        return False
+    on_stream = None
+    if relay:
+        relay.start()
+        on_stream = relay.on_stream
+    for result in protocol.receive_results(channel, on_stream):
+        if on_result:
+            on_result(result)
+    return True
@@ -0,0 +1,137 @@
+"""Opt-in per-binding call statistics for ctypes_utils.
+
+When enabled, each Win32Func()/CFunc() binding resolved from then on is
+wrapped so that its calls, failures and latency are recorded. When disabled
+(the default) bindings are left untouched and cost nothing extra.
+
+Set ELEVATE_CALL_STATS to a file path to enable statistics at startup and
+have them written there as JSON when the process exits, or call enable()
+before the bindings of interest are first used.
+"""
+import atexit
+import os
+from time import perf_counter_ns
+
+# Latencies are bucketed by bit length: bucket i holds calls that took
+# [2 ** (i - 1), 2 ** i) nanoseconds.
+_BUCKETS = 65
+
+_stats = None
+
+
+class CallStats:
+
+    """Call count, failure count and latency histogram for one function."""
+
+    __slots__ = ('calls', 'failures', 'total_ns', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.total_ns = 0
+        self.histogram = [0] * _BUCKETS
+
+    def record(self, elapsed_ns):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        self.histogram[elapsed_ns.bit_length()] += 1
+
+    def percentile(self, fraction):
+        """Upper bound, in nanoseconds, of the latency below which
+        |fraction| of calls fell."""
+        threshold = fraction * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= threshold:
+                return 1 << bucket
+        return 0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'total_seconds': self.total_ns / 1e9,
+            'mean_ns': self.total_ns // self.calls if self.calls else 0,
+            'p50_ns': self.percentile(0.5),
+            'p90_ns': self.percentile(0.9),
+            'p99_ns': self.percentile(0.99),
+            'histogram': {str(1 << bucket): count
+                          for bucket, count in enumerate(self.histogram)
+                          if count},
+        }
+
+
+class _InstrumentedFunc:
+
+    """Wraps a ctypes function, recording each call in a CallStats."""
+
+    __slots__ = ('_function', '_stats', 'raw')
+
+    def __init__(self, function, stats, raw=None):
+        object.__setattr__(self, '_function', function)
+        object.__setattr__(self, '_stats', stats)
+        object.__setattr__(self, 'raw', raw)
+
+    def __call__(self, *args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            return self._function(*args, **kwargs)
+        except Exception:
+            self._stats.failures += 1
+            raise
+        finally:
+            self._stats.record(perf_counter_ns() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._function, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._function, name, value)
+
+    def __repr__(self):
+        return '<instrumented {!r}>'.format(self._function)
+
+
+def enabled():
+    return _stats is not None
+
+
+def enable(path=None):
+    """Start recording statistics for bindings resolved from now on. If
+    |path| is given, write them there as JSON at exit."""
+    global _stats
+    if _stats is None:
+        _stats = {}
+    if path:
+        atexit.register(dump, path)
+
+
+def instrument(name, function):
+    """Return |function| (and its .raw variant) wrapped to record calls under
+    |name|, or |function| itself if statistics are disabled."""
+    if _stats is None:
+        return function
+    stats = _stats.setdefault(name, CallStats())
+    raw = getattr(function, 'raw', None)
+    if raw is not None:
+        raw = _InstrumentedFunc(raw, stats)
+    return _InstrumentedFunc(function, stats, raw)
+
+
+def snapshot():
+    """Return {name: statistics} for every instrumented function."""
+    return {name: stats.as_dict()
+            for name, stats in sorted((_stats or {}).items())}
+
+
+def dump(path):
+    # Not imported up front: statistics are usually off, and json would
+    # cost every launch a few milliseconds.
+    import json
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=2, sort_keys=True)
+
+
+if os.environ.get('ELEVATE_CALL_STATS'):
+    enable(os.environ['ELEVATE_CALL_STATS'])
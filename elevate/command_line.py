@@ -0,0 +1,202 @@
+"""Converting between argv lists and Windows command lines.
+
+Windows passes a process its command line as a single string, which the C
+runtime (or CommandLineToArgvW()) splits back into arguments. These functions
+follow the same rules, so argv_to_command_line() and command_line_to_argv()
+round-trip, and don't need Windows.
+
+CreateProcess() limits a command line to MAX_COMMAND_LINE characters. When
+an argv is too long, a SpillPolicy decides what to do instead; see
+SPILL_POLICIES.
+"""
+import abc
+import contextlib
+import os
+import re
+import tempfile
+
+# CreateProcess() limit, including the terminating NUL.
+MAX_COMMAND_LINE = 32767
+
+# CommandLineToArgvW() splits on spaces and tabs; quote anything else that
+# looks like whitespace too, to be safe. CreateProcess() runs .bat and .cmd
+# files through cmd.exe, which reads its metacharacters and argument
+# delimiters outside quotes, so an unquoted 'a&b' would run a second
+# command; quote those as well.
+_NEEDS_QUOTING = re.compile(r'[ \t\n\v"&|<>^%!(),;=]')
+_BACKSLASHES_BEFORE_QUOTE = re.compile(r'(\\*)"')
+
+# Runs of characters with no special meaning, outside and inside quotes.
+# Backslashes are only special when they precede a double quote.
+_PLAIN_RUN = re.compile(r'(?:[^\\" \t]+|\\+(?![\\"]))+')
+_QUOTED_RUN = re.compile(r'(?:[^\\"]+|\\+(?![\\"]))+')
+
+
+def _quote_arg(arg):
+    if arg and not _NEEDS_QUOTING.search(arg):
+        return arg
+
+    # Backslashes are literal unless they precede a double quote, so only
+    # those runs (and the run before our closing quote) need doubling.
+    if '"' in arg:
+        arg = _BACKSLASHES_BEFORE_QUOTE.sub(r'\1\1\\"', arg)
+    if arg.endswith('\\'):
+        arg += arg[len(arg.rstrip('\\')):]
+    return '"' + arg + '"'
+
+
+def argv_to_command_line(args):
+    """Return a command line which parses back to |args|, quoting only the
+    arguments that need it.
+
+    args[0] is treated like any other argument. As Windows parses the program
+    name differently, it only round-trips if it has no double quotes and, if
+    it needs quoting, doesn't end in a backslash.
+    """
+    return ' '.join([_quote_arg(arg) for arg in args])
+
+
+def command_line_to_argv(command_line):
+    """Split |command_line| into arguments like CommandLineToArgvW().
+
+    As there, the first argument is the program name, which runs to the next
+    space or tab, or is enclosed in double quotes, and has no escapes.
+    Unlike CommandLineToArgvW(), an empty command line gives [].
+    """
+    argv = []
+    length = len(command_line)
+    i = 0
+
+    while i < length and command_line[i] in ' \t':
+        i += 1
+    if i == length:
+        return argv
+
+    # The program name.
+    if command_line[i] == '"':
+        end = command_line.find('"', i + 1)
+        end = length if end < 0 else end
+        argv.append(command_line[i + 1:end])
+        i = end + 1
+    else:
+        start = i
+        while i < length and command_line[i] not in ' \t':
+            i += 1
+        argv.append(command_line[start:i])
+
+    while True:
+        while i < length and command_line[i] in ' \t':
+            i += 1
+        if i >= length:
+            return argv
+
+        arg = []
+        in_quotes = False
+        while i < length:
+            c = command_line[i]
+            if c == '"':
+                if in_quotes and i + 1 < length and command_line[i + 1] == '"':
+                    # "" inside quotes is a literal quote.
+                    arg.append('"')
+                    i += 2
+                else:
+                    in_quotes = not in_quotes
+                    i += 1
+            elif c in ' \t' and not in_quotes:
+                break
+            else:
+                run = (_QUOTED_RUN if in_quotes else _PLAIN_RUN).match(
+                    command_line, i)
+                if run:
+                    arg.append(run.group())
+                    i = run.end()
+                    continue
+
+                # Backslashes followed by a quote: 2n backslashes give n
+                # backslashes, and the quote is a delimiter; 2n + 1 give n
+                # backslashes and a literal quote.
+                start = i
+                while command_line[i] == '\\':
+                    i += 1
+                count = i - start
+                arg.append('\\' * (count // 2))
+                if count % 2:
+                    arg.append('"')
+                    i += 1
+        argv.append(''.join(arg))
+
+
+class CommandLineTooLong(ValueError):
+    pass
+
+
+class SpillPolicy(metaclass=abc.ABCMeta):
+
+    """Decides how to run an argv whose command line is too long."""
+
+    @abc.abstractmethod
+    def spill(self, argv):
+        """Return a context manager yielding a command line for |argv| that
+        fits within MAX_COMMAND_LINE, and cleaning up after the process has
+        exited."""
+
+
+class FailPolicy(SpillPolicy):
+
+    """Refuse, with an error that says why."""
+
+    def spill(self, argv):
+        raise CommandLineTooLong(
+            'command line for {} is {} characters; the limit is {}'.format(
+                argv[0], len(argv_to_command_line(argv)),
+                MAX_COMMAND_LINE - 1))
+
+
+class ResponseFilePolicy(SpillPolicy):
+
+    """Pass the arguments in a temporary response file, as '@path'.
+
+    The first |fixed_args| arguments (the program, by default) stay on the
+    command line. The rest are written one per line with the same quoting
+    as the command line, which is what MSVC-style tools expect. The file is
+    deleted once the process has exited.
+    """
+
+    def __init__(self, fixed_args=1, encoding='utf-8', prefix='@'):
+        self.fixed_args = fixed_args
+        self.encoding = encoding
+        self.prefix = prefix
+
+    @contextlib.contextmanager
+    def spill(self, argv):
+        fixed, rest = argv[:self.fixed_args], argv[self.fixed_args:]
+        fd, path = tempfile.mkstemp(prefix='elevate-', suffix='.rsp')
+        try:
+            with open(fd, 'w', encoding=self.encoding, newline='\r\n') as f:
+                f.write('\n'.join(_quote_arg(arg) for arg in rest))
+            command_line = argv_to_command_line(fixed + [self.prefix + path])
+            if len(command_line) >= MAX_COMMAND_LINE:
+                raise CommandLineTooLong(
+                    'command line is too long even with a response file')
+            yield command_line
+        finally:
+            os.remove(path)
+
+
+SPILL_POLICIES = {
+    'fail': FailPolicy,
+    'response-file': ResponseFilePolicy,
+}
+
+
+@contextlib.contextmanager
+def command_line_for(argv, spill_policy=None):
+    """Yield the command line to run |argv| with, letting |spill_policy|
+    (a SpillPolicy, FailPolicy by default) handle it if it's too long."""
+    command_line = argv_to_command_line(argv)
+    if len(command_line) < MAX_COMMAND_LINE:
+        yield command_line
+        return
+
+    with (spill_policy or FailPolicy()).spill(argv) as command_line:
+        yield command_line
@@ -1,8 +1,12 @@
 import ctypes
-from ctypes import get_last_error, get_errno, WinError
+from ctypes import get_errno
 import os
-from collections import Sequence
+import sys
+import threading
+from collections import namedtuple
+from collections.abc import Sequence
 from functools import partial
+from . import call_stats
 
 # sentinel values
 def INPUT_PARAM(): return 1
@@ -12,11 +16,222 @@ def DEFAULT_WIN32_SUCCESS(result, *args): return result != 0
 def DEFAULT_C_SUCCESS(result, *args): return result >= 0
 
 
+if sys.platform == 'win32':
+    from ctypes import get_last_error, WinError
+
+
 class FuncType:
-    Win32 = ctypes.windll, partial(ctypes.WINFUNCTYPE, use_last_error=True)
-    Win32OLE = ctypes.oledll, ctypes.WINFUNCTYPE
     C = ctypes.cdll, partial(ctypes.CFUNCTYPE, use_errno=True)
 
+    # Only CFunc() bindings are usable elsewhere, e.g. for benchmarks.
+    if sys.platform == 'win32':
+        Win32 = ctypes.windll, partial(ctypes.WINFUNCTYPE,
+                                       use_last_error=True)
+        Win32OLE = ctypes.oledll, ctypes.WINFUNCTYPE
+
+
+# Maps the module names used in bindings to the library to load instead:
+# either another name for the loader, or an already loaded library. For
+# example, {'msvcrt': ctypes.util.find_library('c')} lets CFunc() bindings
+# against msvcrt run on Linux.
+library_overrides = {}
+
+
+def _load_library(loader, module_name):
+    library = library_overrides.get(module_name, module_name)
+    if isinstance(library, str):
+        library = getattr(loader, library)
+    return library
+
+
+# When true, bindings created by Win32Func() and friends don't load their DLL
+# or look up their export until they're first used.
+lazy_binding = True
+
+
+class _LazyNativeFunc:
+
+    """Stands in for a foreign function until it is first used.
+
+    On first use the DLL is loaded and the export resolved; any attributes set
+    on the proxy in the meantime (e.g. errcheck) are applied to the real
+    function, and references to the proxy in the module that created it are
+    replaced with the real function.
+    """
+
+    __slots__ = ('_bind', '_function', '_attributes', '_namespace')
+
+    def __init__(self, bind, namespace):
+        object.__setattr__(self, '_bind', bind)
+        object.__setattr__(self, '_function', None)
+        object.__setattr__(self, '_attributes', {})
+        object.__setattr__(self, '_namespace', namespace)
+
+    def _resolve(self):
+        function = self._function
+        if function is None:
+            function = self._bind()
+            for name, value in self._attributes.items():
+                setattr(function, name, value)
+            object.__setattr__(self, '_function', function)
+
+            namespace = self._namespace
+            if namespace is not None:
+                for name, value in list(namespace.items()):
+                    if value is self:
+                        namespace[name] = function
+        return function
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if self._function is None and name in self._attributes:
+            return self._attributes[name]
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        if self._function is None:
+            self._attributes[name] = value
+        else:
+            setattr(self._function, name, value)
+
+    def __repr__(self):
+        if self._function is not None:
+            return repr(self._function)
+        return '<unresolved {}>'.format(self._bind.__qualname__)
+
+
+# The function pointer types bindings use. CFUNCTYPE() and WINFUNCTYPE()
+# cache them, so bindings with the same signature, e.g. (HANDLE) -> BOOL,
+# already share one; this only counts them.
+_prototypes = set()
+
+_counters = {'bindings': 0, 'resolved': 0}
+
+BindingReport = namedtuple('BindingReport',
+                           'bindings resolved prototypes memory')
+
+
+def binding_report():
+    """Return a BindingReport describing the bindings created so far: how
+    many there are, how many have been resolved, and how many distinct
+    prototypes they share.
+
+    If tracemalloc is tracing, memory is the number of bytes still held
+    that were allocated with this module on the stack: proxies, function
+    pointers, prototypes and so on. Only allocations made since tracing
+    started count, and prototypes are only seen with a traceback limit of
+    at least 3, e.g. PYTHONTRACEMALLOC=3. Otherwise, memory is None.
+
+    """
+    # tracemalloc takes tens of milliseconds to import (it pulls in pickle),
+    # so only import it when it's tracing. _tracemalloc is built in.
+    import _tracemalloc
+    memory = None
+    if _tracemalloc.is_tracing():
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, __file__, all_frames=True)])
+        memory = sum(trace.size for trace in snapshot.traces)
+    return BindingReport(
+        bindings=_counters['bindings'],
+        resolved=_counters['resolved'],
+        prototypes=len(_prototypes),
+        memory=memory)
+
+
+_thread_local = threading.local()
+
+
+def scratch(ctype, slot=0, clear=True):
+    """Return a thread-local instance of |ctype| for reuse across calls.
+
+    Each (ctype, slot) pair maps to one instance per thread, so callers that
+    need several live instances of the same type at once should use distinct
+    slots. The instance is zero-filled first unless |clear| is false. It is
+    only valid until the next scratch() call for the same type and slot on
+    this thread, so copy out anything that needs to outlive that.
+    """
+    try:
+        instances = _thread_local.scratch
+    except AttributeError:
+        instances = _thread_local.scratch = {}
+
+    key = (ctype, slot)
+    try:
+        instance = instances[key]
+    except KeyError:
+        instance = instances[key] = ctype()
+    else:
+        if clear:
+            ctypes.memset(ctypes.addressof(instance), 0,
+                          ctypes.sizeof(instance))
+    return instance
+
+
+def _pooled_call(function, arg_types, param_flags):
+    """Return a variant of |function| (which takes every argument
+    positionally) that passes thread-local scratch buffers for the
+    OUTPUT_PARAMs in |param_flags|.
+
+    It takes the input arguments positionally, falling back to their
+    defaults, and returns the output values as ctypes would, except that
+    structures are the reused scratch() instances.
+    """
+    output = OUTPUT_PARAM()
+    missing = object()
+    out_positions, out_types, in_positions, defaults = [], [], [], []
+    for position, (flags, arg_type) in enumerate(zip(param_flags, arg_types)):
+        if flags[0] == output:
+            out_positions.append(position)
+            out_types.append(arg_type._type_)
+        else:
+            in_positions.append(position)
+            defaults.append(flags[2] if len(flags) > 2 else missing)
+    # Inputs with no default must always be passed.
+    required = max((i + 1 for i, default in enumerate(defaults)
+                    if default is missing), default=0)
+    pool_key = object()
+
+    def buffers():
+        try:
+            pools = _thread_local.buffers
+        except AttributeError:
+            pools = _thread_local.buffers = {}
+        outputs = tuple(out_type() for out_type in out_types)
+        template = [None] * len(param_flags)
+        for position, out in zip(out_positions, outputs):
+            template[position] = ctypes.byref(out)
+        for position, default in zip(in_positions, defaults):
+            template[position] = default
+        pools[pool_key] = outputs, template
+        return outputs, template
+
+    def pooled(*args):
+        if not required <= len(args) <= len(in_positions):
+            raise TypeError('expected {}-{} arguments, got {}'.format(
+                required, len(in_positions), len(args)))
+        try:
+            outputs, template = _thread_local.buffers[pool_key]
+        except (AttributeError, KeyError):
+            outputs, template = buffers()
+        call_args = template.copy()
+        for position, value in zip(in_positions, args):
+            call_args[position] = value
+        function(*call_args)
+
+        if len(outputs) == 1:
+            return outputs[0].__ctypes_from_outparam__()
+        return tuple(out.__ctypes_from_outparam__() for out in outputs)
+
+    return pooled
+
+
+def _caller_globals():
+    """Globals of the module calling Win32Func() etc."""
+    return sys._getframe(2).f_globals
+
 
 def _flattened(sequence):
     result = []
@@ -31,8 +246,56 @@ def _flattened(sequence):
     return result
 
 
+def _param_flags(argument_descriptors):
+    """Return the ctypes paramflags tuple for |argument_descriptors| (see
+    _NativeFunc())."""
+    def function_argdesc(descriptor):
+        assert descriptor
+        if not isinstance(descriptor, Sequence) or len(descriptor) == 1:
+            return (INPUT_PARAM(), )
+
+        arg_desc = [[INPUT_PARAM()], [descriptor[0]], []]
+
+        for param in descriptor[2:]:
+            if param in (INPUT_PARAM, OUTPUT_PARAM):
+                arg_desc[0] = param()
+            else:
+                arg_desc[-1] = param
+
+        return tuple(_flattened(arg_desc))
+
+    return tuple(function_argdesc(elem) for elem in argument_descriptors)
+
+
+def _descriptor_signature(argument_descriptors):
+    """Return the parts of |argument_descriptors| that _param_flags() depends
+    on: each descriptor without its type."""
+    return tuple(tuple(descriptor[:1]) + tuple(descriptor[2:])
+                 if isinstance(descriptor, (tuple, list))
+                 and len(descriptor) > 1 else ()
+                 for descriptor in argument_descriptors)
+
+
+def _precomputed_param_flags(module_name, function_name,
+                             argument_descriptors):
+    """Return the paramflags tools/gen_bindings.py generated for a binding,
+    or None if there are none or they were generated from other descriptors.
+    """
+    # _bindings refers to INPUT_PARAM and OUTPUT_PARAM, so it can't be
+    # imported until this module is.
+    from ._bindings import PARAM_FLAGS
+    entry = PARAM_FLAGS.get((module_name, function_name))
+    if entry is None:
+        return None
+    signature, param_flags = entry
+    if signature != _descriptor_signature(argument_descriptors):
+        return None
+    return param_flags
+
+
 def _NativeFunc(kind, function_name, module_name, result_type,
-                argument_descriptors):
+                argument_descriptors, lazy=False, namespace=None,
+                raw_errcheck=None):
     """Return a ctypes function prototype.
 
     :param kind: FuncType.Win32 or FuncType.C
@@ -45,6 +308,22 @@ def _NativeFunc(kind, function_name, module_name, result_type,
           - a sequence of tuples of the form
               (param_name, param_type, [value_kind]|[default_value])
             where value_kind is either of INPUT_PARAM or OUTPUT_PARAM
+    :param lazy: if true, return a proxy that loads the module and resolves
+        the function when it's first used
+    :param namespace: for lazy functions, the globals of the module defining
+        the function, whose references to the proxy are replaced once it's
+        resolved
+    :param raw_errcheck: errcheck for the function's .raw variant
+
+    The returned function has a .raw attribute: the same function without
+    paramflags, taking every argument positionally. Its errcheck (if any)
+    returns the result rather than the arguments, and it is meant for hot
+    paths such as message loops.
+
+    Functions with OUTPUT_PARAMs also have a .pooled attribute, which calls
+    .raw with reused thread-local output buffers (see _pooled_call()). It
+    allocates less per call but takes longer than the function itself, so
+    it only pays in loops that make the same call many times.
 
     """
     def function_argtype(descriptor):
@@ -53,78 +332,114 @@ def _NativeFunc(kind, function_name, module_name, result_type,
             return descriptor
         return descriptor[0] if len(descriptor) == 1 else descriptor[1]
 
-    def function_argdesc(descriptor):
-        assert descriptor
-        if not isinstance(descriptor, Sequence) or len(descriptor) == 1:
-            return (INPUT_PARAM(), )
-
-        arg_desc = [[INPUT_PARAM()], [descriptor[0]], []]
-
-        for param in descriptor[2:]:
-            if param in (INPUT_PARAM, OUTPUT_PARAM):
-                arg_desc[0] = param()
-            else:
-                arg_desc[-1] = param
-
-        return tuple(_flattened(arg_desc))
-
     module_type, function_type = kind
-    module = getattr(module_type, module_name)
 
-    arg_types = (function_argtype(elem) for elem in argument_descriptors)
+    arg_types = tuple(function_argtype(elem) for elem in argument_descriptors)
     prototype = function_type(result_type, *arg_types)
+    _prototypes.add(prototype)
 
-    param_flags = tuple(
-        function_argdesc(elem) for elem in argument_descriptors)
+    param_flags = _precomputed_param_flags(module_name, function_name,
+                                           argument_descriptors)
+    if param_flags is None:
+        param_flags = _param_flags(argument_descriptors)
 
-    return prototype((function_name, module), param_flags)
+    def bind():
+        module = _load_library(module_type, module_name)
+        function = prototype((function_name, module), param_flags)
+        function.raw = prototype((function_name, module))
+        if raw_errcheck:
+            function.raw.errcheck = raw_errcheck
+        _counters['resolved'] += 1
+
+        function = call_stats.instrument(bind.__qualname__, function)
+        if any(flags[0] == OUTPUT_PARAM() for flags in param_flags):
+            function.pooled = _pooled_call(function.raw, arg_types,
+                                           param_flags)
+        return function
+    bind.__qualname__ = '{}!{}'.format(module_name, function_name)
+    _counters['bindings'] += 1
+
+    if lazy:
+        return _LazyNativeFunc(bind, namespace)
+    return bind()
 
 
 def Win32Func(function_name, module_name, result_type, argument_descriptors,
-              success_predicate=DEFAULT_WIN32_SUCCESS):
-    function = _NativeFunc(FuncType.Win32, function_name, module_name,
-                           result_type, argument_descriptors)
-    if success_predicate:
+              success_predicate=DEFAULT_WIN32_SUCCESS, lazy=None):
+    if lazy is None:
+        lazy = lazy_binding
+
+    # The default predicate only makes sense for functions returning BOOL.
+    is_unknown_restype = (success_predicate is DEFAULT_WIN32_SUCCESS
+                          and result_type != ctypes.wintypes.BOOL)
+    errcheck = raw_errcheck = None
+    if success_predicate and not is_unknown_restype:
         def errcheck(result, func, args):
-            is_unknown_restype = (success_predicate is DEFAULT_WIN32_SUCCESS
-                                  and result_type != ctypes.wintypes.BOOL)
-            if (not is_unknown_restype
-                    and not success_predicate(result, func, args)):
+            if not success_predicate(result, func, args):
                 raise WinError(get_last_error())
             return args
 
+        def raw_errcheck(result, func, args):
+            if not success_predicate(result, func, args):
+                raise WinError(get_last_error())
+            return result
+
+    function = _NativeFunc(FuncType.Win32, function_name, module_name,
+                           result_type, argument_descriptors, lazy,
+                           _caller_globals() if lazy else None, raw_errcheck)
+    if errcheck:
         function.errcheck = errcheck
 
     return function
 
 
 def Win32OLEFunc(function_name, module_name, result_type,
-                 argument_descriptors):
+                 argument_descriptors, lazy=None):
+    if lazy is None:
+        lazy = lazy_binding
     return _NativeFunc(FuncType.Win32OLE, function_name, module_name,
-                       result_type, argument_descriptors)
+                       result_type, argument_descriptors, lazy,
+                       _caller_globals() if lazy else None)
+
+
+# ctypes type codes of the integer types, like c_int and DWORD.
+_SIGNED_TYPE_CODES = frozenset('bhilq')
+_INTEGRAL_TYPE_CODES = _SIGNED_TYPE_CODES | frozenset('BHILQ')
+
+
+def _is_integral(ctype, type_codes=_INTEGRAL_TYPE_CODES):
+    # Pointers, structures and c_char_p aren't; neither is c_bool.
+    return (isinstance(ctype, type)
+            and issubclass(ctype, ctypes._SimpleCData)
+            and ctype._type_ in type_codes)
 
 
 def CFunc(function_name, module_name, result_type, argument_descriptors,
-          success_predicate=DEFAULT_C_SUCCESS):
-    function = _NativeFunc(FuncType.C, function_name, module_name,
-                           result_type, argument_descriptors)
-    if success_predicate:
-        def is_integral(type):
-            try:
-                type() < int()
-                return True
-            except TypeError:
-                return False
-
-        is_unknown_restype = (success_predicate is DEFAULT_C_SUCCESS
-                              and not is_integral(result_type))
+          success_predicate=DEFAULT_C_SUCCESS, lazy=None):
+    if lazy is None:
+        lazy = lazy_binding
 
+    # The default predicate only makes sense for signed integral return
+    # types: it can never fail for unsigned ones, like size_t.
+    is_unknown_restype = (success_predicate is DEFAULT_C_SUCCESS
+                          and not _is_integral(result_type,
+                                               _SIGNED_TYPE_CODES))
+    errcheck = raw_errcheck = None
+    if success_predicate and not is_unknown_restype:
         def errcheck(result, func, args):
-            if (not is_unknown_restype
-                    and not success_predicate(result, func, args)):
+            if not success_predicate(result, func, args):
                 raise OSError(get_errno(), os.strerror(get_errno()))
             return args
 
+        def raw_errcheck(result, func, args):
+            if not success_predicate(result, func, args):
+                raise OSError(get_errno(), os.strerror(get_errno()))
+            return result
+
+    function = _NativeFunc(FuncType.C, function_name, module_name,
+                           result_type, argument_descriptors, lazy,
+                           _caller_globals() if lazy else None, raw_errcheck)
+    if errcheck:
         function.errcheck = errcheck
 
     return function
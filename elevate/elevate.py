@@ -1,16 +1,18 @@
-from . import win32, libc, utilities
+from . import (win32, libc, utilities, error_messages, ctypes_utils,
+               command_line, environment, protocol, relay, path_index,
+               unc_prefixes)
 
 from collections import namedtuple
 import argparse
+import contextlib
 import ctypes
 import os
 import shutil
 import sys
+import threading
 import traceback
 import logging
-import multiprocessing
-from multiprocessing.connection import Listener, Client
-from base64 import b64encode, b64decode
+import time
 
 def elevate_appdata_path():
     appdata_folder = win32.SHGetKnownFolderPath(
@@ -35,17 +37,24 @@ def pythonw_interpreter_path():
     return os.path.join(head, 'pythonw' + ext)
 
 def path_to_current_script():
-    absolute_script_path = os.path.abspath(sys.argv[0])
+    main_spec = getattr(sys.modules['__main__'], '__spec__', None)
+    if main_spec and main_spec.name.partition('.')[0] == __package__:
+        # We were run with -m, so sys.argv[0] is a module of the package,
+        # which can't run as a script; the package's __main__ can.
+        absolute_script_path = os.path.join(os.path.dirname(__file__),
+                                            '__main__.py')
+    else:
+        absolute_script_path = os.path.abspath(sys.argv[0])
 
     # Handle case where we're on a mapped network drive. When we're relaunched
-    # as admin, drive mappings seem to be no longer there.
-    try:
-        return utilities.unc_name_for_path(absolute_script_path)
-    except OSError as e:
-        if e.winerror in (win32.ERROR_NOT_CONNECTED, win32.ERROR_BAD_DEVICE):
-            return absolute_script_path
-        else:
-            raise
+    # as admin, drive mappings seem to be no longer there. Asking the network
+    # redirector can stall, so remember each drive's share for a while.
+    cache_path = os.path.join(elevate_appdata_path(), 'unc-prefixes.json')
+    prefixes = unc_prefixes.UncPrefixes.load(
+        cache_path, utilities.unc_name_for_path, utilities.logon_sid())
+    script_path = prefixes.translate(absolute_script_path)
+    prefixes.save(cache_path)
+    return script_path
 
 
 def write_console(s, console=win32.STD_OUTPUT_HANDLE):
@@ -103,26 +112,145 @@ def attach_to_parent_console():
                      getattr(libc, handle_info.name))
 
 
-def spawn_user_process_sync(argv, environment):
+# Children inherit every inheritable handle, so a broker spawning for
+# several clients at once must not let one client's handles leak to another.
+_inheritable_handles_lock = threading.Lock()
+
+
+def client_std_handles(channel, request):
+    """Duplicate the std handles of the client connected to |channel|, a
+    broker pipe, into this process."""
+    # Ask the pipe who the client is: the request is only its word for it,
+    # and any process in the session may connect.
+    process_id = win32.GetNamedPipeClientProcessId(channel.stream.handle)
+    if process_id != request.process_id:
+        raise PermissionError(
+            'client process {} claims to be process {}'.format(
+                process_id, request.process_id))
+    client = process_from_pid_safe(process_id, request.process_start_time)
+    if not client:
+        raise ProcessLookupError(
+            'client process {} has exited'.format(process_id))
+    try:
+        return tuple(
+            win32.DuplicateHandle(client, handle, win32.GetCurrentProcess())
+            if handle else None
+            for handle in request.std_handles)
+    finally:
+        win32.CloseHandle(client)
+
+
+def spawn_user_process_sync(argv, environment, spill_policy=None,
+                            std_handles=None):
+    """Run |argv|, wait for it and return its exit code and
+    protocol.Usage.
+
+    Given |std_handles|, handles for its stdin, stdout and stderr (or None),
+    the process gets those instead of our console, which a broker doesn't
+    have. They are closed once the process has them.
+    """
     # FIXME: we need a win32 message pump to avoid the caller getting the 
     #        wait cursor.
 
-    # MSDN says CreateProcess needs a mutable string
-    command_line = utilities.argv_to_command_line(argv)
-    command_line_mutable = ctypes.create_unicode_buffer(command_line)
-
-    startup_info = win32.STARTUPINFO()
-    startup_info.cb = ctypes.sizeof(win32.STARTUPINFO)
+    # Close the handles even if we fail before creating the process, as a
+    # reader of a pipe waits for every write handle to close.
+    close_std_handles = contextlib.ExitStack()
+    for handle in set(filter(None, std_handles or ())):
+        close_std_handles.callback(win32.CloseHandle, handle)
+
+    with close_std_handles, \
+            command_line.command_line_for(argv, spill_policy) as cmd_line:
+        # MSDN says CreateProcess needs a mutable string
+        command_line_mutable = ctypes.create_unicode_buffer(cmd_line)
+
+        startup_info = ctypes_utils.scratch(win32.STARTUPINFO)
+        startup_info.cb = ctypes.sizeof(win32.STARTUPINFO)
+
+        if std_handles is None:
+            proc_info = win32.CreateProcess(argv[0],
+                command_line_mutable,
+                startup_info=startup_info,
+                environment=environment,
+                creation_flags=win32.CREATE_UNICODE_ENVIRONMENT)
+        else:
+            # Only make the handles inheritable for as long as it takes to
+            # create this process.
+            with _inheritable_handles_lock:
+                for handle in set(filter(None, std_handles)):
+                    win32.SetHandleInformation(handle,
+                                               win32.HANDLE_FLAG_INHERIT,
+                                               win32.HANDLE_FLAG_INHERIT)
+                startup_info.flags = win32.STARTF_USESTDHANDLES
+                (startup_info.std_input, startup_info.std_output,
+                 startup_info.std_error) = std_handles
+                proc_info = win32.CreateProcess(argv[0],
+                    command_line_mutable,
+                    inherit_handles=True,
+                    startup_info=startup_info,
+                    environment=environment,
+                    creation_flags=(win32.CREATE_UNICODE_ENVIRONMENT
+                                    | win32.CREATE_NO_WINDOW))
+            close_std_handles.close()
+
+        # A broker lives long enough for leaked handles to add up.
+        win32.CloseHandle(proc_info.thread)
+        try:
+            win32.WaitForSingleObject(proc_info.process, win32.INFINITE)
+            return (win32.GetExitCodeProcess(proc_info.process),
+                    process_usage(proc_info.process))
+        finally:
+            win32.CloseHandle(proc_info.process)
+
+
+def process_usage(process):
+    """The CPU times and peak memory of |process|, which has exited."""
+    _, _, kernel_time, user_time = win32.GetProcessTimes(process)
+    counters = win32.GetProcessMemoryInfo(
+        process, ctypes.sizeof(win32.PROCESS_MEMORY_COUNTERS))
+    # FILETIMEs count 100 ns intervals.
+    return protocol.Usage(int(user_time) / 1e7, int(kernel_time) / 1e7,
+                          counters.peak_working_set_size)
+
+
+def capture_output(argv, environment, spill_policy=None):
+    """Run |argv| with its stdout and stderr going to a pipe, and return its
+    exit code, everything it wrote and its protocol.Usage."""
+    read_handle, write_handle = win32.CreatePipe()
+    output = []
+    with utilities.handle_stream(read_handle, 'rb') as pipe:
+        # Drain the pipe as the process writes, so it never blocks on a
+        # full pipe.
+        reader = threading.Thread(target=lambda: output.append(pipe.read()))
+        reader.start()
+        try:
+            exit_code, usage = spawn_user_process_sync(
+                argv, environment, spill_policy,
+                (None, write_handle, write_handle))
+        finally:
+            reader.join()
+    return exit_code, output[0], usage
+
+
+def spawn_relayed(channel, argv, environment, spill_policy=None):
+    """Run |argv| with its std streams relayed to the client over |channel|
+    (see elevate.relay), and return its exit code and protocol.Usage."""
+    stdin_read, stdin_write = win32.CreatePipe(size=relay.BUFFER_SIZE)
+    stdout_read, stdout_write = win32.CreatePipe(size=relay.BUFFER_SIZE)
+    stderr_read, stderr_write = win32.CreatePipe(size=relay.BUFFER_SIZE)
+    streams = relay.HelperRelay(
+        channel, utilities.handle_stream(stdin_write, 'wb'),
+        utilities.handle_stream(stdout_read, 'rb'),
+        utilities.handle_stream(stderr_read, 'rb'))
+    streams.start()
+    try:
+        return spawn_user_process_sync(
+            argv, environment, spill_policy,
+            (stdin_read, stdout_write, stderr_write))
+    finally:
+        # The pumps finish once the process, and anything it started that
+        # inherited its stdout and stderr, has exited.
+        streams.join()
 
-    proc_info = win32.CreateProcess(argv[0],
-        command_line_mutable,
-        startup_info=startup_info,
-        environment=environment,
-        creation_flags=win32.CREATE_UNICODE_ENVIRONMENT)
-    
-    win32.WaitForSingleObject(proc_info.process, win32.INFINITE)
-    # FIXME exit code
-    win32.CloseHandle(proc_info.process)
 
 def process_start_time(process_handle):
     return int(win32.GetProcessTimes(process_handle)[0])
@@ -133,14 +261,121 @@ def standard_handles():
     return tuple(win32.GetStdHandle(x) for x in handle_ids)
 
 
-def launch_privileged_helper_sync(argv):
-    resolved_path = shutil.which(argv[0])
+def is_redirected(handles):
+    """Whether the stdout or stderr in |handles| is a pipe or file rather
+    than a console, which a command run on our console couldn't write to."""
+    return any(handle and win32.GetFileType(handle) != win32.FILE_TYPE_CHAR
+               for handle in handles[1:])
+
+
+def client_relay(channel):
+    """A relay.ClientRelay between |channel| and our std streams."""
+    return relay.ClientRelay(
+        channel,
+        open(0, 'rb', buffering=0, closefd=False),
+        open(1, 'wb', buffering=0, closefd=False),
+        open(2, 'wb', buffering=0, closefd=False))
+
+
+def resolve_command(argv, spill, which=shutil.which):
+    resolved_path = which(argv[0])
     if not resolved_path:
         print("File '{}' was not found.".format(argv[0]), file=sys.stderr)
         sys.exit(1)
-    
-    authkey = multiprocessing.current_process().authkey
-    authkey_base64 = b64encode(authkey).decode("ascii")
+
+    # The command itself travels over the pipe, so only the helper's
+    # CreateProcess() call is subject to the command line limit. Fail here,
+    # before the UAC prompt, if the helper would refuse it anyway.
+    command = [resolved_path] + argv[1:]
+    if spill == 'fail':
+        try:
+            with command_line.command_line_for(command):
+                pass
+        except command_line.CommandLineTooLong as e:
+            print('{}. Try --spill response-file.'.format(e), file=sys.stderr)
+            sys.exit(1)
+    return command
+
+
+def launch_privileged_helper_sync(commands, spill='fail',
+                                  environment_overrides=None,
+                                  broker_timeout=None, jobs=None,
+                                  dependencies=None, names=None,
+                                  time_commands=False):
+    """Run |commands|, a list of argvs, elevated.
+
+    Given |jobs|, they run as a batch, up to |jobs| at a time and after the
+    indices in their |dependencies|, if given. Each command's result and
+    output are printed as it finishes, labelled with its name from |names|,
+    if given, and the protocol.Results are returned. Otherwise there must
+    be a single command, which runs on our console, and the result is its
+    protocol.Result alone. If our stdout or stderr is redirected, its
+    streams are relayed to ours instead. With |time_commands|, a
+    time(1)-style report follows each command's output on stderr.
+    """
+    # Resolving commands is a noticeable part of startup with a long PATH,
+    # so keep an index of the PATH directories between runs.
+    index_path = os.path.join(elevate_appdata_path(), 'path-index.json')
+    index = path_index.PathIndex.load(index_path)
+    commands = [resolve_command(argv, spill, index.which) for argv in commands]
+    index.save(index_path)
+    command = request_batch = None
+    if jobs is None:
+        command, = commands
+    else:
+        request_batch = protocol.Batch(commands, jobs, dependencies)
+    if request_batch or time_commands:
+        from . import batch
+
+    results = []
+
+    def on_result(result):
+        if request_batch:
+            print(batch.describe(result, commands, names), flush=True)
+            sys.stdout.buffer.write(result.output)
+            sys.stdout.flush()
+        if time_commands:
+            print(batch.time_summary(result), file=sys.stderr, flush=True)
+        results.append(result)
+
+    environment_block = environment.EnvironmentBlock(
+        utilities.environment_block_snapshot())
+    baseline = environment.EnvironmentBlock(
+        utilities.default_environment_block())
+
+    std_handles = standard_handles()
+    request = protocol.Request(
+        process_id=win32.GetCurrentProcessId(),
+        process_start_time=process_start_time(win32.GetCurrentProcess()),
+        std_handles=std_handles,
+        command=command,
+        spill=spill,
+        environment_overrides=environment_overrides or {},
+        batch=request_batch,
+        relay=command is not None and is_redirected(std_handles))
+
+    helper_args = []
+    if broker_timeout is not None:
+        from . import broker
+        logon_sid = utilities.logon_sid()
+        channel = utilities.connect_broker(
+            utilities.broker_pipe_name(logon_sid))
+        if channel:
+            with channel:
+                streams = client_relay(channel) if request.relay else None
+                if broker.submit(channel, request, environment_block,
+                                 baseline, on_result, streams):
+                    logging.debug('Request served by the broker')
+                    return results
+            logging.debug('Broker is exiting; launching a new helper')
+        # Have the helper stay on as the broker.
+        helper_args += ['--broker-sid', logon_sid,
+                        '--broker-timeout', str(broker_timeout)]
+
+    # The helper collects the token through a handle, so the secret never
+    # appears on its command line.
+    token = os.urandom(protocol.TOKEN_SIZE)
+    token_handle = utilities.create_token_pipe(token)
 
     exec_info = win32.SHELLEXECUTEINFO()
     exec_info.size = ctypes.sizeof(exec_info)
@@ -151,24 +386,19 @@ def launch_privileged_helper_sync(argv):
     exec_info.show = win32.SW_SHOWNORMAL
     exec_info.file = pythonw_interpreter_path()
 
-    message = {
-        'process_id': win32.GetCurrentProcessId(),
-        'process_start_time':
-            process_start_time(win32.GetCurrentProcess()),
-        'environment_block': utilities.environment_block_snapshot(),
-        'std_handles': standard_handles(),
-        'command': [resolved_path] + argv[1:]
-    }
-    
-    with Listener(authkey=authkey) as server:
+    pipe_name = utilities.unique_pipe_name()
+    pipe = utilities.create_pipe_server(pipe_name)
+    with protocol.Channel(utilities.PipeStream(pipe)) as channel:
         exec_info.parameters = utilities.argv_to_command_line([
             path_to_current_script(),
-            '--pipe', server.address,
-            '--authkey', authkey_base64])
+            '--pipe', pipe_name,
+            '--client', str(win32.GetCurrentProcessId()),
+            '--token', str(token_handle)] + helper_args)
 
         try:
             logging.debug('Launching {} {}'.format(exec_info.file,
                           exec_info.parameters))
+            launch_start = time.perf_counter()
             win32.ShellExecuteEx(ctypes.byref(exec_info))
         except OSError as e:
             if e.winerror == win32.ERROR_CANCELLED:
@@ -176,14 +406,32 @@ def launch_privileged_helper_sync(argv):
                 sys.exit(1)
             else:
                 raise
-        
-        logging.debug("Will send message {}".format(message))
-        with server.accept() as conn:
-            # xxx
-            conn.send(message)
-            win32.WaitForSingleObject(exec_info.process, win32.INFINITE)
-            # FIXME exit code
-            win32.CloseHandle(exec_info.process)
+
+        launched = time.perf_counter()
+        utilities.wait_for_pipe_client(pipe)
+        connected = time.perf_counter()
+        protocol.welcome(channel, token)
+        logging.debug(
+            'Helper launched in {:.1f} ms, connected {:.1f} ms later; '
+            'handshake took {:.1f} ms'.format(
+                (launched - launch_start) * 1e3,
+                (connected - launched) * 1e3,
+                (time.perf_counter() - connected) * 1e3))
+
+        logging.debug("Will send request {}".format(request))
+        protocol.send_request(channel, request)
+        protocol.send_environment(channel, environment_block, baseline)
+        on_stream = None
+        if request.relay:
+            streams = client_relay(channel)
+            streams.start()
+            on_stream = streams.on_stream
+        # A helper that stays on as the broker doesn't exit, so wait for
+        # its word that the request has finished instead.
+        for result in protocol.receive_results(channel, on_stream):
+            on_result(result)
+        win32.CloseHandle(exec_info.process)
+    return results
 
 
 def process_from_pid_safe(pid, start_time):
@@ -194,7 +442,87 @@ def process_from_pid_safe(pid, start_time):
             rval, process_handle = process_handle, None
             return rval
     finally:
-        win32.CloseHandle(process_handle)
+        if process_handle:
+            win32.CloseHandle(process_handle)
+
+
+def environment_baselines():
+    """Environments the client's environment may arrive as a delta against:
+    the one a fresh process of the user gets, which is usually what we were
+    started with, then our own."""
+    for snapshot in (utilities.default_environment_block,
+                     utilities.environment_block_snapshot):
+        yield environment.EnvironmentBlock(snapshot())
+
+
+def run_request(channel, request, environment_block,
+                use_client_std_handles=False):
+    spill_policy = command_line.SPILL_POLICIES[request.spill]()
+    if request.batch is not None:
+        from . import batch
+        try:
+            env = bytes(environment.build(environment_block,
+                                          request.environment_overrides))
+        except ValueError as e:
+            # Every command fails to start, saying why.
+            error = e
+
+            def run_command(argv):
+                raise error
+        else:
+            def run_command(argv):
+                return capture_output(argv, env, spill_policy)
+        batch.run(channel, request.batch, run_command)
+        return
+
+    start = time.perf_counter()
+    output = b''
+    try:
+        # The client checks the overrides, but a broker can't count on it.
+        env = bytes(environment.build(environment_block,
+                                      request.environment_overrides))
+        if request.relay:
+            exit_code, usage = spawn_relayed(channel, request.command, env,
+                                             spill_policy)
+        else:
+            exit_code, usage = spawn_user_process_sync(
+                request.command, env, spill_policy,
+                client_std_handles(channel, request)
+                if use_client_std_handles else None)
+    except Exception as e:
+        # Tell the client why, as batch.run() does for each command, rather
+        # than leaving it to find the channel closed.
+        logging.exception('Failed to start {}'.format(request.command))
+        exit_code, output, usage = None, '{}\n'.format(e).encode('utf-8'), None
+    protocol.send_result(channel, protocol.Result(
+        0, exit_code, time.perf_counter() - start, output, usage=usage))
+
+
+def serve_as_broker(logon_sid, idle_timeout):
+    """Stay resident, serving later elevate calls from the logon session
+    |logon_sid| until idle for |idle_timeout| seconds."""
+    from . import broker
+    try:
+        listener = utilities.PipeListener(
+            utilities.broker_pipe_name(logon_sid), logon_sid)
+    except PermissionError:
+        logging.debug('Another process owns the broker pipe')
+        return
+
+    # Later clients may be in other consoles; their commands get the
+    # clients' std handles, so don't keep the first one's console alive.
+    win32.FreeConsole()
+    baselines = list(environment_baselines())
+
+    def handler(channel):
+        broker.handle(channel, baselines,
+                      lambda channel, request, environment_block: run_request(
+                          channel, request, environment_block,
+                          use_client_std_handles=True))
+
+    logging.debug('Serving as the broker for {}'.format(logon_sid))
+    served = broker.Broker(listener, handler, idle_timeout).serve()
+    logging.debug('Broker served {} clients'.format(served))
 
 
 def try_except(fn):
@@ -203,6 +531,9 @@ def try_except(fn):
             return fn(*args, **kwargs)
         except:
             logging.error(traceback.format_exc())
+            winerror = getattr(sys.exc_info()[1], 'winerror', None)
+            if winerror is not None:
+                logging.error(error_messages.describe(winerror))
             raise
     return wrapped
 
@@ -214,27 +545,154 @@ def main():
     if utilities.is_elevated():
         logging.debug('Privileged helper launched')
         parser.add_argument('--pipe', help=argparse.SUPPRESS)
-        parser.add_argument('--authkey', help=argparse.SUPPRESS)            
+        parser.add_argument('--client', type=int, help=argparse.SUPPRESS)
+        parser.add_argument('--token', type=int, help=argparse.SUPPRESS)
+        parser.add_argument('--broker-sid', help=argparse.SUPPRESS)
+        parser.add_argument('--broker-timeout', type=float,
+                            help=argparse.SUPPRESS)
         args = parser.parse_args()
 
         logging.debug('Attaching to console')
         attach_to_parent_console()
 
         assert args.pipe
-        with Client(args.pipe, authkey=b64decode(args.authkey)) as conn:
-            message = conn.recv()
-        
-        env = message['environment_block']
-        argv = message['command']
-        spawn_user_process_sync(argv, env)
+        token = utilities.take_token(args.client, args.token,
+                                     protocol.TOKEN_SIZE)
+        from . import broker
+        with protocol.Channel(utilities.connect_pipe(args.pipe)) as channel:
+            protocol.greet(channel, token)
+            broker.handle(channel, environment_baselines(), run_request)
+
+        if args.broker_sid:
+            serve_as_broker(args.broker_sid, args.broker_timeout)
 
     else:
-        parser.add_argument('command', help='the command to run')
+        parser.add_argument(
+            '--spill', choices=sorted(command_line.SPILL_POLICIES),
+            default='fail',
+            help='what to do if the command line is too long for Windows')
+        parser.add_argument(
+            '-e', '--env', action='append', default=[], metavar='NAME=VALUE',
+            help='set an environment variable for the command')
+        parser.add_argument(
+            '-u', '--unset', action='append', default=[], metavar='NAME',
+            help='remove an environment variable for the command')
+        parser.add_argument(
+            '--broker', action='store_true',
+            help='keep the elevated helper running, so later calls from '
+                 'this logon session skip the UAC prompt')
+        parser.add_argument(
+            '--broker-timeout', type=float, metavar='SECONDS',
+            help='how long an idle broker keeps running (default: five '
+                 'minutes, like sudo)')
+        parser.add_argument(
+            '--batch', metavar='FILE',
+            help="run every command in FILE ('-' for stdin), one command "
+                 "line per line, under a single elevation")
+        parser.add_argument(
+            '--plan', metavar='FILE',
+            help='run the steps in the JSON plan FILE, each after the steps '
+                 'it depends on, under a single elevation')
+        parser.add_argument(
+            '-j', '--jobs', type=int, metavar='N',
+            help='with --batch or --plan, run up to N commands at once '
+                 '(default: 1 for --batch, and as many as are ready for '
+                 '--plan)')
+        parser.add_argument(
+            '--time', action='store_true',
+            help="report each command's wall time, CPU time and peak memory "
+                 'on stderr')
+        parser.add_argument('command', nargs='?', help='the command to run')
         parser.add_argument('args', nargs=argparse.REMAINDER,
                             help=argparse.SUPPRESS)
         
         args = parser.parse_args()
-        launch_privileged_helper_sync([args.command] + args.args)
+
+        overrides = dict.fromkeys(args.unset)
+        for assignment in args.env:
+            name, separator, value = assignment[1:].partition('=')
+            if not separator:
+                parser.error('--env expects NAME=VALUE, not {!r}'.format(
+                    assignment))
+            overrides[assignment[0] + name] = value
+        for name, value in overrides.items():
+            try:
+                environment._check_variable(name, value)
+            except ValueError as e:
+                parser.error(str(e))
+
+        if args.jobs is not None and args.jobs < 1:
+            parser.error('--jobs must be at least 1')
+        if sum(map(bool, (args.batch, args.plan, args.command))) != 1:
+            parser.error('give one of a command, --batch or --plan')
+
+        jobs = dependencies = names = steps = None
+        if args.batch:
+            from . import batch
+            if args.batch == '-':
+                commands = batch.read_commands(sys.stdin)
+            else:
+                with open(args.batch, encoding='utf-8') as f:
+                    commands = batch.read_commands(f)
+            if not commands:
+                parser.error('{} has no commands'.format(args.batch))
+            jobs = args.jobs or 1
+        elif args.plan:
+            from . import batch, plan
+            try:
+                with open(args.plan, encoding='utf-8') as f:
+                    steps = plan.load(f)
+            except plan.PlanError as e:
+                parser.error('{}: {}'.format(args.plan, e))
+            commands = steps.commands
+            dependencies = steps.dependencies
+            names = steps.names
+            jobs = args.jobs or steps.jobs
+        else:
+            commands = [[args.command] + args.args]
+
+        broker_timeout = None
+        if args.broker:
+            from . import broker
+            broker_timeout = args.broker_timeout
+            if broker_timeout is None:
+                broker_timeout = broker.DEFAULT_IDLE_TIMEOUT
+
+        start = time.perf_counter()
+        results = launch_privileged_helper_sync(
+            commands,
+            spill=args.spill,
+            environment_overrides=overrides,
+            broker_timeout=broker_timeout,
+            jobs=jobs,
+            dependencies=dependencies,
+            names=names,
+            time_commands=args.time)
+        if steps:
+            print(plan.summary(steps, results, time.perf_counter() - start),
+                  file=sys.stderr)
+        if jobs is None:
+            result, = results
+            if result.exit_code is None:
+                # The command failed to start; its output says why.
+                print("Couldn't start {}: {}".format(
+                    commands[0][0],
+                    bytes(result.output).decode('utf-8', 'replace').strip()),
+                    file=sys.stderr)
+                sys.exit(1)
+            # Exit codes are DWORDs, like 0xC0000005; sys.exit() wants an
+            # int that fits in a C long.
+            if result.exit_code:
+                sys.exit(ctypes.c_int32(result.exit_code).value)
+        else:
+            failures = sum(not batch.succeeded(result)
+                           for result in results)
+            if failures:
+                print('{} of {} commands failed'.format(
+                    failures, len(commands)), file=sys.stderr)
+                sys.exit(1)
+
+    logging.debug('Bindings: {}'.format(ctypes_utils.binding_report()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,251 @@
+"""Windows environment blocks.
+
+An environment block, as returned by GetEnvironmentStrings() and taken by
+CreateProcess() with CREATE_UNICODE_ENVIRONMENT, is a sequence of
+NUL-terminated UTF-16 'name=value' strings, ending with an empty string.
+
+Nothing here calls Windows, so blocks can be built and parsed anywhere.
+"""
+import ctypes
+import hashlib
+import re
+import threading
+from codecs import utf_16_le_decode
+from collections import OrderedDict
+from collections.abc import Mapping
+
+_PAGE_SIZE = 4096
+
+# Two NUL code units in a row. Only a match at an even offset is the block
+# terminator; at an odd offset it spans two code units that merely end and
+# begin with a zero byte.
+_TERMINATOR = re.compile(rb'\0\0\0\0')
+
+
+def block_length(data):
+    """Length in bytes of the environment block at the start of |data|, up
+    to and including its terminator.
+
+    Raises ValueError if |data| doesn't contain a complete block.
+    """
+    length = _find_terminator(data, 0)
+    if length < 0:
+        raise ValueError('environment block is not terminated')
+    return length
+
+
+def _find_terminator(data, start):
+    """Return the length of the block in |data| if its terminator lies at or
+    after byte offset |start| (which must be even), else -1."""
+    if start == 0 and bytes(data[:2]) == b'\0\0':
+        # An empty block is a lone empty string.
+        return 4 if bytes(data[2:4]) == b'\0\0' else 2
+
+    match = _TERMINATOR.search(data, start)
+    while match:
+        offset = match.start()
+        if offset % 2 == 0:
+            return offset + 4
+        match = _TERMINATOR.search(data, offset + 1)
+    return -1
+
+
+def _scan_native_block(address):
+    """Length of the block at |address|, read a page at a time so the scan
+    never reads past the page holding the terminator."""
+    end = (address // _PAGE_SIZE + 1) * _PAGE_SIZE
+    start = 0
+    while True:
+        window = memoryview((ctypes.c_char * (end - address)).from_address(
+            address))
+        length = _find_terminator(window, start)
+        if length >= 0:
+            return length
+        # The terminator might straddle the page boundary.
+        start = max(0, (end - address - 3) & ~1)
+        end += _PAGE_SIZE
+
+
+class EnvironmentBlock(Mapping):
+
+    """A read-only, case-insensitive mapping over an environment block.
+
+    The block is kept as a memoryview of the original buffer; nothing is
+    copied or decoded until bytes() is called or a variable is looked up.
+    The first lookup decodes the block once and indexes it by upper-cased
+    name. If a name appears more than once, the first occurrence wins, as
+    it does for GetEnvironmentVariable().
+    """
+
+    def __init__(self, data):
+        view = memoryview(data).cast('B')
+        self.buffer = view[:block_length(view)]
+        self._index = None
+        self._digest = None
+
+    @classmethod
+    def from_address(cls, address):
+        """Wrap the block at |address| without copying it. The result is only
+        valid while that memory is."""
+        length = _scan_native_block(address)
+        return cls((ctypes.c_char * length).from_address(address))
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """Serialise |mapping|, in its iteration order."""
+        return cls(serialize(mapping.items()))
+
+    def __bytes__(self):
+        return self.buffer.tobytes()
+
+    def __eq__(self, other):
+        if isinstance(other, EnvironmentBlock):
+            return self.buffer == other.buffer
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def digest(self):
+        """A hash of the block's contents, computed once."""
+        if self._digest is None:
+            self._digest = content_hash(self.buffer)
+        return self._digest
+
+    def _entries(self):
+        # One bulk decode is much cheaper than walking the entries in Python
+        # to decode just their names.
+        index = {}
+        for entry in utf_16_le_decode(self.buffer)[0].split('\0'):
+            # The first character of a name may be '=': cmd.exe keeps
+            # per-drive directories in variables like '=C:'.
+            separator = entry.find('=', 1)
+            if separator > 0:
+                name = entry[:separator]
+                index.setdefault(name.upper(), (name, entry[separator + 1:]))
+        return index
+
+    def _names(self):
+        if self._index is None:
+            self._index = self._entries()
+        return self._index
+
+    def __getitem__(self, name):
+        return self._names()[name.upper()][1]
+
+    def __contains__(self, name):
+        return isinstance(name, str) and name.upper() in self._names()
+
+    def __iter__(self):
+        return (name for name, _ in self._names().values())
+
+    def __len__(self):
+        return len(self._names())
+
+    def __repr__(self):
+        return '<{} of {} bytes>'.format(type(self).__name__,
+                                          len(self.buffer))
+
+
+def serialize(items):
+    """Encode (name, value) pairs, in the given order, as a block."""
+    strings = ['{}={}\0'.format(name, value) for name, value in items]
+    return (''.join(strings) or '\0').encode('utf-16-le') + b'\0\0'
+
+
+def content_hash(data):
+    # SHA-256 is hardware-accelerated on current CPUs, so it beats the
+    # nominally faster hashes here.
+    return hashlib.sha256(data).digest()[:16]
+
+
+def _check_variable(name, value):
+    if not name or '=' in name[1:] or '\0' in name:
+        raise ValueError(
+            'invalid environment variable name {!r}'.format(name))
+    if value is not None and '\0' in value:
+        raise ValueError('environment variable {} contains a NUL'.format(name))
+
+
+_BUILD_CACHE_SIZE = 16
+_build_cache = OrderedDict()
+_build_cache_lock = threading.Lock()
+
+
+def build(base, overrides=None):
+    """Return an EnvironmentBlock with |base|'s variables updated by
+    |overrides|, a mapping of name to value, or to None to remove the
+    variable.
+
+    Names are matched case-insensitively, keeping the first of any
+    duplicates in |base|, and the result is sorted by upper-cased name, as
+    CreateProcess() expects. Results are cached by the contents of |base|
+    and |overrides|, so building the same environment again is just a hash
+    of |base|.
+    """
+    overrides = dict(overrides or {})
+    for name, value in overrides.items():
+        _check_variable(name, value)
+
+    key = (base.digest(), tuple(sorted(overrides.items(),
+                                       key=lambda item: item[0])))
+    with _build_cache_lock:
+        block = _build_cache.get(key)
+        if block is not None:
+            _build_cache.move_to_end(key)
+            return block
+
+    variables = dict(base._names())
+    for name, value in overrides.items():
+        if value is None:
+            variables.pop(name.upper(), None)
+        else:
+            variables[name.upper()] = (name, value)
+    block = EnvironmentBlock(serialize(
+        variables[upper] for upper in sorted(variables)))
+
+    with _build_cache_lock:
+        _build_cache[key] = block
+        while len(_build_cache) > _BUILD_CACHE_SIZE:
+            _build_cache.popitem(last=False)
+    return block
+
+
+def diff(base, target):
+    """Return the overrides which build() needs to turn |base| into
+    |target|."""
+    base_names = base._names()
+    target_names = target._names()
+    delta = {name: value
+             for upper, (name, value) in target_names.items()
+             if base_names.get(upper) != (name, value)}
+    delta.update((name, None)
+                 for upper, (name, _) in base_names.items()
+                 if upper not in target_names)
+    return delta
+
+
+def offer(block, baseline):
+    """Describe |block| as a delta against |baseline|, an environment the
+    receiver can work out for itself. Pass the result to accept()."""
+    return {
+        'digest': build(block).digest(),
+        'baseline': baseline.digest(),
+        'delta': diff(baseline, block),
+    }
+
+
+def accept(offered, baselines):
+    """Rebuild the block described by |offered| (see offer()) from whichever
+    of |baselines| it was made against.
+
+    The result is in the canonical form build() produces. Returns None if
+    none of |baselines| matches, or if the result doesn't match the digest;
+    the sender should then be asked for the whole block.
+    """
+    for baseline in baselines:
+        if baseline.digest() == offered['baseline']:
+            block = build(baseline, offered['delta'])
+            if block.digest() == offered['digest']:
+                return block
+    return None
+
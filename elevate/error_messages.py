@@ -0,0 +1,136 @@
+"""Symbolic names and message text for Win32 error codes and HRESULTs.
+
+Lookups go through _winerror_messages.bin, a memory-mapped catalogue
+generated from the MessageText blocks of winerror.h by tools/gen_winerror.py.
+No FormatMessage() call is made, so this works on any platform, and nothing
+is decoded except the strings a caller asks for.
+"""
+import mmap
+import os
+import struct
+import zlib
+
+_MAGIC = b'WMSG'
+_HEADER = struct.Struct('<4sII')
+_ENTRY = struct.Struct('<5I')
+_SLOT = struct.Struct('<I')
+
+_CATALOGUE_PATH = os.path.join(
+    os.path.dirname(__file__), '_winerror_messages.bin')
+
+
+class _Catalogue:
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, self.slot_bits = _HEADER.unpack_from(self.data)
+        if magic != _MAGIC:
+            raise ValueError('{} is corrupt'.format(path))
+
+        slot_count = 1 << self.slot_bits
+        self.mask = slot_count - 1
+        self.entries_start = _HEADER.size
+        self.code_slots_start = self.entries_start + self.count * _ENTRY.size
+        self.name_slots_start = (self.code_slots_start
+                                 + slot_count * _SLOT.size)
+        self.strings_start = self.name_slots_start + slot_count * _SLOT.size
+
+    def entry(self, index):
+        return _ENTRY.unpack_from(
+            self.data, self.entries_start + index * _ENTRY.size)
+
+    def string(self, offset, length):
+        start = self.strings_start + offset
+        return self.data[start:start + length].decode('utf-8')
+
+    def find_code(self, code):
+        code &= 0xFFFFFFFF
+        data, mask = self.data, self.mask
+        slot = ((code * 0x9E3779B1) & 0xFFFFFFFF) >> (32 - self.slot_bits)
+        while True:
+            index, = _SLOT.unpack_from(
+                data, self.code_slots_start + slot * _SLOT.size)
+            if not index:
+                return None
+            entry = self.entry(index - 1)
+            if entry[0] == code:
+                return entry
+            slot = (slot + 1) & mask
+
+    def find_name(self, name):
+        key = name.encode('ascii', 'replace')
+        data, mask = self.data, self.mask
+        slot = zlib.crc32(key) & mask
+        while True:
+            index, = _SLOT.unpack_from(
+                data, self.name_slots_start + slot * _SLOT.size)
+            if not index:
+                return None
+            entry = self.entry(index - 1)
+            start = self.strings_start + entry[1]
+            if (entry[2] == len(key)
+                    and data[start:start + entry[2]] == key):
+                return entry
+            slot = (slot + 1) & mask
+
+
+_catalogue = None
+
+
+def _get_catalogue():
+    global _catalogue
+    if _catalogue is None:
+        _catalogue = _Catalogue(_CATALOGUE_PATH)
+    return _catalogue
+
+
+def _find(catalogue, code):
+    entry = catalogue.find_code(code)
+    # HRESULT_FROM_WIN32(): fall back to the underlying Win32 error.
+    if not entry and (code & 0xFFFF0000) == 0x80070000:
+        entry = catalogue.find_code(code & 0xFFFF)
+    return entry
+
+
+def name_for_code(code):
+    """Return the symbolic name for |code| (e.g. 'ERROR_CANCELLED'), or
+    None if it isn't in the catalogue."""
+    catalogue = _get_catalogue()
+    entry = _find(catalogue, code)
+    return catalogue.string(entry[1], entry[2]) if entry else None
+
+
+def message_for_code(code):
+    """Return the message text for |code|, or None."""
+    catalogue = _get_catalogue()
+    entry = _find(catalogue, code)
+    return catalogue.string(entry[3], entry[4]) if entry else None
+
+
+def lookup(code):
+    """Return (name, message) for |code|, or None."""
+    catalogue = _get_catalogue()
+    entry = _find(catalogue, code)
+    if not entry:
+        return None
+    return (catalogue.string(entry[1], entry[2]),
+            catalogue.string(entry[3], entry[4]))
+
+
+def code_for_name(name):
+    """Return the code for the symbolic |name|, or None."""
+    entry = _get_catalogue().find_name(name)
+    return entry[0] if entry else None
+
+
+def describe(code):
+    """Return a one-line description of |code| suitable for logging, e.g.
+    'ERROR_CANCELLED (1223): The operation was canceled by the user.'"""
+    found = lookup(code)
+    if not found:
+        return 'unknown error ({:#x})'.format(code & 0xFFFFFFFF)
+    name, message = found
+    number = '{:#010x}'.format(code & 0xFFFFFFFF) if code > 0xFFFF else code
+    return '{} ({}): {}'.format(name, number, ' '.join(message.split('\n')))
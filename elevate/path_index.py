@@ -0,0 +1,204 @@
+"""Finding commands on PATH without probing every directory for them.
+
+shutil.which() checks each PATH directory for the command with each
+PATHEXT extension in turn, so a miss costs a file system call for every
+pair. A PathIndex instead lists each directory once and remembers the names
+in it, until the directory's mtime changes, which creating, deleting or
+renaming an entry does. On Windows it only remembers names with a PATHEXT
+extension, which are the only ones which() can find. A lookup then costs a
+stat() per directory searched, and the usual access check on the one
+candidate found.
+
+The index persists between runs as JSON (see load() and save()). Indexes of
+directories that have left PATH are dropped on loading, and a change to
+PATHEXT drops them all.
+
+which() returns exactly what shutil.which() does, for str commands. From
+Python 3.12, shutil.which() on Windows also tries the bare name and honours
+NoDefaultCurrentDirectoryInExePath, so there which() just calls it.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+_VERSION = 1
+
+# Whether shutil.which() searches as described above.
+_SAME_SEARCH = sys.platform != 'win32' or sys.version_info < (3, 12)
+
+# As shutil.which() defaults it.
+_DEFAULT_PATHEXT = '.COM;.EXE;.BAT;.CMD;.VBS;.JS;.WS;.MSC'
+
+# A directory changed this recently may change again without its mtime
+# moving on, so its listing isn't remembered. FAT's mtimes are 2 s apart.
+_RACY_NS = 2 * 10 ** 9
+
+
+def _pathext():
+    if sys.platform != 'win32':
+        return None
+    pathext = os.getenv('PATHEXT') or _DEFAULT_PATHEXT
+    return [ext for ext in pathext.split(os.pathsep) if ext]
+
+
+def _search_path(path):
+    if path is None:
+        path = os.environ.get('PATH', None)
+        if path is None:
+            try:
+                path = os.confstr('CS_PATH')
+            except (AttributeError, ValueError):
+                path = os.defpath
+    if not path:
+        return []
+    directories = os.fsdecode(path).split(os.pathsep)
+    if sys.platform == 'win32' and os.curdir not in directories:
+        # The current directory takes precedence on Windows.
+        directories.insert(0, os.curdir)
+    return directories
+
+
+def _access_check(name, mode):
+    return (os.path.exists(name) and os.access(name, mode)
+            and not os.path.isdir(name))
+
+
+def _join_names(names):
+    # No file name contains '/', so a directory's names are kept as one
+    # string, '/a/b/', which loads faster than a list and makes a set.
+    return '/{}/'.format('/'.join(sorted(names))) if names else '/'
+
+
+class PathIndex:
+
+    """The names in each directory searched, by normcase()d absolute path.
+    """
+
+    def __init__(self, directories=None, pathext=None):
+        self.pathext = pathext if pathext is not None else _pathext()
+        # {key: (mtime in ns, normcase()d names as _join_names() has them)}
+        self.directories = directories or {}
+        self.dirty = False
+        self._keys = {}
+        if self.pathext:
+            self._suffixes = tuple(os.path.normcase(ext)
+                                   for ext in self.pathext)
+        else:
+            self._suffixes = None
+
+    @classmethod
+    def load(cls, cache_path, path=None, pathext=None):
+        """Return the index saved at |cache_path|, less any directories not
+        on |path| (by default, PATH), or an empty index if there's none or
+        it was for another |pathext| (by default, PATHEXT on Windows)."""
+        index = cls(pathext=pathext)
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                document = json.load(f)
+            if (document['version'] != _VERSION
+                    or document['pathext'] != index.pathext):
+                return index
+            on_path = {index._key(directory)
+                       for directory in _search_path(path)}
+            index.directories = {key: (mtime, names)
+                                 for key, (mtime, names)
+                                 in document['directories'].items()
+                                 if key in on_path}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return index
+
+    def save(self, cache_path):
+        """Write the index to |cache_path|, if it has changed."""
+        if not self.dirty:
+            return
+        document = {
+            'version': _VERSION,
+            'pathext': self.pathext,
+            'directories': {key: [mtime, names]
+                            for key, (mtime, names)
+                            in self.directories.items()},
+        }
+        # Write a whole new file, in case another elevate is reading it.
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path) or os.curdir, suffix='.tmp')
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(document, f, separators=(',', ':'))
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.dirty = False
+
+    def _key(self, directory):
+        # Relative directories are relative to the current directory, which
+        # had better not change while the index is in use.
+        try:
+            return self._keys[directory]
+        except KeyError:
+            key = self._keys[directory] = os.path.normcase(
+                os.path.abspath(directory))
+            return key
+
+    def _names(self, directory):
+        key = self._key(directory)
+        try:
+            mtime = os.stat(key).st_mtime_ns
+        except OSError:
+            return '/'
+        cached = self.directories.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with os.scandir(key) as entries:
+                names = [os.path.normcase(entry.name) for entry in entries]
+        except OSError:
+            return '/'
+        if self._suffixes:
+            names = [name for name in names if name.endswith(self._suffixes)]
+        names = _join_names(names)
+        if time.time_ns() - mtime > _RACY_NS:
+            self.directories[key] = mtime, names
+            self.dirty = True
+        return names
+
+    def which(self, cmd, mode=os.F_OK | os.X_OK, path=None):
+        """shutil.which(), using the index."""
+        if not _SAME_SEARCH:
+            return shutil.which(cmd, mode, path)
+        if sys.platform == 'win32' and '~' in cmd:
+            # Maybe an 8.3 name, which directory listings don't show.
+            return shutil.which(cmd, mode, path)
+        if os.path.dirname(cmd):
+            # Nothing to search for.
+            if _access_check(cmd, mode):
+                return cmd
+            return None
+
+        if self.pathext is None:
+            files = [cmd]
+        elif any(cmd.lower().endswith(ext.lower()) for ext in self.pathext):
+            files = [cmd]
+        else:
+            files = [cmd + ext for ext in self.pathext]
+
+        candidates = [(thefile, '/{}/'.format(os.path.normcase(thefile)))
+                      for thefile in files]
+        seen = set()
+        for directory in _search_path(path):
+            normdir = os.path.normcase(directory)
+            if normdir in seen:
+                continue
+            seen.add(normdir)
+            names = self._names(directory)
+            for thefile, needle in candidates:
+                if needle in names:
+                    name = os.path.join(directory, thefile)
+                    if _access_check(name, mode):
+                        return name
+        return None
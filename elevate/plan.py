@@ -0,0 +1,141 @@
+"""Execution plans: elevated steps that depend on each other.
+
+`elevate --plan plan.json` runs a graph of steps under one elevation:
+
+    {
+        "jobs": 4,
+        "steps": {
+            "fetch": {"command": ["curl.exe", "-o", "setup.msi", "..."]},
+            "unpack": {"command": "tar -xf tools.zip"},
+            "install": {"command": "msiexec /i setup.msi /qn",
+                        "after": ["fetch"]},
+            "configure": {"command": "configure.cmd",
+                          "after": ["install", "unpack"]}
+        }
+    }
+
+A step's command is either a list of arguments or a Windows command line.
+A step starts once every step in its "after" list has succeeded. If any of
+them fails, or is skipped, the step is skipped too. "jobs" caps how many
+steps run at once, and --jobs overrides it. By default, every step that is
+ready runs straight away.
+
+The plan goes to the helper as a batch with dependencies, and the helper
+schedules the steps itself (see elevate.batch). Nothing here calls Windows.
+"""
+import json
+from collections import namedtuple
+
+from . import batch
+from .command_line import command_line_to_argv
+
+Plan = namedtuple('Plan', 'names commands dependencies jobs')
+
+
+class PlanError(ValueError):
+    pass
+
+
+def load(f):
+    """Read a Plan from the JSON file object |f|."""
+    try:
+        document = json.load(f)
+    except ValueError as e:
+        raise PlanError('not valid JSON: {}'.format(e)) from None
+    return parse(document)
+
+
+def parse(document):
+    """Return the Plan described by |document|, a decoded JSON plan.
+
+    Raises PlanError if the plan is malformed, names a step that doesn't
+    exist, or has steps that depend on each other in a cycle.
+    """
+    if (not isinstance(document, dict)
+            or not isinstance(document.get('steps'), dict)):
+        raise PlanError('a plan is an object with a "steps" object')
+    steps = document['steps']
+    if not steps:
+        raise PlanError('the plan has no steps')
+
+    names = list(steps)
+    positions = {name: index for index, name in enumerate(names)}
+    commands = []
+    dependencies = []
+    for name, step in steps.items():
+        if not isinstance(step, dict):
+            raise PlanError('step {!r} is not an object'.format(name))
+
+        command = step.get('command')
+        if isinstance(command, str):
+            command = command_line_to_argv(command)
+        if (not isinstance(command, list) or not command
+                or not all(isinstance(arg, str) for arg in command)):
+            raise PlanError('step {!r} needs a command: a list of arguments '
+                            'or a command line'.format(name))
+
+        after = step.get('after', [])
+        if isinstance(after, str):
+            after = [after]
+        if (not isinstance(after, list)
+                or not all(isinstance(dependency, str)
+                           for dependency in after)):
+            raise PlanError('step {!r} has an "after" that is not a step '
+                            'name or a list of them'.format(name))
+        for dependency in after:
+            if dependency not in positions:
+                raise PlanError('step {!r} comes after {!r}, which is not a '
+                                'step'.format(name, dependency))
+
+        commands.append(command)
+        dependencies.append(tuple(positions[dependency]
+                                  for dependency in after))
+
+    try:
+        batch.topological_order(dependencies)
+    except ValueError:
+        raise PlanError('the steps depend on each other in a '
+                        'cycle') from None
+
+    jobs = document.get('jobs', len(names))
+    # JSON's true and false are ints to Python.
+    if not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:
+        raise PlanError('"jobs" must be a positive integer')
+    return Plan(names, commands, dependencies, jobs)
+
+
+def critical_path(plan, results):
+    """Return the duration and step names of the slowest chain of dependent
+    steps, given the protocol.Results of |plan|'s steps. However many steps
+    run at once, the plan can't finish any faster than this."""
+    durations = [0.0] * len(plan.commands)
+    for result in results:
+        durations[result.index] = result.duration
+
+    finish = [0.0] * len(plan.commands)
+    previous = [None] * len(plan.commands)
+    for index in batch.topological_order(plan.dependencies):
+        before = max(plan.dependencies[index], key=finish.__getitem__,
+                     default=None)
+        previous[index] = before
+        finish[index] = durations[index] + (
+            finish[before] if before is not None else 0.0)
+
+    index = max(range(len(finish)), key=finish.__getitem__)
+    length = finish[index]
+    path = []
+    while index is not None:
+        path.append(plan.names[index])
+        index = previous[index]
+    return length, path[::-1]
+
+
+def summary(plan, results, elapsed):
+    """A timing summary of a plan whose steps gave |results|, taking
+    |elapsed| seconds in all."""
+    length, path = critical_path(plan, results)
+    return ('{} steps in {:.2f} s; they took {:.2f} s in total. Critical '
+            'path, {:.2f} s: {}'.format(
+                len(plan.commands), elapsed,
+                sum(result.duration for result in results), length,
+                ' -> '.join(path)))
@@ -0,0 +1,493 @@
+"""The framed binary protocol between elevate and its privileged helper.
+
+Every message is one frame:
+
+    header    b'ELEV', protocol version (u16), kind (u8), section count
+              (u8), length of the fixed part (u32), length of the sections
+              (u32), all little-endian
+    fixed     kind-specific fields at fixed offsets
+    table     a (tag, length) pair of u32s per section
+    sections  the sections' raw bytes, back to back
+
+Bulky payloads, like the environment block and the command, travel as
+sections: they're written straight from their buffers and come out of
+receive() as memoryview slices of a single read, so they're never copied
+into a pickle stream.
+
+A Channel runs over any binary file object: a named pipe opened with
+open() on Windows, or a socket or os.pipe() elsewhere. Nothing here calls
+Windows.
+"""
+import hashlib
+import hmac
+import os
+import struct
+from collections import namedtuple
+
+from . import environment
+from .environment import EnvironmentBlock
+
+MAGIC = b'ELEV'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHBBII')
+_SECTION = struct.Struct('<II')
+
+# The largest frame receive() accepts, header aside, so that a bad header
+# can't make it allocate gigabytes. Generous, because a batch result carries
+# all of a command's output.
+MAX_FRAME_SIZE = 256 << 20
+
+# Frame kinds
+KIND_HELLO = 1
+KIND_WELCOME = 2
+KIND_REQUEST = 3
+KIND_ENVIRONMENT_OFFER = 4
+KIND_ENVIRONMENT_REPLY = 5
+KIND_ENVIRONMENT = 6
+KIND_DONE = 7
+KIND_RESULT = 8
+KIND_STREAM = 9
+
+# Section tags
+SECTION_ARGV = 1
+SECTION_ENVIRONMENT = 2
+SECTION_ENVIRONMENT_SET = 3
+SECTION_ENVIRONMENT_UNSET = 4
+SECTION_BATCH = 5
+SECTION_OUTPUT = 6
+SECTION_DEPENDENCIES = 7
+SECTION_DATA = 8
+SECTION_USAGE = 9
+
+# KIND_REQUEST: flags, process id, process start time, and the client's
+# stdin, stdout and stderr handle values.
+_REQUEST = struct.Struct('<IIQQQQ')
+FLAG_SPILL_RESPONSE_FILE = 0x1
+FLAG_RELAY = 0x2
+
+_SPILL_FLAGS = {'fail': 0, 'response-file': FLAG_SPILL_RESPONSE_FILE}
+
+# SECTION_BATCH: the job limit, then each command as a length-prefixed,
+# NUL-joined argv. A request has either this or SECTION_ARGV.
+# SECTION_DEPENDENCIES: for each command, a count and then the indices of
+# the commands it waits for.
+_U32 = struct.Struct('<I')
+
+# KIND_RESULT: command index, flags, exit code, duration in nanoseconds.
+_RESULT = struct.Struct('<IIIQ')
+_RESULT_FAILED_TO_START = 0x1
+_RESULT_SKIPPED = 0x2
+
+# SECTION_USAGE: user and kernel CPU time in nanoseconds, peak memory in
+# bytes.
+_USAGE = struct.Struct('<QQQ')
+
+# KIND_STREAM: which stream the data is for. Empty data ends the stream.
+_STREAM = struct.Struct('<B')
+STREAM_STDIN = 0
+STREAM_STDOUT = 1
+STREAM_STDERR = 2
+
+# KIND_ENVIRONMENT_OFFER: digest of the block, digest of the baseline.
+_OFFER = struct.Struct('<16s16s')
+
+# KIND_ENVIRONMENT_REPLY
+_REPLY = struct.Struct('<I')
+_SEND_BLOCK = 0
+_HAVE_BLOCK = 1
+
+# KIND_HELLO: the helper's nonce and its proof that it holds the token.
+# KIND_WELCOME's fixed part is just the client's proof.
+_NONCE_SIZE = 32
+_HELLO = struct.Struct('<32s32s')
+TOKEN_SIZE = 32
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class AuthenticationError(ProtocolError):
+    pass
+
+
+Frame = namedtuple('Frame', 'kind fixed sections')
+
+Request = namedtuple('Request', 'process_id process_start_time std_handles '
+                                'command spill environment_overrides batch '
+                                'relay')
+# A request runs either |command| or a Batch. With |relay|, the command's
+# std streams are relayed over the channel (see elevate.relay) rather than
+# being the client's console.
+Request.__new__.__defaults__ = (None, False)
+
+# dependencies, if given, lists the indices each command waits for.
+Batch = namedtuple('Batch', 'commands jobs dependencies')
+Batch.__new__.__defaults__ = (None,)
+
+# The outcome of a batch's commands[index], or of a request's command.
+# exit_code is None if it couldn't be started, and output is then why, or if
+# it was skipped because a command it depends on failed; duration is in
+# seconds. usage, if known, is the command's Usage.
+Result = namedtuple('Result', 'index exit_code duration output skipped '
+                              'usage')
+Result.__new__.__defaults__ = (False, None)
+
+# CPU times in seconds, and peak memory (working set) in bytes.
+Usage = namedtuple('Usage', 'user_time kernel_time peak_memory')
+
+
+class Channel:
+
+    """Sends and receives frames over a binary file object."""
+
+    def __init__(self, stream, max_frame_size=MAX_FRAME_SIZE):
+        self.stream = stream
+        self.max_frame_size = max_frame_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.stream.close()
+
+    def send(self, kind, fixed=b'', sections=()):
+        """Send a frame. |sections| is a sequence of (tag, bytes-like)."""
+        sections = [(tag, memoryview(data).cast('B'))
+                    for tag, data in sections]
+        head = [_HEADER.pack(MAGIC, VERSION, kind, len(sections), len(fixed),
+                             sum(len(data) for _, data in sections)),
+                fixed]
+        head.extend(_SECTION.pack(tag, len(data)) for tag, data in sections)
+        self._write(b''.join(head))
+        for _, data in sections:
+            self._write(data)
+        flush = getattr(self.stream, 'flush', None)
+        if flush:
+            flush()
+
+    def receive(self, expected_kind=None):
+        """Return the next Frame, whose sections are a {tag: memoryview}.
+
+        Raises ProtocolError if the peer speaks another version, if the
+        frame isn't of |expected_kind| (when given), if it's larger than
+        max_frame_size, or if the channel closes mid-frame.
+        """
+        magic, version, kind, count, fixed_length, sections_length = (
+            _HEADER.unpack(self._read(_HEADER.size)))
+        if magic != MAGIC:
+            raise ProtocolError('not an elevate frame')
+        if version != VERSION:
+            raise ProtocolError('peer speaks protocol version {}, not '
+                                '{}'.format(version, VERSION))
+        if expected_kind is not None and kind != expected_kind:
+            raise ProtocolError('expected a frame of kind {}, got {}'.format(
+                expected_kind, kind))
+
+        table_length = count * _SECTION.size
+        frame_size = fixed_length + table_length + sections_length
+        if frame_size > self.max_frame_size:
+            raise ProtocolError('frame of {} bytes exceeds the limit of '
+                                '{}'.format(frame_size, self.max_frame_size))
+        body = self._read(frame_size)
+        sections = {}
+        offset = fixed_length + table_length
+        for tag, length in _SECTION.iter_unpack(
+                body[fixed_length:fixed_length + table_length]):
+            sections[tag] = body[offset:offset + length]
+            offset += length
+        if offset != len(body):
+            raise ProtocolError('section lengths disagree with the header')
+        return Frame(kind, body[:fixed_length], sections)
+
+    def _write(self, data):
+        data = memoryview(data)
+        while data:
+            written = self.stream.write(data)
+            data = data[written:]
+
+    def _read(self, length):
+        buffer = bytearray(length)
+        view = memoryview(buffer)
+        while view:
+            count = self.stream.readinto(view)
+            if not count:
+                raise ProtocolError('channel closed mid-frame')
+            view = view[count:]
+        return memoryview(buffer)
+
+
+###############################################################################
+# Authentication
+#
+# The client hands the helper a one-time token out of band (see
+# utilities.create_token_pipe()), never on a command line. The helper
+# speaks first, proving it holds the token; the client answers with its
+# own proof and can send its request straight after, so the handshake
+# costs a single round trip.
+
+def _proof(token, role, nonce):
+    return hmac.new(token, role + nonce, hashlib.sha256).digest()
+
+
+def greet(channel, token):
+    """Authenticate with the peer, which calls welcome(), using the one-time
+    |token|."""
+    nonce = os.urandom(_NONCE_SIZE)
+    channel.send(KIND_HELLO, _HELLO.pack(nonce, _proof(token, b'helper',
+                                                       nonce)))
+    proof = channel.receive(KIND_WELCOME).fixed
+    if not hmac.compare_digest(proof, _proof(token, b'client', nonce)):
+        raise AuthenticationError('peer does not hold the token')
+
+
+def welcome(channel, token):
+    """The other end of greet(). Returns as soon as the peer is verified,
+    without waiting for it to verify us."""
+    nonce, proof = _HELLO.unpack(channel.receive(KIND_HELLO).fixed)
+    if not hmac.compare_digest(proof, _proof(token, b'helper', nonce)):
+        raise AuthenticationError('peer does not hold the token')
+    channel.send(KIND_WELCOME, _proof(token, b'client', nonce))
+
+
+###############################################################################
+# Requests
+
+def _encode_variables(variables):
+    """Sections for a {name: value or None} mapping, where None unsets. They
+    are short, so they're UTF-8 rather than a UTF-16 environment block."""
+    assigned = ['{}={}'.format(name, value)
+                for name, value in variables.items() if value is not None]
+    unset = [name for name, value in variables.items() if value is None]
+    sections = []
+    if assigned:
+        sections.append((SECTION_ENVIRONMENT_SET,
+                         '\0'.join(assigned).encode('utf-8')))
+    if unset:
+        sections.append((SECTION_ENVIRONMENT_UNSET,
+                         '\0'.join(unset).encode('utf-8')))
+    return sections
+
+
+def _decode_variables(sections):
+    variables = {}
+    if SECTION_ENVIRONMENT_UNSET in sections:
+        variables.update(dict.fromkeys(
+            str(sections[SECTION_ENVIRONMENT_UNSET], 'utf-8').split('\0')))
+    if SECTION_ENVIRONMENT_SET in sections:
+        for assignment in str(sections[SECTION_ENVIRONMENT_SET],
+                              'utf-8').split('\0'):
+            # A name may start with '=', as in '=C:'.
+            separator = assignment.find('=', 1)
+            if separator < 0:
+                raise ProtocolError('malformed environment variable')
+            variables[assignment[:separator]] = assignment[separator + 1:]
+    return variables
+
+
+def _encode_argv(argv):
+    return '\0'.join(argv).encode('utf-8')
+
+
+def _decode_argv(data):
+    return str(data, 'utf-8').split('\0')
+
+
+def _encode_batch(batch):
+    parts = [_U32.pack(batch.jobs)]
+    for argv in batch.commands:
+        data = _encode_argv(argv)
+        parts += [_U32.pack(len(data)), data]
+    return b''.join(parts)
+
+
+def _decode_batch(data, dependencies=None):
+    jobs, = _U32.unpack_from(data)
+    commands = []
+    offset = _U32.size
+    while offset < len(data):
+        length, = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        if offset + length > len(data):
+            raise ProtocolError('truncated batch')
+        commands.append(_decode_argv(data[offset:offset + length]))
+        offset += length
+    if dependencies is not None:
+        dependencies = _decode_dependencies(dependencies, len(commands))
+    return Batch(commands, jobs, dependencies)
+
+
+def _encode_dependencies(dependencies):
+    parts = []
+    for indices in dependencies:
+        parts.append(_U32.pack(len(indices)))
+        parts.extend(_U32.pack(index) for index in indices)
+    return b''.join(parts)
+
+
+def _decode_dependencies(data, count):
+    if len(data) % _U32.size:
+        raise ProtocolError('truncated dependencies')
+    values = [value for value, in _U32.iter_unpack(data)]
+    dependencies = []
+    offset = 0
+    for _ in range(count):
+        if offset >= len(values):
+            raise ProtocolError('truncated dependencies')
+        length = values[offset]
+        dependencies.append(tuple(values[offset + 1:offset + 1 + length]))
+        offset += 1 + length
+    if offset != len(values):
+        raise ProtocolError('dependencies disagree with the batch')
+    if any(index >= count for indices in dependencies for index in indices):
+        raise ProtocolError('dependency on a command not in the batch')
+    return dependencies
+
+
+def send_request(channel, request):
+    flags = _SPILL_FLAGS[request.spill]
+    if request.relay:
+        flags |= FLAG_RELAY
+    fixed = _REQUEST.pack(flags, request.process_id,
+                          request.process_start_time,
+                          *(handle or 0 for handle in request.std_handles))
+    if request.batch is None:
+        sections = [(SECTION_ARGV, _encode_argv(request.command))]
+    else:
+        sections = [(SECTION_BATCH, _encode_batch(request.batch))]
+        if request.batch.dependencies is not None:
+            sections.append((SECTION_DEPENDENCIES, _encode_dependencies(
+                request.batch.dependencies)))
+    channel.send(KIND_REQUEST, fixed, sections +
+                 _encode_variables(request.environment_overrides))
+
+
+def receive_request(channel):
+    frame = channel.receive(KIND_REQUEST)
+    flags, process_id, process_start_time, *std_handles = _REQUEST.unpack(
+        frame.fixed)
+    spill = ('response-file' if flags & FLAG_SPILL_RESPONSE_FILE
+             else 'fail')
+    command = batch = None
+    if SECTION_BATCH in frame.sections:
+        batch = _decode_batch(frame.sections[SECTION_BATCH],
+                              frame.sections.get(SECTION_DEPENDENCIES))
+    else:
+        command = _decode_argv(frame.sections[SECTION_ARGV])
+    return Request(process_id, process_start_time, tuple(std_handles),
+                   command, spill, _decode_variables(frame.sections), batch,
+                   bool(flags & FLAG_RELAY))
+
+
+###############################################################################
+# Environment
+
+def send_environment(channel, block, baseline):
+    """Send |block| to a peer calling receive_environment(), as a delta
+    against |baseline| if the peer can rebuild that (see
+    environment.offer())."""
+    offered = environment.offer(block, baseline)
+    channel.send(KIND_ENVIRONMENT_OFFER,
+                 _OFFER.pack(offered['digest'], offered['baseline']),
+                 _encode_variables(offered['delta']))
+    reply, = _REPLY.unpack(channel.receive(KIND_ENVIRONMENT_REPLY).fixed)
+    if reply == _SEND_BLOCK:
+        channel.send(KIND_ENVIRONMENT, sections=[
+            (SECTION_ENVIRONMENT, block.buffer)])
+
+
+def receive_environment(channel, baselines):
+    """Receive a block from a peer calling send_environment(), trying each
+    of |baselines| (which may be a generator, to compute them lazily)
+    before asking for the whole block."""
+    frame = channel.receive(KIND_ENVIRONMENT_OFFER)
+    digest, baseline = _OFFER.unpack(frame.fixed)
+    block = environment.accept({
+        'digest': digest,
+        'baseline': baseline,
+        'delta': _decode_variables(frame.sections),
+    }, baselines)
+    if block is not None:
+        channel.send(KIND_ENVIRONMENT_REPLY, _REPLY.pack(_HAVE_BLOCK))
+        return block
+
+    channel.send(KIND_ENVIRONMENT_REPLY, _REPLY.pack(_SEND_BLOCK))
+    frame = channel.receive(KIND_ENVIRONMENT)
+    return environment.build(EnvironmentBlock(
+        frame.sections[SECTION_ENVIRONMENT]))
+
+
+###############################################################################
+# Results
+
+def send_result(channel, result):
+    flags = 0
+    exit_code = result.exit_code
+    if result.skipped:
+        flags, exit_code = _RESULT_SKIPPED, 0
+    elif exit_code is None:
+        flags, exit_code = _RESULT_FAILED_TO_START, 0
+    sections = [(SECTION_OUTPUT, result.output)]
+    if result.usage:
+        sections.append((SECTION_USAGE, _USAGE.pack(
+            int(result.usage.user_time * 1e9),
+            int(result.usage.kernel_time * 1e9),
+            result.usage.peak_memory)))
+    channel.send(KIND_RESULT,
+                 _RESULT.pack(result.index, flags, exit_code,
+                              int(result.duration * 1e9)),
+                 sections)
+
+
+def send_done(channel):
+    """Tell the client its request has finished. The helper can't signal
+    that by exiting when it's a broker (see elevate.broker)."""
+    channel.send(KIND_DONE)
+
+
+def receive_results(channel, on_stream=None):
+    """Yield each Result the peer sends until it sends KIND_DONE, passing
+    any relayed stream data to on_stream(stream, data)."""
+    while True:
+        frame = channel.receive()
+        if frame.kind == KIND_DONE:
+            return
+        if frame.kind == KIND_STREAM and on_stream:
+            on_stream(*_decode_stream(frame))
+            continue
+        if frame.kind != KIND_RESULT:
+            raise ProtocolError('expected a result, got a frame of kind '
+                                '{}'.format(frame.kind))
+        index, flags, exit_code, duration = _RESULT.unpack(frame.fixed)
+        if flags & (_RESULT_FAILED_TO_START | _RESULT_SKIPPED):
+            exit_code = None
+        usage = None
+        if SECTION_USAGE in frame.sections:
+            user_time, kernel_time, peak_memory = _USAGE.unpack(
+                frame.sections[SECTION_USAGE])
+            usage = Usage(user_time / 1e9, kernel_time / 1e9, peak_memory)
+        yield Result(index, exit_code, duration / 1e9,
+                     frame.sections[SECTION_OUTPUT],
+                     bool(flags & _RESULT_SKIPPED), usage)
+
+
+###############################################################################
+# Relayed streams
+
+def send_stream(channel, stream, data):
+    """Send |data| for |stream|; empty |data| ends the stream."""
+    channel.send(KIND_STREAM, _STREAM.pack(stream), [(SECTION_DATA, data)])
+
+
+def _decode_stream(frame):
+    stream, = _STREAM.unpack(frame.fixed)
+    return stream, frame.sections[SECTION_DATA]
+
+
+def receive_stream(channel):
+    """Return the (stream, data) of the next KIND_STREAM frame."""
+    return _decode_stream(channel.receive(KIND_STREAM))
@@ -0,0 +1,167 @@
+"""Relaying a command's std streams over the helper channel.
+
+attach_to_parent_console() only helps when the client has a real console.
+When the client's std handles are pipes or files, as under MinTTY or a CI
+runner, the helper instead gives the command pipes of its own and relays
+them as protocol KIND_STREAM frames: the command's stdout and stderr to the
+client, and the client's stdin back to the command.
+
+Each stream has its own Pump thread, so a command that fills stderr while
+the client is slow to drain stdout doesn't stall, and each Pump reads into
+one large buffer that it reuses for every chunk. Chunks go out as frame
+sections straight from that buffer.
+
+Nothing here calls Windows.
+"""
+import logging
+import threading
+import time
+
+from . import protocol
+
+BUFFER_SIZE = 1 << 20
+
+
+class Pump:
+
+    """Copies the raw binary file object |source| to sink(data) until end
+    of file, then calls sink(b'').
+
+    |data| is a view of the pump's buffer, only valid until sink() returns.
+    Errors end the pump quietly, as they almost always mean the other end
+    has gone away; error holds the exception, if any.
+    """
+
+    def __init__(self, name, source, sink, buffer_size=BUFFER_SIZE):
+        self.name = name
+        self.source = source
+        self.sink = sink
+        self.buffer = bytearray(buffer_size)
+        self.count = 0
+        self.elapsed = 0.0
+        self.error = None
+        # A pump reading stdin may never see end of file, so don't let it
+        # keep the process alive.
+        self.thread = threading.Thread(target=self.run, name=name,
+                                       daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def run(self):
+        view = memoryview(self.buffer)
+        readinto = self.source.readinto
+        sink = self.sink
+        start = time.perf_counter()
+        try:
+            while True:
+                length = readinto(view)
+                if not length:
+                    break
+                sink(view[:length])
+                self.count += length
+            sink(b'')
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def throughput(self):
+        """Bytes per second since the pump started."""
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def describe(self):
+        return '{}: {} bytes in {:.2f} s ({:.1f} MB/s)'.format(
+            self.name, self.count, self.elapsed, self.throughput() / 1e6)
+
+
+def _write_all(stream, data):
+    data = memoryview(data)
+    while data:
+        data = data[stream.write(data):]
+
+
+class HelperRelay:
+
+    """The helper's end. Pumps the command's |stdout| and |stderr|, the
+    read ends of its output pipes, to the client over |channel|, and writes
+    the client's stdin frames to |stdin|, the write end of its input pipe.
+
+    Once the command has exited, join() waits for its output to drain. The
+    thread writing stdin then lives on until the client closes the channel,
+    which it does once the request is done.
+    """
+
+    def __init__(self, channel, stdin, stdout, stderr,
+                 buffer_size=BUFFER_SIZE):
+        self.channel = channel
+        self.stdin = stdin
+        self._send_lock = threading.Lock()
+        self.pumps = [
+            Pump('stdout', stdout, self._sender(protocol.STREAM_STDOUT),
+                 buffer_size),
+            Pump('stderr', stderr, self._sender(protocol.STREAM_STDERR),
+                 buffer_size),
+        ]
+        self.input_count = 0
+        self._input_thread = threading.Thread(target=self._write_input,
+                                              name='stdin', daemon=True)
+
+    def _sender(self, stream):
+        def send(data):
+            with self._send_lock:
+                protocol.send_stream(self.channel, stream, data)
+        return send
+
+    def _write_input(self):
+        try:
+            with self.stdin:
+                while True:
+                    stream, data = protocol.receive_stream(self.channel)
+                    if stream != protocol.STREAM_STDIN or not data:
+                        return
+                    _write_all(self.stdin, data)
+                    self.input_count += len(data)
+        except Exception:
+            # The command exited without reading all its input, or the
+            # client went away.
+            pass
+
+    def start(self):
+        self._input_thread.start()
+        for pump in self.pumps:
+            pump.start()
+
+    def join(self):
+        for pump in self.pumps:
+            pump.join()
+            logging.debug('Relayed {}'.format(pump.describe()))
+
+
+class ClientRelay:
+
+    """The client's end. Writes the stream data the helper sends to |stdout|
+    and |stderr|, and pumps |stdin| to the helper over |channel|. Pass
+    on_stream() to protocol.receive_results()."""
+
+    def __init__(self, channel, stdin, stdout, stderr,
+                 buffer_size=BUFFER_SIZE):
+        self.outputs = {protocol.STREAM_STDOUT: stdout,
+                        protocol.STREAM_STDERR: stderr}
+        self.output_counts = dict.fromkeys(self.outputs, 0)
+        self.pump = Pump(
+            'stdin', stdin,
+            lambda data: protocol.send_stream(channel, protocol.STREAM_STDIN,
+                                              data),
+            buffer_size)
+
+    def start(self):
+        self.pump.start()
+
+    def on_stream(self, stream, data):
+        if data:
+            _write_all(self.outputs[stream], data)
+            self.output_counts[stream] += len(data)
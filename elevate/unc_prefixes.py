@@ -0,0 +1,128 @@
+"""Translating paths on mapped network drives to UNC paths, cheaply.
+
+The elevated helper doesn't see the client's drive mappings, so the client
+starts it through the UNC path of its script. WNetGetUniversalName() asks
+the network redirector for that, which can take seconds when the server is
+slow. A drive maps to one share for all its paths, though, so UncPrefixes
+asks once for the drive's root, and translates paths on the drive by
+putting the share's UNC prefix in place of the drive letter. Answers,
+including that a drive isn't a network drive, are kept for |ttl| seconds,
+as drives can be remapped.
+
+The prefixes persist between runs as JSON (see load() and save()), for one
+logon session at a time, as drive mappings belong to a logon session.
+
+The lookup itself is a function, |universal_name|, which takes a path and
+a buffer size in bytes and returns the path's UNC name, or None if it's not
+on a network drive, and the buffer size that took. On Windows, that's
+utilities.unc_name_for_path().
+"""
+import json
+import ntpath
+import os
+import tempfile
+import time
+
+_VERSION = 1
+
+DEFAULT_TTL = 5 * 60
+
+# Fits UNIVERSAL_NAME_INFO for most shares; a longer name costs a retry.
+DEFAULT_BUFFER_SIZE = 1024
+
+
+def _drive_letter(path):
+    drive = ntpath.splitdrive(path)[0]
+    if len(drive) == 2 and drive[1] == ':':
+        return drive.upper()
+    # A UNC path already, or no drive at all.
+    return None
+
+
+class UncPrefixes:
+
+    """The UNC prefix of each drive letter asked about, or None for drives
+    that aren't network drives."""
+
+    def __init__(self, universal_name, session=None, ttl=DEFAULT_TTL,
+                 clock=time.time):
+        self.universal_name = universal_name
+        self.session = session
+        self.ttl = ttl
+        self.clock = clock
+        # {drive: (UNC prefix or None, expiry as clock() has it)}
+        self.drives = {}
+        # The most a lookup has needed, so the next is sized right first.
+        self.buffer_size = DEFAULT_BUFFER_SIZE
+        self.dirty = False
+
+    @classmethod
+    def load(cls, cache_path, universal_name, session=None, **kwargs):
+        """Return the prefixes saved at |cache_path|, or none if there are
+        none or they were for another logon |session|. |kwargs| are those of
+        UncPrefixes()."""
+        prefixes = cls(universal_name, session, **kwargs)
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                document = json.load(f)
+            if (document['version'] != _VERSION
+                    or document['session'] != session):
+                return prefixes
+            prefixes.drives = {drive: (prefix, expiry)
+                               for drive, (prefix, expiry)
+                               in document['drives'].items()}
+            prefixes.buffer_size = max(int(document['buffer_size']),
+                                       DEFAULT_BUFFER_SIZE)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return prefixes
+
+    def save(self, cache_path):
+        """Write the prefixes to |cache_path|, if they have changed."""
+        if not self.dirty:
+            return
+        document = {
+            'version': _VERSION,
+            'session': self.session,
+            'buffer_size': self.buffer_size,
+            'drives': {drive: [prefix, expiry]
+                       for drive, (prefix, expiry) in self.drives.items()},
+        }
+        # Write a whole new file, in case another elevate is reading it.
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path) or os.curdir, suffix='.tmp')
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(document, f, separators=(',', ':'))
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.dirty = False
+
+    def prefix(self, drive):
+        """The UNC prefix |drive|, like 'Z:', maps to, or None if it isn't a
+        network drive."""
+        now = self.clock()
+        cached = self.drives.get(drive)
+        # An expiry further off than the TTL means the clock went back.
+        if cached and now < cached[1] <= now + self.ttl:
+            return cached[0]
+
+        name, buffer_size = self.universal_name(drive + '\\',
+                                                self.buffer_size)
+        prefix = name.rstrip('\\') if name else None
+        self.drives[drive] = prefix, now + self.ttl
+        self.buffer_size = max(self.buffer_size, buffer_size)
+        self.dirty = True
+        return prefix
+
+    def translate(self, path):
+        """|path|, absolute, as a UNC path if it's on a network drive."""
+        drive = _drive_letter(path)
+        if drive is None:
+            return path
+        prefix = self.prefix(drive)
+        if prefix is None:
+            return path
+        return prefix + path[len(drive):]
@@ -1,10 +1,15 @@
 import abc
 import ctypes
+import io
+import os
+import uuid
 import weakref
 from ctypes import byref, cast, sizeof, POINTER
 from . import win32
 from . import libc
-from . import pyapi
+from . import protocol
+from .command_line import argv_to_command_line
+from .environment import EnvironmentBlock
 
 def is_elevated():
     """Return True if the current user has superuser privileges, False
@@ -22,16 +27,6 @@ def is_elevated():
             win32.FreeSid(admin_sid)
 
 
-def argv_to_command_line(args):
-    def escape_arg(arg):
-        import re
-        arg = re.sub(r'(\\*)"', r'\1\1\"', arg)
-        arg = re.sub(r'(\\+)$', r'\1\1', arg)
-        return "".join(('"', arg, '"'))
-
-    return ' '.join(escape_arg(arg) for arg in args)
-
-
 def module_from_address(address):
     return win32.GetModuleHandleEx(
         win32.GET_MODULE_HANDLE_EX_FLAG_FROM_ADDRESS
@@ -44,53 +39,313 @@ def current_process_module():
         win32.GET_MODULE_HANDLE_EX_FLAG_UNCHANGED_REFCOUNT, None)
 
 
-def unc_name_for_path(path):
-    buf = None
-    buffer_size = win32.DWORD()
+def unc_name_for_path(path, buffer_size=0):
+    """Return the UNC name of |path| if it's on a mapped network drive, or
+    None if it's not, and the size of buffer that took. A |buffer_size| too
+    small costs another call, with the buffer as big as that one asked."""
+    size = win32.DWORD(buffer_size)
 
     MAX_ATTEMPTS=5
     for _ in range(MAX_ATTEMPTS):
+        buf = ctypes.c_buffer(size.value) if size.value else None
         try:
             buf_ptr = byref(buf) if buf else None
-            win32.WNetGetUniversalName(path, win32.UNIVERSAL_NAME_INFO_LEVEL, 
-                                       buf_ptr, byref(buffer_size))
-            return win32.UNIVERSAL_NAME_INFO.from_buffer(buf).universal_name
+            win32.WNetGetUniversalName(path, win32.UNIVERSAL_NAME_INFO_LEVEL,
+                                       buf_ptr, byref(size))
+            return (win32.UNIVERSAL_NAME_INFO.from_buffer(buf).universal_name,
+                    len(buf))
         except OSError as e:
-            if e.winerror == win32.ERROR_MORE_DATA:
-                buf = ctypes.c_buffer(buffer_size.value)
-            else:
+            if e.winerror in (win32.ERROR_NOT_CONNECTED,
+                              win32.ERROR_BAD_DEVICE):
+                return None, buffer_size
+            elif e.winerror != win32.ERROR_MORE_DATA:
                 raise
 
     raise ctypes.WinError(win32.ERROR_MORE_DATA)
 
 
-def _length_of_environment_block(env_block):
-    """ Length of the environment block, in bytes """
-    # the envblock is terminated by a zero-length string
-    n = 0
-    while True:
-        current_length = libc.wcslen(byref(env_block.contents, n))
-        n += (current_length + 1) * sizeof(ctypes.c_wchar);
+def unique_pipe_name():
+    return r'\\.\pipe\me.nickhutchinson.elevate-{}-{}'.format(
+        os.getpid(), uuid.uuid4().hex)
+
+
+def create_pipe_server(name):
+    """Create the only instance of the named pipe |name|, for local clients
+    only, and return its handle."""
+    return win32.CreateNamedPipe(
+        name,
+        win32.PIPE_ACCESS_DUPLEX | win32.FILE_FLAG_FIRST_PIPE_INSTANCE
+        | win32.FILE_FLAG_OVERLAPPED,
+        win32.PIPE_TYPE_BYTE | win32.PIPE_READMODE_BYTE | win32.PIPE_WAIT
+        | win32.PIPE_REJECT_REMOTE_CLIENTS,
+        1, 65536, 65536, 0)
+
+
+def wait_for_pipe_client(pipe):
+    """Wait for a client to connect to |pipe|, a server handle opened with
+    FILE_FLAG_OVERLAPPED."""
+    overlapped = win32.OVERLAPPED(event=win32.CreateEvent())
+    try:
+        win32.ConnectNamedPipe(pipe, byref(overlapped))
+    except OSError as e:
+        # The client connected before we started waiting.
+        if e.winerror == win32.ERROR_PIPE_CONNECTED:
+            return
+        if e.winerror != win32.ERROR_IO_PENDING:
+            raise
+        win32.GetOverlappedResult(pipe, byref(overlapped))
+    finally:
+        win32.CloseHandle(overlapped.event)
+
+
+def connect_pipe(name):
+    return PipeStream(win32.CreateFile(
+        name, win32.GENERIC_READ | win32.GENERIC_WRITE,
+        flags_and_attributes=win32.FILE_FLAG_OVERLAPPED))
+
+
+class PipeStream(io.RawIOBase):
+
+    """An unbuffered binary file object for a pipe handle opened with
+    FILE_FLAG_OVERLAPPED, which it takes ownership of.
+
+    Windows serializes synchronous I/O on a handle, so a thread blocked
+    reading a handle_stream() holds up every write to it. Here reads and
+    writes each wait on their own OVERLAPPED, so one thread can wait for the
+    peer while another sends, as relaying a command's streams needs.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self._read = win32.OVERLAPPED(event=win32.CreateEvent())
+        self._write = win32.OVERLAPPED(event=win32.CreateEvent())
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        raise io.UnsupportedOperation('PipeStream has no file descriptor')
+
+    def _transfer(self, function, buffer, length, overlapped):
+        try:
+            function(self.handle, buffer, length, None, byref(overlapped))
+        except OSError as e:
+            if e.winerror != win32.ERROR_IO_PENDING:
+                raise
+        return win32.GetOverlappedResult(self.handle, byref(overlapped))
+
+    def readinto(self, b):
+        view = memoryview(b).cast('B')
+        if not view:
+            return 0
+        buffer = (ctypes.c_char * len(view)).from_buffer(view)
+        try:
+            return self._transfer(win32.ReadFile, buffer, len(view),
+                                  self._read)
+        except OSError as e:
+            # The other end closed the pipe.
+            if e.winerror == win32.ERROR_BROKEN_PIPE:
+                return 0
+            raise
+
+    def write(self, b):
+        view = memoryview(b).cast('B')
+        if not view:
+            return 0
+        array_type = ctypes.c_char * len(view)
+        if view.readonly:
+            buffer = array_type.from_buffer_copy(view)
+        else:
+            buffer = array_type.from_buffer(view)
+        return self._transfer(win32.WriteFile, buffer, len(view),
+                              self._write)
+
+    def close(self):
+        if not self.closed:
+            win32.CloseHandle(self.handle)
+            win32.CloseHandle(self._read.event)
+            win32.CloseHandle(self._write.event)
+        super().close()
+
+
+def handle_stream(handle, mode='r+b'):
+    """Return an unbuffered binary file object for |handle|, which it takes
+    ownership of."""
+    return open(libc.open_osfhandle(handle, 0), mode, buffering=0)
+
 
-        if current_length == 0:
-            break
+def create_token_pipe(token):
+    """Put |token| in a new anonymous pipe and return the pipe's read handle,
+    for another process to collect with take_token()."""
+    read_handle, write_handle = win32.CreatePipe()
+    with handle_stream(write_handle, 'wb') as f:
+        f.write(token)
+    return read_handle
 
-    return n
+
+def take_token(process_id, handle, size):
+    """Read the token that process |process_id| left with create_token_pipe().
+
+    Only the handle's value needs to be passed around. Duplicating it closes
+    the owner's copy, so the token can only be taken once.
+    """
+    process = win32.OpenProcess(win32.PROCESS_DUP_HANDLE, False, process_id)
+    try:
+        handle = win32.DuplicateHandle(
+            process, handle, win32.GetCurrentProcess(),
+            options=win32.DUPLICATE_CLOSE_SOURCE | win32.DUPLICATE_SAME_ACCESS)
+    finally:
+        win32.CloseHandle(process)
+    with handle_stream(handle, 'rb') as f:
+        return f.read(size)
+
+
+def _token_information(token, information_class):
+    length = win32.DWORD()
+    try:
+        win32.GetTokenInformation(token, information_class, None, 0,
+                                  byref(length))
+    except OSError as e:
+        if e.winerror != win32.ERROR_INSUFFICIENT_BUFFER:
+            raise
+    buf = ctypes.create_string_buffer(length.value)
+    win32.GetTokenInformation(token, information_class, buf, length,
+                              byref(length))
+    return buf
+
+
+def logon_sid():
+    """The SID of the current logon session, like 'S-1-5-5-0-123456'."""
+    token = win32.OpenProcessToken(win32.GetCurrentProcess(),
+                                   win32.TOKEN_QUERY)
+    try:
+        groups = win32.TOKEN_GROUPS.from_buffer(
+            _token_information(token, win32.TokenLogonSid))
+        string_sid = win32.ConvertSidToStringSid(groups.groups[0].sid)
+        try:
+            return ctypes.wstring_at(string_sid)
+        finally:
+            win32.LocalFree(string_sid)
+    finally:
+        win32.CloseHandle(token)
+
+
+def process_is_elevated(process_id):
+    process = win32.OpenProcess(win32.PROCESS_QUERY_LIMITED_INFORMATION,
+                                False, process_id)
+    try:
+        token = win32.OpenProcessToken(process, win32.TOKEN_QUERY)
+        try:
+            elevation = win32.DWORD()
+            win32.GetTokenInformation(token, win32.TokenElevation,
+                                      byref(elevation), sizeof(elevation),
+                                      byref(win32.DWORD()))
+            return bool(elevation.value)
+        finally:
+            win32.CloseHandle(token)
+    finally:
+        win32.CloseHandle(process)
+
+
+def broker_pipe_name(logon_sid):
+    return r'\\.\pipe\me.nickhutchinson.elevate-broker-{}'.format(logon_sid)
+
+
+class PipeListener:
+
+    """Accepts clients on the named pipe |name| for a broker.Broker, giving
+    each its own instance of the pipe.
+
+    Only SYSTEM, administrators and the logon session |logon_sid| may
+    connect, and only administrators may add instances. Raises
+    PermissionError if another process already owns the name.
+    """
+
+    _SDDL = 'D:P(A;;GA;;;SY)(A;;GA;;;BA)(A;;GRGW;;;{})'
+
+    def __init__(self, name, logon_sid):
+        self.name = name
+        self._security_descriptor = (
+            win32.ConvertStringSecurityDescriptorToSecurityDescriptor(
+                self._SDDL.format(logon_sid), win32.SDDL_REVISION_1))
+        self._security_attributes = win32.SECURITY_ATTRIBUTES(
+            sizeof(win32.SECURITY_ATTRIBUTES), self._security_descriptor,
+            False)
+        self._pipe = self._create_instance(win32.FILE_FLAG_FIRST_PIPE_INSTANCE)
+
+    def _create_instance(self, flags=0):
+        return win32.CreateNamedPipe(
+            self.name,
+            win32.PIPE_ACCESS_DUPLEX | win32.FILE_FLAG_OVERLAPPED | flags,
+            win32.PIPE_TYPE_BYTE | win32.PIPE_READMODE_BYTE | win32.PIPE_WAIT
+            | win32.PIPE_REJECT_REMOTE_CLIENTS,
+            win32.PIPE_UNLIMITED_INSTANCES, 65536, 65536, 0,
+            byref(self._security_attributes))
+
+    def accept(self):
+        wait_for_pipe_client(self._pipe)
+        # Have the next instance ready before serving this one.
+        pipe, self._pipe = self._pipe, self._create_instance()
+        return protocol.Channel(PipeStream(pipe))
+
+    def wake(self):
+        win32.CloseHandle(win32.CreateFile(
+            self.name, win32.GENERIC_READ | win32.GENERIC_WRITE))
+
+    def close(self):
+        win32.CloseHandle(self._pipe)
+        win32.LocalFree(self._security_descriptor)
+
+
+def connect_broker(name):
+    """Return a Channel to the broker listening on |name|, or None if there
+    isn't one.
+
+    Anyone in the session could have created the pipe before the broker
+    did, so a server that isn't elevated doesn't count.
+    """
+    try:
+        stream = connect_pipe(name)
+    except OSError as e:
+        if e.winerror in (win32.ERROR_FILE_NOT_FOUND, win32.ERROR_PIPE_BUSY):
+            return None
+        raise
+    server_process_id = win32.GetNamedPipeServerProcessId(stream.handle)
+    if not process_is_elevated(server_process_id):
+        stream.close()
+        return None
+    return protocol.Channel(stream)
 
 
 def environment_block_snapshot():
     env_block = win32.GetEnvironmentStrings()
     try:
-        view = pyapi.PyMemoryView_FromMemory(
-            env_block,
-            _length_of_environment_block(env_block),
-            pyapi.PyBUF_READ)
-        return bytes(view)
+        return bytes(EnvironmentBlock.from_address(
+            cast(env_block, ctypes.c_void_p).value))
 
     finally:
         win32.FreeEnvironmentStrings(env_block)
 
 
+def default_environment_block():
+    """The environment a newly logged-on process of the current user would
+    get, without anything inherited from this process."""
+    token = win32.OpenProcessToken(
+        win32.GetCurrentProcess(),
+        win32.TOKEN_QUERY | win32.TOKEN_DUPLICATE | win32.TOKEN_IMPERSONATE)
+    try:
+        env_block = win32.CreateEnvironmentBlock(token)
+        try:
+            return bytes(EnvironmentBlock.from_address(env_block))
+        finally:
+            win32.DestroyEnvironmentBlock(env_block)
+    finally:
+        win32.CloseHandle(token)
+
+
 class WndProc(metaclass=abc.ABCMeta):
 
     """Implement this interface to to customise window behaviour."""
@@ -144,7 +399,7 @@ class WindowClass(WndProc):
                 win32.GWLP_USERDATA,
                 cast(actual_wnd_proc, ctypes.c_void_p).value)
         else:
-            actual_wnd_proc = cast(win32.GetWindowLongPtr(
+            actual_wnd_proc = cast(win32.GetWindowLongPtr.raw(
                 window_handle, win32.GWLP_USERDATA), win32.WNDPROC)
 
         if not actual_wnd_proc:
@@ -175,10 +430,17 @@ class RunLoop:
 
     def run(self):
         message = win32.MSG()
+        message_ptr = byref(message)
         handle_count = 0
 
+        # Every message goes through these, so skip paramflags processing.
+        wait_for_messages = win32.MsgWaitForMultipleObjectsEx.raw
+        peek_message = win32.PeekMessage.raw
+        translate_message = win32.TranslateMessage.raw
+        dispatch_message = win32.DispatchMessage.raw
+
         while True:
-            result = win32.MsgWaitForMultipleObjectsEx(
+            result = wait_for_messages(
                 0, None, win32.INFINITE, win32.QS_ALLINPUT,
                 win32.MWMO_INPUTAVAILABLE)
 
@@ -194,14 +456,14 @@ class RunLoop:
 
             elif result == win32.WAIT_OBJECT_0 + handle_count:
                 # windows message
-                if not win32.PeekMessage(byref(message)):
+                if not peek_message(message_ptr, None, 0, 0, win32.PM_REMOVE):
                     continue
 
                 if message.message == win32.WM_QUIT:
                     return message.w_param
                 else:
-                    win32.TranslateMessage(byref(message))
-                    win32.DispatchMessage(byref(message))
+                    translate_message(message_ptr)
+                    dispatch_message(message_ptr)
 
             elif result == win32.WAIT_IO_COMPLETION:
                 # APC
@@ -4,6 +4,8 @@ from ctypes.wintypes import *
 from .ctypes_utils import OUTPUT_PARAM, Win32Func, Win32OLEFunc
 from .libc import c_intptr
 from ._constants import *
+from . import _winerror
+from ._winerror import NO_ERROR, S_OK
 import sys
 from uuid import UUID
 
@@ -11,6 +13,16 @@ HCURSOR = HICON
 LRESULT = c_intptr
 LONG_PTR = c_intptr
 
+
+def __getattr__(name):
+    # Error codes are resolved lazily; see _winerror.
+    try:
+        return getattr(_winerror, name)
+    except AttributeError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name)) from None
+
+
 def _is_valid_handle(h, *args):
     return h and h != INVALID_HANDLE_VALUE
 
@@ -141,6 +153,12 @@ DuplicateHandle = Win32Func(
 
 CloseHandle = Win32Func('CloseHandle', 'kernel32', BOOL, [HANDLE])
 
+SetHandleInformation = Win32Func(
+    'SetHandleInformation', 'kernel32', BOOL,
+    [('object', HANDLE),
+     ('mask', DWORD),
+     ('flags', DWORD)])
+
 ###############################################################################
 
 
@@ -152,6 +170,62 @@ class SECURITY_ATTRIBUTES(ctypes.Structure):
     )
 
 
+CreateFile = Win32Func(
+    'CreateFileW', 'kernel32', HANDLE,
+    [('file_name', LPCWSTR),
+     ('desired_access', DWORD),
+     ('share_mode', DWORD, 0),
+     ('security_attributes', POINTER(SECURITY_ATTRIBUTES), None),
+     ('creation_disposition', DWORD, OPEN_EXISTING),
+     ('flags_and_attributes', DWORD, 0),
+     ('template_file', HANDLE, None)],
+    _is_valid_handle)
+
+
+class OVERLAPPED(ctypes.Structure):
+    _fields_ = (
+        ('internal', ctypes.c_size_t),
+        ('internal_high', ctypes.c_size_t),
+        ('offset', DWORD),
+        ('offset_high', DWORD),
+        ('event', HANDLE)
+    )
+
+ReadFile = Win32Func(
+    'ReadFile', 'kernel32', BOOL,
+    [('file', HANDLE),
+     ('buffer', LPVOID),
+     ('number_of_bytes_to_read', DWORD),
+     ('number_of_bytes_read', LPDWORD, None),
+     ('overlapped', POINTER(OVERLAPPED), None)])
+
+WriteFile = Win32Func(
+    'WriteFile', 'kernel32', BOOL,
+    [('file', HANDLE),
+     ('buffer', LPVOID),
+     ('number_of_bytes_to_write', DWORD),
+     ('number_of_bytes_written', LPDWORD, None),
+     ('overlapped', POINTER(OVERLAPPED), None)])
+
+GetOverlappedResult = Win32Func(
+    'GetOverlappedResult', 'kernel32', BOOL,
+    [('file', HANDLE),
+     ('overlapped', POINTER(OVERLAPPED)),
+     ('number_of_bytes_transferred', LPDWORD, OUTPUT_PARAM),
+     ('wait', BOOL, True)])
+
+CreateEvent = Win32Func(
+    'CreateEventW', 'kernel32', HANDLE,
+    [('event_attributes', POINTER(SECURITY_ATTRIBUTES), None),
+     ('manual_reset', BOOL, True),
+     ('initial_state', BOOL, False),
+     ('name', LPCWSTR, None)],
+    _is_valid_handle)
+
+GetFileType = Win32Func('GetFileType', 'kernel32', DWORD,
+                        [('file', HANDLE)], success_predicate=None)
+
+
 class SID(ctypes.Structure):
     pass
 
@@ -177,6 +251,49 @@ CheckTokenMembership = Win32Func(
      ('sid_to_check', POINTER(SID)),
      ('is_member', POINTER(BOOL), OUTPUT_PARAM)])
 
+OpenProcessToken = Win32Func(
+    'OpenProcessToken', 'advapi32', BOOL,
+    [('process_handle', HANDLE),
+     ('desired_access', DWORD),
+     ('token_handle', POINTER(HANDLE), OUTPUT_PARAM)])
+
+
+class SID_AND_ATTRIBUTES(ctypes.Structure):
+    _fields_ = (
+        ('sid', POINTER(SID)),
+        ('attributes', DWORD)
+    )
+
+
+class TOKEN_GROUPS(ctypes.Structure):
+    _fields_ = (
+        ('group_count', DWORD),
+        ('groups', SID_AND_ATTRIBUTES * 1)
+    )
+
+GetTokenInformation = Win32Func(
+    'GetTokenInformation', 'advapi32', BOOL,
+    [('token_handle', HANDLE),
+     ('token_information_class', DWORD),
+     ('token_information', LPVOID),
+     ('token_information_length', DWORD),
+     ('return_length', LPDWORD)])
+
+ConvertSidToStringSid = Win32Func(
+    'ConvertSidToStringSidW', 'advapi32', BOOL,
+    [('sid', POINTER(SID)),
+     ('string_sid', POINTER(LPVOID), OUTPUT_PARAM)])
+
+ConvertStringSecurityDescriptorToSecurityDescriptor = Win32Func(
+    'ConvertStringSecurityDescriptorToSecurityDescriptorW', 'advapi32', BOOL,
+    [('string_security_descriptor', LPCWSTR),
+     ('string_sd_revision', DWORD),
+     ('security_descriptor', POINTER(LPVOID), OUTPUT_PARAM),
+     ('security_descriptor_size', LPDWORD, None)])
+
+LocalFree = Win32Func('LocalFree', 'kernel32', HLOCAL, [('mem', HLOCAL)],
+                      lambda result, *_: not result)
+
 ###############################################################################
 
 SetStdHandle = Win32Func('SetStdHandle', 'kernel32', BOOL, [DWORD, HANDLE])
@@ -187,6 +304,8 @@ GetStdHandle = Win32Func('GetStdHandle', 'kernel32', HANDLE, [DWORD],
 AttachConsole = Win32Func('AttachConsole', 'kernel32', BOOL,
                           [('process_id', DWORD)])
 
+FreeConsole = Win32Func('FreeConsole', 'kernel32', BOOL, [])
+
 WriteConsole = Win32Func(
     'WriteConsoleW', 'kernel32', BOOL,
     [('console_output', HANDLE),
@@ -287,6 +406,14 @@ GetEnvironmentStrings = Win32Func(
 FreeEnvironmentStrings = Win32Func(
     'FreeEnvironmentStringsW', 'kernel32', BOOL, [POINTER(c_wchar)])
 
+CreateEnvironmentBlock = Win32Func(
+    'CreateEnvironmentBlock', 'userenv', BOOL,
+    [('environment', POINTER(LPVOID), OUTPUT_PARAM),
+     ('token', HANDLE),
+     ('inherit', BOOL, False)])
+DestroyEnvironmentBlock = Win32Func(
+    'DestroyEnvironmentBlock', 'userenv', BOOL, [('environment', LPVOID)])
+
 
 GetProcessTimes = Win32Func(
     'GetProcessTimes', 'kernel32', BOOL,
@@ -297,6 +424,31 @@ GetProcessTimes = Win32Func(
      ('user_time', POINTER(FILETIME), OUTPUT_PARAM)])
 
 
+GetExitCodeProcess = Win32Func(
+    'GetExitCodeProcess', 'kernel32', BOOL,
+    [('process', HANDLE),
+     ('exit_code', LPDWORD, OUTPUT_PARAM)])
+
+class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+    _fields_ = (
+        ('cb', DWORD),
+        ('page_fault_count', DWORD),
+        ('peak_working_set_size', ctypes.c_size_t),
+        ('working_set_size', ctypes.c_size_t),
+        ('quota_peak_paged_pool_usage', ctypes.c_size_t),
+        ('quota_paged_pool_usage', ctypes.c_size_t),
+        ('quota_peak_non_paged_pool_usage', ctypes.c_size_t),
+        ('quota_non_paged_pool_usage', ctypes.c_size_t),
+        ('pagefile_usage', ctypes.c_size_t),
+        ('peak_pagefile_usage', ctypes.c_size_t)
+    )
+
+GetProcessMemoryInfo = Win32Func(
+    'K32GetProcessMemoryInfo', 'kernel32', BOOL,
+    [('process', HANDLE),
+     ('counters', POINTER(PROCESS_MEMORY_COUNTERS), OUTPUT_PARAM),
+     ('cb', DWORD)])
+
 GetCurrentProcessId = Win32Func('GetCurrentProcessId', 'kernel32', DWORD, [])
 GetCurrentProcess = Win32Func('GetCurrentProcess', 'kernel32', HANDLE, [])
 
@@ -317,10 +469,60 @@ MsgWaitForMultipleObjectsEx = Win32Func(
      ('wake_mask', DWORD),
      ('flags', DWORD)])
 
+CreatePipe = Win32Func(
+    'CreatePipe', 'kernel32', BOOL,
+    [('read_pipe', POINTER(HANDLE), OUTPUT_PARAM),
+     ('write_pipe', POINTER(HANDLE), OUTPUT_PARAM),
+     ('pipe_attributes', POINTER(SECURITY_ATTRIBUTES), None),
+     ('size', DWORD, 0)])
+
+CreateNamedPipe = Win32Func(
+    'CreateNamedPipeW', 'kernel32', HANDLE,
+    [('name', LPCWSTR),
+     ('open_mode', DWORD),
+     ('pipe_mode', DWORD),
+     ('max_instances', DWORD),
+     ('out_buffer_size', DWORD),
+     ('in_buffer_size', DWORD),
+     ('default_timeout', DWORD),
+     ('security_attributes', POINTER(SECURITY_ATTRIBUTES), None)],
+    _is_valid_handle)
+
+ConnectNamedPipe = Win32Func(
+    'ConnectNamedPipe', 'kernel32', BOOL,
+    [('pipe', HANDLE),
+     ('overlapped', LPVOID, None)])
+
+GetNamedPipeServerProcessId = Win32Func(
+    'GetNamedPipeServerProcessId', 'kernel32', BOOL,
+    [('pipe', HANDLE),
+     ('server_process_id', PULONG, OUTPUT_PARAM)])
+
+GetNamedPipeClientProcessId = Win32Func(
+    'GetNamedPipeClientProcessId', 'kernel32', BOOL,
+    [('pipe', HANDLE),
+     ('client_process_id', PULONG, OUTPUT_PARAM)])
+
 WaitForSingleObject = Win32Func(
     'WaitForSingleObject', 'kernel32', DWORD, [HANDLE, DWORD],
     lambda result, *_: result != WAIT_FAILED)
 
+WAITORTIMERCALLBACK = ctypes.WINFUNCTYPE(None, LPVOID, BOOLEAN)
+
+RegisterWaitForSingleObject = Win32Func(
+    'RegisterWaitForSingleObject', 'kernel32', BOOL,
+    [('new_wait_object', POINTER(HANDLE), OUTPUT_PARAM),
+     ('object', HANDLE),
+     ('callback', WAITORTIMERCALLBACK),
+     ('context', LPVOID, None),
+     ('milliseconds', ULONG, INFINITE),
+     ('flags', ULONG, WT_EXECUTEONLYONCE)])
+
+UnregisterWaitEx = Win32Func(
+    'UnregisterWaitEx', 'kernel32', BOOL,
+    [('wait_handle', HANDLE),
+     ('completion_event', HANDLE, None)])
+
 PostMessage = Win32Func(
     'PostMessageW', 'user32', BOOL,
     [('hwnd', HWND),
@@ -25,7 +25,7 @@ setup(
     packages=find_packages(),
     install_requires=[],
     
-    package_data={},
+    package_data={'elevate': ['_winerror.bin', '_winerror_messages.bin']},
     entry_points={
         'console_scripts': [
             'elevate=elevate.elevate:main',
@@ -0,0 +1,104 @@
+import asyncio
+import sys
+
+import pytest
+
+from elevate import aio
+
+
+def test_exit_codes():
+    async def main():
+        return await asyncio.gather(*(
+            aio.spawn(['sh', '-c', 'exit {}'.format(code)])
+            for code in (0, 3, 255)))
+
+    assert asyncio.run(main()) == [0, 3, 255]
+
+
+def test_cancelled_wait_leaves_loop_usable():
+    async def main():
+        waiting = asyncio.ensure_future(aio.spawn(['sleep', '0.2']))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return await aio.spawn(['sh', '-c', 'exit 4'])
+
+    assert asyncio.run(main()) == 4
+
+
+def test_client_argv_runs_the_package_with_our_interpreter():
+    argv = aio.client_argv(['cmd', '/c', 'dir'], environment_overrides={
+        'A': '1', 'B': None}, broker=True, broker_timeout=30)
+    assert argv == [sys.executable, '-m', 'elevate.elevate', '--spill',
+                    'fail', '--env', 'A=1', '--unset', 'B', '--broker',
+                    '--broker-timeout', '30', 'cmd', '/c', 'dir']
+
+
+class FakeClients:
+
+    """Stands in for aio.spawn(), recording how many clients run at once."""
+
+    def __init__(self, exit_code=0):
+        self.exit_code = exit_code
+        self.running = self.most = self.started = 0
+
+    async def __call__(self, argv):
+        self.started += 1
+        self.running += 1
+        self.most = max(self.most, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return self.exit_code
+
+
+def run_gated(monkeypatch, clients, count, idle_timeout=60):
+    monkeypatch.setattr(aio, 'spawn', clients)
+
+    async def main():
+        gate = aio._BrokerGate()
+        return await asyncio.gather(*(gate.spawn(['x'], idle_timeout)
+                                      for _ in range(count)))
+
+    return asyncio.run(main())
+
+
+def test_first_broker_run_goes_alone(monkeypatch):
+    clients = FakeClients()
+    assert run_gated(monkeypatch, clients, 8) == [0] * 8
+    # The first run launches the broker; the other seven then share it.
+    assert clients.most == 7
+
+
+def test_declined_prompt_keeps_runs_serialized(monkeypatch):
+    clients = FakeClients(exit_code=1)
+    run_gated(monkeypatch, clients, 4)
+    assert clients.most == 1
+    assert clients.started == 4
+
+
+def test_broker_presumed_gone_after_idle(monkeypatch):
+    clients = FakeClients()
+    monkeypatch.setattr(aio, 'spawn', clients)
+
+    async def main():
+        gate = aio._BrokerGate()
+        await gate.spawn(['x'], 0.02)
+        await asyncio.sleep(0.02)
+        clients.most = 0
+        await asyncio.gather(*(gate.spawn(['x'], 0.02) for _ in range(3)))
+
+    asyncio.run(main())
+    assert clients.most == 2
+
+
+def test_runs_without_broker_are_not_gated(monkeypatch):
+    clients = FakeClients()
+    monkeypatch.setattr(aio, 'spawn', clients)
+
+    async def main():
+        return await asyncio.gather(*(aio.run(['x']) for _ in range(4)))
+
+    completed = asyncio.run(main())
+    assert [c.exit_code for c in completed] == [0] * 4
+    assert clients.most == 4
@@ -0,0 +1,80 @@
+import io
+import subprocess
+import sys
+
+from elevate import batch, protocol
+
+
+def test_read_commands():
+    assert batch.read_commands([
+        '# comment', '', '  "C:\\Program Files\\x.exe" a "b c"',
+        'y.exe']) == [['C:\\Program Files\\x.exe', 'a', 'b c'], ['y.exe']]
+
+
+def run_command(argv):
+    process = subprocess.run(argv, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+    return process.returncode, process.stdout, None
+
+
+def run_batch(commands, jobs, dependencies=None):
+    stream = io.BytesIO()
+    channel = protocol.Channel(stream)
+    batch.run(channel, protocol.Batch(commands, jobs, dependencies),
+              run_command)
+    protocol.send_done(channel)
+    stream.seek(0)
+    return list(protocol.receive_results(channel))
+
+
+def sleeper(seconds, text):
+    return [sys.executable, '-c',
+            'import time; time.sleep({}); print({!r})'.format(seconds, text)]
+
+
+def test_results_arrive_as_commands_finish():
+    commands = [sleeper(0.3, 'slow'), sleeper(0, 'fast'),
+                [sys.executable, '-c', 'import sys; sys.exit(3)'],
+                ['/nonexistent/program']]
+    results = run_batch(commands, 4)
+    assert sorted(result.index for result in results) == [0, 1, 2, 3]
+    assert results[-1].index == 0
+
+    by_index = {result.index: result for result in results}
+    assert bytes(by_index[0].output).strip() == b'slow'
+    assert by_index[0].duration >= 0.3
+    assert batch.succeeded(by_index[1])
+    assert by_index[2].exit_code == 3
+    assert not batch.succeeded(by_index[2])
+    # A command that couldn't start says why.
+    assert by_index[3].exit_code is None
+    assert bytes(by_index[3].output)
+    assert 'failed to start' in batch.describe(by_index[3], commands)
+
+
+def test_jobs_limit_concurrency():
+    commands = [sleeper(0.1, i) for i in range(4)]
+    results = run_batch(commands, 1)
+    # One at a time, they finish in order.
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert sorted(bytes(result.output) for result in results) == [
+        '{}\n'.format(i).encode() for i in range(4)]
+
+
+def test_describe():
+    commands = [['tool.exe', 'a b'], ['other.exe']]
+    result = protocol.Result(0, 2, 1.25, b'')
+    assert batch.describe(result, commands) == (
+        '[1/2] exit 2 in 1.25 s: tool.exe "a b"')
+    assert batch.describe(result, commands, ['build', 'test']).startswith(
+        '[build] exit 2')
+
+
+def test_time_summary():
+    result = protocol.Result(0, 0, 61.5, b'', usage=protocol.Usage(
+        1.25, 0.5, 64 << 20))
+    assert batch.time_summary(result).split('\n') == [
+        'real\t1m1.500s', 'user\t0m1.250s', 'sys\t0m0.500s',
+        'peak\t64.0 MiB']
+    assert batch.time_summary(protocol.Result(0, 0, 0.5, b'')) == (
+        'real\t0m0.500s')
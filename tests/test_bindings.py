@@ -0,0 +1,48 @@
+import ctypes
+import ctypes.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+from elevate import _bindings, ctypes_utils
+from elevate.ctypes_utils import CFunc
+
+GEN_BINDINGS = os.path.join(os.path.dirname(__file__), os.pardir, 'tools',
+                            'gen_bindings.py')
+
+
+def test_generated_bindings_are_current():
+    subprocess.run([sys.executable, GEN_BINDINGS, '--check'], check=True)
+
+
+@pytest.mark.parametrize('key', list(_bindings.PARAM_FLAGS))
+def test_generated_flags_match_runtime(key):
+    signature, param_flags = _bindings.PARAM_FLAGS[key]
+    # Put a type back in each descriptor, as the declarations have.
+    descriptors = [(elem[0], ctypes.c_int) + elem[1:] if elem
+                   else ctypes.c_int for elem in signature]
+    assert ctypes_utils._param_flags(descriptors) == param_flags
+    assert ctypes_utils._precomputed_param_flags(
+        *key, descriptors) is param_flags
+
+
+@pytest.mark.skipif(sys.platform == 'win32'
+                    or not ctypes.util.find_library('c'),
+                    reason='needs a C library other than msvcrt')
+def test_stale_flags_are_not_used(monkeypatch):
+    monkeypatch.setitem(ctypes_utils.library_overrides, 'msvcrt',
+                        ctypes.util.find_library('c'))
+    monkeypatch.setitem(_bindings.PARAM_FLAGS, ('msvcrt', 'strlen'), (
+        (('string',),),
+        ((1, 'string'),),
+    ))
+    strlen = CFunc('strlen', 'msvcrt', ctypes.c_size_t,
+                   [('string', ctypes.c_char_p)], lazy=False)
+    assert strlen(string=b'abc') == 3
+
+    # Renamed since the table was generated: the table must be ignored.
+    strlen = CFunc('strlen', 'msvcrt', ctypes.c_size_t,
+                   [('s', ctypes.c_char_p)], lazy=False)
+    assert strlen(s=b'abc') == 3
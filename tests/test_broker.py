@@ -0,0 +1,163 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from elevate import broker, protocol
+from elevate.environment import EnvironmentBlock, serialize
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                                reason='needs Unix domain sockets')
+
+BASELINE = EnvironmentBlock(serialize(
+    [('PATH', 'C:\\Windows\\system32'), ('TEMP', 'C:\\Temp')]))
+CLIENT_ENVIRONMENT = EnvironmentBlock(serialize(
+    [('PATH', 'C:\\venv\\Scripts;C:\\Windows\\system32'),
+     ('PROMPT', '$P$G'), ('TEMP', 'C:\\Temp')]))
+
+
+def request(client, call):
+    return protocol.Request(1000 + client, call, (0, 0, 0),
+                            ['C:\\Windows\\system32\\cmd.exe', '/c',
+                             'echo {} {}'.format(client, call)],
+                            'fail', {'CLIENT': str(client)})
+
+
+def _socket_stream(sock):
+    stream = sock.makefile('rwb', buffering=0)
+    # The stream keeps the connection open until it is closed too.
+    sock.close()
+    return stream
+
+
+class SocketListener:
+
+    """A broker.Broker listener on a Unix domain socket at |path|."""
+
+    def __init__(self, path):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX)
+        self._socket.bind(path)
+        self._socket.listen()
+
+    def accept(self):
+        connection, _ = self._socket.accept()
+        return protocol.Channel(_socket_stream(connection))
+
+    def wake(self):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.path)
+
+    def close(self):
+        self._socket.close()
+        os.remove(self.path)
+
+
+def connect_socket(path):
+    """Connect to a SocketListener, or return None if nothing listens at
+    |path|."""
+    sock = socket.socket(socket.AF_UNIX)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return protocol.Channel(_socket_stream(sock))
+
+
+class RunningBroker:
+
+    """A Broker serving on a thread, recording the requests it's handed."""
+
+    def __init__(self, path, idle_timeout=5, workers=4, run=None):
+        self.path = str(path)
+        self.received = []
+        self.environments = []
+        self.served = []
+        self._run = run
+        self.broker = broker.Broker(
+            SocketListener(self.path),
+            lambda channel: broker.handle(channel, [BASELINE], self.run),
+            idle_timeout=idle_timeout, workers=workers)
+        self.thread = threading.Thread(
+            target=lambda: self.served.append(self.broker.serve()))
+        self.thread.start()
+
+    def run(self, channel, request, environment_block):
+        self.received.append(request)
+        self.environments.append(dict(environment_block))
+        if self._run:
+            self._run(channel, request, environment_block)
+
+    def submit(self, request, on_result=None):
+        channel = connect_socket(self.path)
+        assert channel is not None
+        with channel:
+            return broker.submit(channel, request, CLIENT_ENVIRONMENT,
+                                 BASELINE, on_result)
+
+    def stop(self):
+        self.broker.stop()
+        self.thread.join(5)
+        assert not self.thread.is_alive()
+
+
+def test_requests_arrive_intact(tmp_path):
+    service = RunningBroker(tmp_path / 'broker')
+
+    def client(number):
+        for call in range(10):
+            assert service.submit(request(number, call))
+
+    clients = [threading.Thread(target=client, args=(number,))
+               for number in range(8)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    service.stop()
+
+    assert service.served == [80]
+    assert sorted(service.received) == sorted(
+        request(number, call) for number in range(8) for call in range(10))
+    assert all(environment == dict(CLIENT_ENVIRONMENT)
+               for environment in service.environments)
+
+
+def test_results_reach_the_client(tmp_path):
+    def run(channel, request, environment_block):
+        protocol.send_result(channel, protocol.Result(0, 7, 0.5, b'out'))
+
+    service = RunningBroker(tmp_path / 'broker', run=run)
+    results = []
+    assert service.submit(request(0, 0), results.append)
+    service.stop()
+    result, = results
+    assert (result.exit_code, bytes(result.output)) == (7, b'out')
+
+
+def test_exits_when_idle(tmp_path):
+    service = RunningBroker(tmp_path / 'broker', idle_timeout=0.2)
+    assert service.submit(request(0, 0))
+    start = time.perf_counter()
+    service.thread.join(5)
+    assert not service.thread.is_alive()
+    assert time.perf_counter() - start >= 0.15
+    assert service.served == [1]
+    # Its socket is gone, so the next client knows to start a helper.
+    assert connect_socket(service.path) is None
+
+
+def test_a_failing_handler_does_not_stop_the_broker(tmp_path):
+    def run(channel, request, environment_block):
+        if request.process_start_time == 0:
+            raise RuntimeError('command failed')
+
+    service = RunningBroker(tmp_path / 'broker', run=run)
+    with pytest.raises(protocol.ProtocolError):
+        service.submit(request(0, 0))
+    assert service.submit(request(0, 1))
+    service.stop()
+    assert service.served == [2]
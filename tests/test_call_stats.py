@@ -0,0 +1,94 @@
+import ctypes
+import ctypes.util
+import json
+import sys
+
+import pytest
+
+from elevate import call_stats, ctypes_utils
+from elevate.ctypes_utils import CFunc
+
+pytestmark = pytest.mark.skipif(
+    sys.platform != 'win32' and not ctypes.util.find_library('c'),
+    reason='needs a C library')
+
+CLOSE = '_close' if sys.platform == 'win32' else 'close'
+
+
+@pytest.fixture(autouse=True)
+def libc(monkeypatch):
+    if sys.platform != 'win32':
+        monkeypatch.setitem(ctypes_utils.library_overrides, 'msvcrt',
+                            ctypes.util.find_library('c'))
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(call_stats, '_stats', None)
+    call_stats.enable()
+    return call_stats
+
+
+def bindings():
+    # Bound now, so they're instrumented or not as statistics are now.
+    strlen = CFunc('strlen', 'msvcrt', ctypes.c_size_t,
+                   [('s', ctypes.c_char_p)], lazy=False)
+    close = CFunc(CLOSE, 'msvcrt', ctypes.c_int, [('fd', ctypes.c_int)],
+                  lazy=False)
+    return strlen, close
+
+
+def test_disabled_bindings_are_not_wrapped(monkeypatch):
+    monkeypatch.setattr(call_stats, '_stats', None)
+    strlen, _ = bindings()
+    assert strlen(b'abc') == 3
+    assert not isinstance(strlen, call_stats._InstrumentedFunc)
+    assert call_stats.snapshot() == {}
+
+
+def test_counts_calls_failures_and_latency(stats):
+    strlen, close = bindings()
+    for _ in range(100):
+        assert strlen(b'abc') == 3
+    for _ in range(10):
+        assert strlen.raw(b'abcd') == 4
+    for _ in range(5):
+        with pytest.raises(OSError):
+            close(-1)
+
+    snapshot = stats.snapshot()
+    assert set(snapshot) == {'msvcrt!strlen', 'msvcrt!' + CLOSE}
+
+    strlen_stats = snapshot['msvcrt!strlen']
+    # .raw calls count towards the binding's statistics.
+    assert strlen_stats['calls'] == 110
+    assert strlen_stats['failures'] == 0
+    assert sum(strlen_stats['histogram'].values()) == 110
+    assert strlen_stats['total_seconds'] > 0
+    assert 0 < strlen_stats['mean_ns'] <= strlen_stats['total_seconds'] * 1e9
+    assert (0 < strlen_stats['p50_ns'] <= strlen_stats['p90_ns']
+            <= strlen_stats['p99_ns'])
+
+    close_stats = snapshot['msvcrt!' + CLOSE]
+    assert close_stats['calls'] == 5
+    assert close_stats['failures'] == 5
+
+
+def test_percentile_buckets():
+    stats = call_stats.CallStats()
+    for elapsed_ns in [100] * 90 + [5000] * 10:
+        stats.record(elapsed_ns)
+    # 100 ns falls in [64, 128), and 5000 ns in [4096, 8192).
+    assert stats.percentile(0.5) == 128
+    assert stats.percentile(0.9) == 128
+    assert stats.percentile(0.99) == 8192
+    assert call_stats.CallStats().percentile(0.5) == 0
+
+
+def test_dump(stats, tmp_path):
+    strlen, _ = bindings()
+    strlen(b'abc')
+    path = tmp_path / 'stats.json'
+    stats.dump(str(path))
+    with open(path) as f:
+        assert json.load(f)['msvcrt!strlen']['calls'] == 1
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from elevate.command_line import (
+    CommandLineTooLong, MAX_COMMAND_LINE, ResponseFilePolicy,
+    argv_to_command_line, command_line_for, command_line_to_argv)
+
+# Characters that exercise every quoting rule.
+ALPHABET = ('a', 'Z', '1', '.', 'é', ' ', '\t', '\n', '"', '\\', '\\"', '""',
+            '&', '|', '%', '^')
+
+
+@pytest.mark.parametrize('arg', [
+    'a&b', 'a|b', 'a<b', 'a>b', 'a^b', '%PATH%', '!x!', '(a)', 'a,b', 'a;b',
+    'a=b'])
+def test_cmd_metacharacters_are_quoted(arg):
+    # A .bat or .cmd target runs through cmd.exe, which would act on these.
+    assert argv_to_command_line(['tool.bat', arg]) == 'tool.bat "{}"'.format(
+        arg)
+
+
+def test_plain_arguments_are_not_quoted():
+    assert (argv_to_command_line(['tool.exe', '-o', r'C:\out\file.obj'])
+            == r'tool.exe -o C:\out\file.obj')
+
+
+def test_empty_argument_is_quoted():
+    assert argv_to_command_line(['tool.exe', '']) == 'tool.exe ""'
+
+
+# The examples in Microsoft's "Parsing C++ command-line arguments".
+@pytest.mark.parametrize('command_line, expected', [
+    (r'"abc" d e', ['abc', 'd', 'e']),
+    (r'a\\\b d"e f"g h', [r'a\\\b', 'de fg', 'h']),
+    (r'a\\\"b c d', [r'a\"b', 'c', 'd']),
+    (r'a\\\\"b c" d e', [r'a\\b c', 'd', 'e']),
+    (r'a"b"" c d', ['ab" c d']),
+])
+def test_parses_documented_examples(command_line, expected):
+    assert command_line_to_argv('prog ' + command_line) == ['prog'] + expected
+
+
+def test_program_name_has_no_escapes():
+    assert command_line_to_argv(r'"C:\a b\tool.exe" x') == [
+        r'C:\a b\tool.exe', 'x']
+    assert command_line_to_argv(r'C:\a\"b x') == [r'C:\a\"b', 'x']
+
+
+def test_empty_command_line():
+    assert command_line_to_argv('') == []
+    assert command_line_to_argv(' \t') == []
+
+
+def test_round_trip():
+    rng = random.Random(0)
+    for _ in range(5000):
+        argv = [r'C:\Program Files\tool.exe'] + [
+            ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 8)))
+            for _ in range(rng.randint(0, 6))]
+        assert command_line_to_argv(argv_to_command_line(argv)) == argv
+
+
+def test_long_command_line_fails_by_default():
+    argv = ['tool.exe', 'x' * MAX_COMMAND_LINE]
+    with pytest.raises(CommandLineTooLong):
+        with command_line_for(argv):
+            pass
+
+
+def test_long_command_line_spills_to_response_file():
+    argv = ['tool.exe'] + ['arg {}'.format(i) for i in range(5000)]
+    with command_line_for(argv, ResponseFilePolicy()) as command_line:
+        program, response = command_line_to_argv(command_line)
+        assert program == 'tool.exe'
+        assert response.startswith('@')
+        with open(response[1:], encoding='utf-8') as f:
+            assert f.read().splitlines() == [
+                argv_to_command_line([arg]) for arg in argv[1:]]
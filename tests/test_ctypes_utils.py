@@ -0,0 +1,127 @@
+import ctypes
+import ctypes.util
+import errno
+import sys
+import tracemalloc
+
+import pytest
+
+from elevate import ctypes_utils
+from elevate.ctypes_utils import CFunc
+
+pytestmark = pytest.mark.skipif(
+    sys.platform != 'win32' and not ctypes.util.find_library('c'),
+    reason='needs a C library')
+
+
+@pytest.fixture(autouse=True)
+def libc(monkeypatch):
+    if sys.platform != 'win32':
+        monkeypatch.setitem(ctypes_utils.library_overrides, 'msvcrt',
+                            ctypes.util.find_library('c'))
+
+
+@pytest.mark.parametrize('ctype, integral', [
+    (ctypes.c_int, True),
+    (ctypes.c_uint32, True),
+    (ctypes.c_size_t, True),
+    (ctypes.c_longlong, True),
+    (ctypes.c_bool, False),
+    (ctypes.c_double, False),
+    (ctypes.c_char_p, False),
+    (ctypes.c_void_p, False),
+    (ctypes.POINTER(ctypes.c_int), False),
+])
+def test_is_integral(ctype, integral):
+    assert ctypes_utils._is_integral(ctype) is integral
+
+
+def test_default_errcheck_raises_on_failure():
+    close = CFunc('_close' if sys.platform == 'win32' else 'close',
+                  'msvcrt', ctypes.c_int, [('fd', ctypes.c_int)])
+    assert close.errcheck is not None
+    assert close.raw.errcheck is not None
+    with pytest.raises(OSError) as info:
+        close(-1)
+    assert info.value.errno == errno.EBADF
+    with pytest.raises(OSError):
+        close.raw(-1)
+
+
+def test_default_errcheck_passes_results_through():
+    abs_ = CFunc('abs', 'msvcrt', ctypes.c_int, [('n', ctypes.c_int)])
+    assert abs_.errcheck is not None
+    assert abs_(-5) == 5
+    assert abs_.raw(-5) == 5
+
+
+def test_no_errcheck_for_unsigned_results():
+    # The default predicate can't fail for them.
+    strlen = CFunc('strlen', 'msvcrt', ctypes.c_size_t,
+                   [('s', ctypes.c_char_p)])
+    assert strlen.errcheck is None
+    assert strlen.raw.errcheck is None
+    assert strlen(b'hello') == 5
+    assert strlen.raw(b'hello') == 5
+
+
+def test_no_errcheck_for_pointer_results():
+    strchr = CFunc('strchr', 'msvcrt', ctypes.c_char_p,
+                   [('s', ctypes.c_char_p), ('c', ctypes.c_int)])
+    assert strchr.errcheck is None
+    assert strchr(b'abc', ord('z')) is None
+
+
+def test_no_errcheck_without_predicate():
+    close = CFunc('_close' if sys.platform == 'win32' else 'close',
+                  'msvcrt', ctypes.c_int, [('fd', ctypes.c_int)],
+                  success_predicate=None)
+    assert close.errcheck is None
+    assert close(-1) == -1
+
+
+class timeval(ctypes.Structure):
+    _fields_ = (('tv_sec', ctypes.c_long), ('tv_usec', ctypes.c_long))
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='no gettimeofday')
+def test_pooled_reuses_output_buffers():
+    gettimeofday = CFunc(
+        'gettimeofday', 'msvcrt', ctypes.c_int,
+        [('tv', ctypes.POINTER(timeval), ctypes_utils.OUTPUT_PARAM),
+         ('tz', ctypes.c_void_p, None)])
+    fresh = gettimeofday()
+    pooled = gettimeofday.pooled()
+    assert isinstance(pooled, timeval)
+    assert pooled.tv_sec >= fresh.tv_sec
+    # The same thread-local buffer comes back each time.
+    assert gettimeofday.pooled() is pooled
+    with pytest.raises(TypeError):
+        gettimeofday.pooled(None, None)
+
+
+def test_binding_report_counts_shared_prototypes():
+    before = ctypes_utils.binding_report()
+    strlen = CFunc('strlen', 'msvcrt', ctypes.c_size_t,
+                   [('s', ctypes.c_char_p)])
+    CFunc('strlen', 'msvcrt', ctypes.c_size_t, [('string', ctypes.c_char_p)])
+    report = ctypes_utils.binding_report()
+    assert report.bindings == before.bindings + 2
+    # Same signature, same function pointer type.
+    assert report.prototypes <= before.prototypes + 1
+    strlen(b'')
+    assert ctypes_utils.binding_report().resolved == report.resolved + 1
+
+
+def test_binding_report_measures_memory_when_tracing():
+    tracemalloc.start(3)
+    try:
+        before = ctypes_utils.binding_report().memory
+        strlen = CFunc('strlen', 'msvcrt', ctypes.c_size_t,
+                       [('s', ctypes.c_char_p)])
+        strlen(b'')
+        after = ctypes_utils.binding_report().memory
+    finally:
+        tracemalloc.stop()
+    assert after > before
+    assert ctypes_utils.binding_report().memory is None
@@ -0,0 +1,79 @@
+import ctypes
+import random
+
+import pytest
+
+from elevate import environment
+from elevate.environment import EnvironmentBlock, block_length, serialize
+
+# Characters that exercise the alignment rules: U+0100 encodes as 00 01.
+ALPHABET = ('a', 'Z', '=', ';', '\\', 'é', '\u0100', '\u0101', '\U0001F600')
+
+
+def random_items(rng):
+    def text(alphabet):
+        return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+    # Only the first character of a name may be '='.
+    name_alphabet = [c for c in ALPHABET if c != '=']
+    return [(rng.choice(('', '=')) + 'V' + text(name_alphabet),
+             text(ALPHABET))
+            for _ in range(rng.randint(0, 30))]
+
+
+def test_from_address_parses_random_blocks():
+    rng = random.Random(0)
+    for _ in range(1000):
+        items = random_items(rng)
+        data = serialize(items)
+        offset = rng.randrange(0, 8192, 2)
+        buffer = ctypes.create_string_buffer(
+            b'\1' * offset + data + b'\xff' * 8)
+        block = EnvironmentBlock.from_address(
+            ctypes.addressof(buffer) + offset)
+        expected = {}
+        for name, value in items:
+            expected.setdefault(name.upper(), value)
+        assert bytes(block) == data, items
+        assert {name.upper(): value
+                for name, value in block.items()} == expected, items
+
+
+def test_empty_block():
+    assert serialize([]) == b'\0\0\0\0'
+    assert block_length(b'\0\0\0\0\xff\xff') == 4
+    assert len(EnvironmentBlock(serialize([]))) == 0
+
+
+def test_unterminated_block():
+    with pytest.raises(ValueError):
+        block_length('A=\u0100'.encode('utf-16-le') + b'\0\0')
+
+
+def test_lookup_is_case_insensitive_and_keeps_the_first():
+    block = EnvironmentBlock(serialize([('Path', 'a'), ('PATH', 'b'),
+                                        ('=C:', 'C:\\')]))
+    assert block['path'] == 'a'
+    assert block['=c:'] == 'C:\\'
+    assert 'PATH' in block and 'other' not in block
+    assert len(block) == 2
+
+
+def test_build_sorts_and_applies_overrides():
+    base = EnvironmentBlock(serialize([('b', '2'), ('A', '1'), ('B', 'x')]))
+    block = environment.build(base, {'C': '3', 'a': None})
+    assert list(block.items()) == [('b', '2'), ('C', '3')]
+    with pytest.raises(ValueError):
+        environment.build(base, {'A=B': '1'})
+
+
+def test_offer_and_accept():
+    baseline = EnvironmentBlock(serialize([('PATH', 'C:\\bin'), ('A', '1')]))
+    block = EnvironmentBlock(serialize([('PATH', 'C:\\venv;C:\\bin'),
+                                        ('B', '2')]))
+    offered = environment.offer(block, baseline)
+    assert offered['delta'] == {'PATH': 'C:\\venv;C:\\bin', 'B': '2',
+                                'A': None}
+    other = EnvironmentBlock(serialize([('OTHER', '1')]))
+    accepted = environment.accept(offered, [other, baseline])
+    assert accepted == environment.build(block)
+    assert environment.accept(offered, [other]) is None
@@ -0,0 +1,122 @@
+import os
+import random
+import shutil
+import sys
+
+import pytest
+
+from elevate import path_index
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32',
+                                reason='uses POSIX permissions and symlinks')
+
+# Older than path_index's window for directories that just changed.
+OLD = 1_000_000_000
+
+NAMES = ['tool{}'.format(i) for i in range(12)]
+
+
+def make_file(path, executable):
+    with open(path, 'w'):
+        pass
+    os.chmod(path, 0o755 if executable else 0o644)
+
+
+def settle(directories):
+    """Backdate |directories|' mtimes, as if they hadn't changed lately."""
+    for directory in directories:
+        os.utime(directory, (OLD, OLD))
+
+
+def random_tree(root, rng, names):
+    """Directories holding some of |names| as executables, other files,
+    directories and broken symlinks; and a PATH of them with relative,
+    duplicate and missing entries."""
+    directories = []
+    for i in range(rng.randint(1, 12)):
+        directory = os.path.join(root, 'dir{}'.format(i))
+        os.mkdir(directory)
+        directories.append(directory)
+        for name in rng.sample(names, rng.randint(0, len(names))):
+            path = os.path.join(directory, name)
+            kind = rng.random()
+            if kind < 0.6:
+                make_file(path, executable=True)
+            elif kind < 0.8:
+                make_file(path, executable=False)
+            elif kind < 0.9:
+                os.mkdir(path)
+            else:
+                os.symlink(os.path.join(root, 'nowhere'), path)
+    settle(directories)
+
+    entries = [os.path.relpath(directory) if rng.random() < 0.3
+               else directory for directory in directories]
+    entries += rng.sample(entries, min(len(entries), rng.randint(0, 2)))
+    entries.append(os.path.join(root, 'missing'))
+    rng.shuffle(entries)
+    return directories, os.pathsep.join(entries)
+
+
+def assert_agrees(index, names, path, which=shutil.which):
+    for name in names + ['./tool0', 'nothing']:
+        assert index.which(name, path=path) == which(name, path=path), name
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_agrees_with_shutil_which(seed, tmp_path, monkeypatch):
+    rng = random.Random(seed)
+    root = str(tmp_path)
+    # Relative PATH entries are relative to here.
+    monkeypatch.chdir(root)
+    directories, path = random_tree(root, rng, NAMES)
+    cache_path = os.path.join(root, 'index.json')
+    index = path_index.PathIndex()
+    assert_agrees(index, NAMES, path)
+    index.save(cache_path)
+    assert_agrees(path_index.PathIndex.load(cache_path, path), NAMES, path)
+
+    # Change some directories; their mtimes move on.
+    for directory in rng.sample(directories, len(directories) // 2 + 1):
+        for name in rng.sample(NAMES, 3):
+            target = os.path.join(directory, name)
+            if os.path.lexists(target):
+                if os.path.isdir(target) and not os.path.islink(target):
+                    os.rmdir(target)
+                else:
+                    os.unlink(target)
+            else:
+                make_file(target, executable=True)
+        os.utime(directory, (OLD + 1, OLD + 1))
+    assert_agrees(path_index.PathIndex.load(cache_path, path), NAMES, path)
+    assert_agrees(index, NAMES, path)
+
+    # Drop a directory from PATH.
+    shorter = os.pathsep.join(path.split(os.pathsep)[1:])
+    assert_agrees(path_index.PathIndex.load(cache_path, shorter), NAMES,
+                  shorter)
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 12),
+                    reason="shutil.which() calls _winapi on Windows")
+@pytest.mark.parametrize('seed', range(10))
+def test_agrees_with_windows_search(seed, tmp_path, monkeypatch):
+    # Both search as on Windows, where the current directory comes first.
+    monkeypatch.setattr(sys, 'platform', 'win32')
+    monkeypatch.setenv('PATHEXT', '.EXE;.BAT')
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(seed)
+    names = ['tool{}{}'.format(i, ext) for i in range(6)
+             for ext in ['', '.EXE', '.BAT', '.TXT']]
+    _, path = random_tree(str(tmp_path), rng, names)
+    assert_agrees(path_index.PathIndex(),
+                  names + ['tool{}'.format(i) for i in range(6)], path)
+
+
+def test_directory_that_just_changed_is_not_trusted(tmp_path):
+    # It might change again within the same mtime.
+    root = str(tmp_path)
+    index = path_index.PathIndex()
+    assert index.which('tool', path=root) is None
+    make_file(os.path.join(root, 'tool'), executable=True)
+    assert index.which('tool', path=root) == os.path.join(root, 'tool')
@@ -0,0 +1,110 @@
+import io
+
+import pytest
+
+from elevate import batch, plan, protocol
+
+# name: (duration, steps it comes after)
+SETUP = {
+    'fetch-python': (3, []),
+    'fetch-git': (2, []),
+    'fetch-vs': (6, []),
+    'install-python': (4, ['fetch-python']),
+    'install-git': (2, ['fetch-git']),
+    'install-vs': (8, ['fetch-vs']),
+    'pip-packages': (3, ['install-python']),
+    'clone-repos': (3, ['install-git']),
+    'configure': (1, ['pip-packages', 'clone-repos', 'install-vs']),
+}
+
+
+def setup_plan():
+    return plan.parse({'steps': {
+        name: {'command': [name], 'after': after}
+        for name, (_, after) in SETUP.items()}})
+
+
+def test_parse():
+    steps = plan.parse({'jobs': 2, 'steps': {
+        'a': {'command': ['tool.exe', 'x y']},
+        'b': {'command': 'tool.exe "x y"', 'after': 'a'},
+        'c': {'command': ['tool.exe'], 'after': ['a', 'b']}}})
+    assert steps.names == ['a', 'b', 'c']
+    assert steps.commands == [['tool.exe', 'x y']] * 2 + [['tool.exe']]
+    assert steps.dependencies == [(), (0,), (0, 1)]
+    assert steps.jobs == 2
+
+
+def test_jobs_defaults_to_every_step():
+    assert setup_plan().jobs == len(SETUP)
+
+
+@pytest.mark.parametrize('document', [
+    [],
+    {'steps': []},
+    {'steps': {}},
+    {'steps': {'a': 'x'}},
+    {'steps': {'a': {'after': []}}},
+    {'steps': {'a': {'command': []}}},
+    {'steps': {'a': {'command': ['x', 1]}}},
+    {'steps': {'a': {'command': 'x', 'after': ['c']}}},
+    {'steps': {'a': {'command': 'x', 'after': ['b']},
+               'b': {'command': 'x', 'after': ['a']}}},
+    {'steps': {'a': {'command': 'x', 'after': ['a']}}},
+    {'steps': {'a': {'command': 'x', 'after': 5}}},
+    {'steps': {'a': {'command': 'x', 'after': [['b']]},
+               'b': {'command': 'x'}}},
+    {'steps': {'a': {'command': 'x', 'after': {'b': 1}},
+               'b': {'command': 'x'}}},
+    {'jobs': 0, 'steps': {'a': {'command': 'x'}}},
+    {'jobs': 1.5, 'steps': {'a': {'command': 'x'}}},
+    {'jobs': True, 'steps': {'a': {'command': 'x'}}},
+    {'jobs': '2', 'steps': {'a': {'command': 'x'}}},
+])
+def test_malformed_plans_are_refused(document):
+    with pytest.raises(plan.PlanError):
+        plan.parse(document)
+
+
+def test_error_names_the_step():
+    with pytest.raises(plan.PlanError, match="'install'"):
+        plan.parse({'steps': {'install': {'command': 'x', 'after': 5}}})
+
+
+def test_load_refuses_invalid_json():
+    with pytest.raises(plan.PlanError):
+        plan.load(io.StringIO('{"steps":'))
+
+
+def run_steps(steps, failing=()):
+    stream = io.BytesIO()
+    channel = protocol.Channel(stream)
+
+    def run_command(argv):
+        return (1 if argv[0] in failing else 0), b'', None
+
+    batch.run(channel, protocol.Batch(steps.commands, steps.jobs,
+                                      steps.dependencies), run_command)
+    protocol.send_done(channel)
+    stream.seek(0)
+    return list(protocol.receive_results(channel))
+
+
+def test_failed_step_skips_only_its_dependents():
+    steps = setup_plan()
+    outcome = {steps.names[result.index]: result
+               for result in run_steps(steps, failing={'install-git'})}
+    assert len(outcome) == len(SETUP)
+    assert {name for name, result in outcome.items()
+            if result.skipped} == {'clone-repos', 'configure'}
+    assert outcome['install-git'].exit_code == 1
+    assert all(batch.succeeded(result) for name, result in outcome.items()
+               if name not in {'clone-repos', 'configure', 'install-git'})
+
+
+def test_critical_path():
+    steps = setup_plan()
+    results = [protocol.Result(index, 0, SETUP[name][0], b'')
+               for index, name in enumerate(steps.names)]
+    assert plan.critical_path(steps, results) == (
+        15, ['fetch-vs', 'install-vs', 'configure'])
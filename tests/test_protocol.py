@@ -0,0 +1,173 @@
+import io
+import socket
+import threading
+
+import pytest
+
+from elevate import environment, protocol
+from elevate.environment import EnvironmentBlock, serialize
+
+
+def loopback():
+    """A channel whose reads return what was written to it."""
+    stream = io.BytesIO()
+    channel = protocol.Channel(stream)
+
+    def rewind():
+        stream.seek(0)
+        return channel
+    return channel, rewind
+
+
+def test_request_round_trip():
+    request = protocol.Request(
+        process_id=1234, process_start_time=132000000000000000,
+        std_handles=(0x10, None, 0x18),
+        command=['C:\\Python\\python.exe', '', 'a b', '\u00e9\U0001F600'],
+        spill='response-file',
+        environment_overrides={'FOO': '1', 'BAR': None, 'EMPTY': ''},
+        relay=True)
+    channel, rewind = loopback()
+    protocol.send_request(channel, request)
+    assert protocol.receive_request(rewind()) == request._replace(
+        std_handles=(0x10, 0, 0x18))
+
+
+def test_batch_request_round_trip():
+    batch = protocol.Batch([['a', '', 'b c', 'd"e'], ['x'] * 3, ['y']], 2,
+                           [(), (0,), (0, 1)])
+    request = protocol.Request(1, 2, (0, 0, 0), None, 'fail', {}, batch)
+    channel, rewind = loopback()
+    protocol.send_request(channel, request)
+    assert protocol.receive_request(rewind()) == request
+
+
+def test_results_round_trip():
+    results = [
+        protocol.Result(0, 3, 1.5, b'output', usage=protocol.Usage(
+            0.25, 0.125, 64 << 20)),
+        protocol.Result(1, None, 0.0, b'not found\n'),
+        protocol.Result(2, None, 0.0, b'', skipped=True),
+        protocol.Result(3, 0xC0000005, 0.0, b''),
+    ]
+    channel, rewind = loopback()
+    for result in results:
+        protocol.send_result(channel, result)
+    protocol.send_done(channel)
+    received = list(protocol.receive_results(rewind()))
+    assert [result._replace(output=bytes(result.output))
+            for result in received] == results
+
+
+def test_frames_from_another_version_are_refused():
+    channel, rewind = loopback()
+    channel.send(protocol.KIND_DONE)
+    channel.stream.getbuffer()[4] += 1
+    with pytest.raises(protocol.ProtocolError, match='version'):
+        rewind().receive()
+
+
+def test_unexpected_frames_are_refused():
+    channel, rewind = loopback()
+    channel.send(protocol.KIND_DONE)
+    with pytest.raises(protocol.ProtocolError):
+        rewind().receive(protocol.KIND_RESULT)
+
+
+def test_truncated_frames_are_refused():
+    channel, rewind = loopback()
+    channel.send(protocol.KIND_ENVIRONMENT, sections=[
+        (protocol.SECTION_ENVIRONMENT, b'x' * 100)])
+    channel.stream.truncate(channel.stream.tell() - 1)
+    with pytest.raises(protocol.ProtocolError, match='mid-frame'):
+        rewind().receive()
+
+
+def test_oversized_frames_are_refused_before_reading_them():
+    channel, rewind = loopback()
+    channel.send(protocol.KIND_ENVIRONMENT, sections=[
+        (protocol.SECTION_ENVIRONMENT, b'x' * 100)])
+    channel = protocol.Channel(channel.stream, max_frame_size=99)
+    channel.stream.seek(0)
+    with pytest.raises(protocol.ProtocolError, match='exceeds'):
+        channel.receive()
+    # Only the header was read.
+    assert channel.stream.tell() == protocol._HEADER.size
+
+
+def test_frame_size_limit_covers_forged_headers():
+    stream = io.BytesIO(protocol._HEADER.pack(
+        protocol.MAGIC, protocol.VERSION, protocol.KIND_RESULT, 255,
+        0xFFFFFFFF, 0xFFFFFFFF))
+    with pytest.raises(protocol.ProtocolError, match='exceeds'):
+        protocol.Channel(stream).receive()
+
+
+class CountingStream:
+
+    """Counts the bytes written to a binary stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.written = 0
+
+    def write(self, data):
+        written = self.stream.write(data)
+        self.written += written
+        return written
+
+    def readinto(self, buffer):
+        return self.stream.readinto(buffer)
+
+    def close(self):
+        self.stream.close()
+
+
+def connected_channels():
+    parent, child = socket.socketpair()
+    channels = (protocol.Channel(CountingStream(parent.makefile(
+                    'rwb', buffering=0))),
+                protocol.Channel(child.makefile('rwb', buffering=0)))
+    parent.close()
+    child.close()
+    return channels
+
+
+def transfer(block, baseline, helper_baseline):
+    """Send |block| against |baseline| to a peer that knows
+    |helper_baseline|. Returns what the peer rebuilt and the bytes sent."""
+    client, helper = connected_channels()
+    received = []
+    thread = threading.Thread(target=lambda: received.append(
+        protocol.receive_environment(helper, [helper_baseline])))
+    thread.start()
+    with client, helper:
+        protocol.send_environment(client, block, baseline)
+        thread.join()
+    return received[0], client.stream.written
+
+
+def environments():
+    base = [('PATH', ';'.join('C:\\Tools\\tool{}\\bin'.format(i)
+                              for i in range(100)))]
+    base += [('VARIABLE_{}'.format(i), 'value {}'.format(i))
+             for i in range(100)]
+    client = [('=C:', 'C:\\src'), ('PROMPT', '$P$G')] + base
+    client[2] = ('PATH', 'C:\\venv\\Scripts;' + base[0][1])
+    return (EnvironmentBlock(serialize(sorted(base))),
+            EnvironmentBlock(serialize(sorted(client))))
+
+
+def test_environment_sent_as_delta():
+    baseline, block = environments()
+    received, sent = transfer(block, baseline, baseline)
+    assert received == environment.build(block)
+    assert sent < len(block.buffer) // 2
+
+
+def test_environment_sent_whole_without_a_common_baseline():
+    baseline, block = environments()
+    other = EnvironmentBlock(serialize([('OTHER', '1')]))
+    received, sent = transfer(block, baseline, other)
+    assert received == environment.build(block)
+    assert sent > len(block.buffer)
@@ -0,0 +1,92 @@
+import io
+import random
+import socket
+import threading
+
+import pytest
+
+from elevate import protocol, relay
+
+MIB = 1 << 20
+
+
+class Sink:
+
+    """A binary file object that keeps what's written to it."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = threading.Event()
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+    def close(self):
+        self.closed.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run(stdout, stderr, stdin, buffer_size):
+    """Relay a command's streams: the command writes |stdout| and |stderr|,
+    and the client sends |stdin|. Returns what the client wrote out, what
+    the command read and the client's relay."""
+    parent, child = socket.socketpair()
+    command_stdin = Sink()
+
+    def helper():
+        with protocol.Channel(child.makefile('rwb', buffering=0)) as channel:
+            streams = relay.HelperRelay(
+                channel, command_stdin, io.BytesIO(stdout),
+                io.BytesIO(stderr), buffer_size)
+            streams.start()
+            streams.join()
+            protocol.send_done(channel)
+            # Keep the channel open until the command's input is in.
+            command_stdin.closed.wait(10)
+
+    thread = threading.Thread(target=helper)
+    thread.start()
+    client_stdout, client_stderr = Sink(), Sink()
+    with protocol.Channel(parent.makefile('rwb', buffering=0)) as channel:
+        client = relay.ClientRelay(channel, io.BytesIO(stdin), client_stdout,
+                                   client_stderr, buffer_size)
+        client.start()
+        assert list(protocol.receive_results(channel, client.on_stream)) == []
+        client.pump.join()
+        thread.join()
+    parent.close()
+    child.close()
+    return client_stdout.data, client_stderr.data, command_stdin.data, client
+
+
+@pytest.mark.parametrize('buffer_size', [4096, MIB])
+@pytest.mark.parametrize('sizes', [
+    (3 * MIB + 1, MIB + 3, 2 * MIB + 11),
+    (0, 0, 0),
+    (1, 0, 7),
+])
+def test_streams_arrive_intact(sizes, buffer_size):
+    rng = random.Random(sum(sizes))
+    stdout, stderr, stdin = (rng.randbytes(size) for size in sizes)
+    received = run(stdout, stderr, stdin, buffer_size)
+    assert received[:3] == (stdout, stderr, stdin)
+    client = received[3]
+    assert client.output_counts == {protocol.STREAM_STDOUT: len(stdout),
+                                    protocol.STREAM_STDERR: len(stderr)}
+    assert client.pump.count == len(stdin)
+
+
+def test_pump_stops_quietly_when_the_sink_fails():
+    def sink(data):
+        raise BrokenPipeError()
+
+    pump = relay.Pump('stdout', io.BytesIO(b'data'), sink)
+    pump.run()
+    assert isinstance(pump.error, BrokenPipeError)
+    assert pump.count == 0
@@ -0,0 +1,153 @@
+import ntpath
+
+import pytest
+
+from elevate import unc_prefixes
+
+# sizeof(UNIVERSAL_NAME_INFO) on 64-bit Windows.
+INFO_SIZE = 8
+
+SHARE = r'\\server\share'
+SESSION = 'S-1-5-5-0-1'
+
+
+class FakeRedirector:
+
+    """WNetGetUniversalName() over |mappings|, {drive: share}, as
+    utilities.unc_name_for_path() calls it."""
+
+    def __init__(self, mappings):
+        self.mappings = mappings
+        self.calls = 0
+        self.error = None
+
+    def _call(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+
+    def __call__(self, path, buffer_size=0):
+        self._call()
+        drive, rest = ntpath.splitdrive(path)
+        share = self.mappings.get(drive.upper())
+        if share is None:
+            return None, buffer_size
+        name = share + rest
+        needed = INFO_SIZE + 2 * (len(name) + 1)
+        if buffer_size < needed:
+            # ERROR_MORE_DATA, then again with the size it asked for.
+            self._call()
+            buffer_size = needed
+        return name, buffer_size
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def redirector():
+    return FakeRedirector({'Z:': SHARE})
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def prefixes(redirector, clock):
+    return unc_prefixes.UncPrefixes(redirector, SESSION, ttl=60, clock=clock)
+
+
+def test_translate(prefixes, redirector):
+    assert prefixes.translate(r'Z:\tools\elevate.py') == (
+        SHARE + r'\tools\elevate.py')
+    assert prefixes.translate(r'z:\other\script.py') == (
+        SHARE + r'\other\script.py')
+    assert prefixes.translate('Z:\\') == SHARE + '\\'
+    assert redirector.calls == 1
+
+    # Local drives are remembered too.
+    assert prefixes.translate(r'C:\tools\elevate.py') == (
+        r'C:\tools\elevate.py')
+    assert prefixes.translate(r'C:\elsewhere.py') == r'C:\elsewhere.py'
+    assert redirector.calls == 2
+
+    for path in (r'\\server\share\elevate.py', 'elevate.py',
+                 r'\\?\Z:\elevate.py'):
+        assert prefixes.translate(path) == path
+    assert redirector.calls == 2
+
+
+def test_answers_expire(prefixes, redirector, clock):
+    prefixes.translate(r'Z:\a')
+    # Drives can be remapped.
+    redirector.mappings = {'Z:': r'\\other\share', 'C:': r'\\server\c'}
+    clock.now += 59
+    assert prefixes.translate(r'Z:\a') == SHARE + r'\a'
+    clock.now += 2
+    assert prefixes.translate(r'Z:\a') == r'\\other\share\a'
+    assert prefixes.translate(r'C:\a') == r'\\server\c\a'
+    calls = redirector.calls
+    clock.now -= 3600
+    assert prefixes.translate(r'Z:\a') == r'\\other\share\a'
+    # Answers from the future aren't trusted either.
+    assert redirector.calls == calls + 1
+
+
+def test_errors_are_not_remembered(prefixes, redirector):
+    # Only "not a network drive" is an answer.
+    redirector.error = OSError('the redirector is unwell')
+    with pytest.raises(OSError):
+        prefixes.translate(r'Z:\a')
+    redirector.error = None
+    assert prefixes.translate(r'Z:\a') == SHARE + r'\a'
+
+
+def test_buffer_is_sized_as_the_last_lookup_needed(prefixes, redirector,
+                                                   clock):
+    # A long share name takes two calls the first time, then one.
+    redirector.mappings['Y:'] = r'\\server\{}'.format('x' * 600)
+    prefixes.translate(r'Y:\a')
+    assert redirector.calls == 2
+    clock.now += 61
+    prefixes.translate(r'Y:\a')
+    assert redirector.calls == 3
+
+
+def test_save_and_load(prefixes, redirector, clock, tmp_path):
+    long_share = r'\\server\{}'.format('x' * 600)
+    redirector.mappings.update({'Y:': long_share, 'X:': long_share[:-1]})
+    prefixes.translate(r'Z:\a')
+    prefixes.translate(r'Y:\a')
+    cache_path = str(tmp_path / 'unc-prefixes.json')
+    prefixes.save(cache_path)
+
+    calls = redirector.calls
+    loaded = unc_prefixes.UncPrefixes.load(cache_path, redirector, SESSION,
+                                           ttl=60, clock=clock)
+    assert loaded.translate(r'Z:\b') == SHARE + r'\b'
+    assert loaded.translate(r'Y:\b') == long_share + r'\b'
+    assert redirector.calls == calls
+    # The buffer size is remembered too.
+    loaded.translate(r'X:\b')
+    assert redirector.calls == calls + 1
+
+    # Another logon session has its own drive mappings.
+    other = unc_prefixes.UncPrefixes.load(cache_path, redirector,
+                                          'S-1-5-5-0-2', ttl=60, clock=clock)
+    assert other.drives == {}
+
+
+def test_corrupt_file_is_ignored(redirector, clock, tmp_path):
+    cache_path = tmp_path / 'unc-prefixes.json'
+    cache_path.write_text('{"version": 1, "session"')
+    loaded = unc_prefixes.UncPrefixes.load(str(cache_path), redirector,
+                                           SESSION, ttl=60, clock=clock)
+    assert loaded.drives == {}
@@ -0,0 +1,153 @@
+"""Generate elevate/_bindings.py from the Win32Func()/CFunc() declarations
+in elevate/win32.py and elevate/libc.py.
+
+The declarations are the spec: this script reads them with the ast module
+(so it doesn't need Windows), runs each argument descriptor list through
+ctypes_utils._param_flags(), and writes the resulting paramflags out as
+literals, along with the descriptors they were computed from (less their
+types). At import time ctypes_utils then looks them up instead of rebuilding
+them for every binding, provided the binding's descriptors still match.
+
+Rerun it whenever a binding's arguments change; --check exits with an error
+if elevate/_bindings.py is out of date.
+
+Usage: python tools/gen_bindings.py [--check]
+"""
+import argparse
+import ast
+import os
+import sys
+
+here = os.path.abspath(os.path.dirname(__file__))
+package = os.path.join(here, os.pardir, 'elevate')
+sys.path.insert(0, os.path.join(here, os.pardir))
+
+from elevate import ctypes_utils  # noqa: E402
+
+SOURCES = ('win32.py', 'libc.py')
+OUTPUT = os.path.join(package, '_bindings.py')
+
+BINDING_FACTORIES = ('Win32Func', 'Win32OLEFunc', 'CFunc')
+
+
+class _Source:
+
+    """An expression we can't (or needn't) evaluate; reprs as its source."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return self.text
+
+
+def _descriptor_element(node, names):
+    if isinstance(node, ast.Name):
+        if node.id == 'INPUT_PARAM':
+            return ctypes_utils.INPUT_PARAM
+        if node.id == 'OUTPUT_PARAM':
+            return ctypes_utils.OUTPUT_PARAM
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        names.update(n.id for n in ast.walk(node) if isinstance(n, ast.Name))
+        return _Source(ast.unparse(node))
+
+
+def _descriptor(node, names):
+    if not isinstance(node, ast.Tuple):
+        return _Source(ast.unparse(node))
+    # (param_name, param_type, [value_kind]|[default_value]); the type
+    # doesn't contribute to paramflags.
+    name, _, *rest = node.elts
+    return (ast.literal_eval(name), _Source(ast.unparse(node.elts[1])),
+            *(_descriptor_element(elem, names) for elem in rest))
+
+
+def _signature_element(value, sentinels):
+    if value in (ctypes_utils.INPUT_PARAM, ctypes_utils.OUTPUT_PARAM):
+        sentinels.add(value.__name__)
+        return _Source(value.__name__)
+    return value
+
+
+def collect_param_flags(path, names, sentinels):
+    """Yield ((module_name, function_name), (signature, paramflags)) for each
+    binding declared in |path|, adding any constants they refer to to
+    |names| and any of INPUT_PARAM and OUTPUT_PARAM to |sentinels|.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id in BINDING_FACTORIES):
+            continue
+        function_name, module_name, _, descriptors = node.args[:4]
+        key = (ast.literal_eval(module_name),
+               ast.literal_eval(function_name))
+        descriptors = [_descriptor(elem, names) for elem in descriptors.elts]
+        signature = tuple(
+            tuple(_signature_element(value, sentinels)
+                  for value in descriptor)
+            for descriptor in ctypes_utils._descriptor_signature(descriptors))
+        yield key, (signature, ctypes_utils._param_flags(descriptors))
+
+
+def generate():
+    names = set()
+    sentinels = set()
+    entries = []
+    for source in SOURCES:
+        entries.extend(collect_param_flags(os.path.join(package, source),
+                                           names, sentinels))
+
+    lines = [
+        '# Generated by tools/gen_bindings.py from {}. Do not edit.'.format(
+            ', '.join(SOURCES)),
+    ]
+    if names:
+        lines.append('from ._constants import {}'.format(
+            ', '.join(sorted(names))))
+    if sentinels:
+        lines.append('from .ctypes_utils import {}'.format(
+            ', '.join(sorted(sentinels))))
+    lines += [
+        '',
+        '# (module_name, function_name):',
+        '#     (descriptors less their types, paramflags)',
+        'PARAM_FLAGS = {',
+    ]
+    for key, (signature, flags) in entries:
+        lines.append('    {!r}: ('.format(key))
+        for part in (signature, flags):
+            lines.append('        (')
+            lines.extend('            {!r},'.format(elem) for elem in part)
+            lines.append('        ),')
+        lines.append('    ),')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--check', action='store_true',
+                        help="fail if {} is out of date".format(OUTPUT))
+    args = parser.parse_args()
+
+    generated = generate()
+    if args.check:
+        with open(OUTPUT) as f:
+            if f.read() != generated:
+                sys.exit('{} is out of date; rerun {}'.format(
+                    os.path.normpath(OUTPUT), sys.argv[0]))
+        return
+
+    with open(OUTPUT, 'w') as f:
+        f.write(generated)
+    print('wrote {}'.format(os.path.normpath(OUTPUT)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
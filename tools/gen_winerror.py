@@ -0,0 +1,157 @@
+"""Generate elevate/_winerror.bin and elevate/_winerror_messages.bin from
+tools/winerror.py.
+
+winerror.py is a straight transliteration of the SDK's winerror.h and defines
+some 6,000 constants. Rather than executing it every time elevate starts, we
+pack the constants into a sorted table that elevate._winerror reads on demand.
+
+_winerror.bin layout (all integers little-endian):
+
+    magic       4s      b'WERR'
+    count       u32     number of constants
+    values      u32 * count
+    offsets     u32 * (count + 1)    into the names blob
+    names       ascii, sorted, concatenated
+
+The "MessageId:"/"MessageText:" comment blocks are packed into
+_winerror_messages.bin, which elevate.error_messages memory-maps:
+
+    magic       4s      b'WMSG'
+    count       u32     number of entries
+    slot_bits   u32     each hash table has 2 ** slot_bits slots
+    entries     (code, name_offset, name_length,
+                 text_offset, text_length) u32 * 5 * count
+    code_slots  u32 * 2 ** slot_bits    entry index + 1, or 0 if empty
+    name_slots  u32 * 2 ** slot_bits    entry index + 1, or 0 if empty
+    strings     utf-8
+
+Both hash tables use linear probing; see elevate.error_messages for the hash
+functions.
+
+Usage: python tools/gen_winerror.py
+"""
+import os
+import re
+import struct
+import sys
+import zlib
+
+here = os.path.abspath(os.path.dirname(__file__))
+SOURCE = os.path.join(here, 'winerror.py')
+OUTPUT = os.path.join(here, os.pardir, 'elevate', '_winerror.bin')
+MESSAGES_OUTPUT = os.path.join(
+    here, os.pardir, 'elevate', '_winerror_messages.bin')
+
+MAGIC = b'WERR'
+MESSAGES_MAGIC = b'WMSG'
+
+_MESSAGE_BLOCK = re.compile(
+    r'^# MessageId: (\w+)\s*\n#\s*\n'
+    r'# MessageText:\s*\n((?:#.*\n)*?)(\w+)\s*=\s*(\w+)',
+    re.MULTILINE)
+
+
+def load_constants(path=SOURCE):
+    namespace = {}
+    with open(path) as f:
+        exec(compile(f.read(), path, 'exec'), namespace)
+    return {name: value for name, value in namespace.items()
+            if not name.startswith('__')}
+
+
+def pack_table(constants):
+    names = sorted(name.encode('ascii') for name in constants)
+
+    offsets = [0]
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+
+    return b''.join((
+        struct.pack('<4sI', MAGIC, len(names)),
+        struct.pack('<{}I'.format(len(names)),
+                    *(constants[name.decode('ascii')] for name in names)),
+        struct.pack('<{}I'.format(len(offsets)), *offsets),
+        b''.join(names)))
+
+
+def load_messages(constants, path=SOURCE):
+    """Return [(code, name, text)] for each MessageId block, in file order."""
+    with open(path) as f:
+        source = f.read()
+
+    messages = []
+    for match in _MESSAGE_BLOCK.finditer(source):
+        name, body, assigned_name, value = match.groups()
+        # A handful of blocks were mangled in translation (e.g. "CO_E_OLE = 1"
+        # under "MessageId: CO_E_OLE1DDE_DISABLED"); their values can't be
+        # trusted, so leave them out.
+        if name != assigned_name:
+            continue
+        lines = [line[1:].strip() for line in body.splitlines()]
+        text = '\n'.join(lines).strip()
+        # Use the value from the block itself rather than constants[name]:
+        # winerror.h's non-WIN32 "#else" branches redefine a few names.
+        code = constants[value] if value in constants else int(value, 0)
+        messages.append((code, name, text))
+    return messages
+
+
+def code_hash(code, slot_bits):
+    return ((code * 0x9E3779B1) & 0xFFFFFFFF) >> (32 - slot_bits)
+
+
+def name_hash(name, slot_bits):
+    return zlib.crc32(name) & ((1 << slot_bits) - 1)
+
+
+def _insert(slots, start, index):
+    mask = len(slots) - 1
+    slot = start
+    while slots[slot]:
+        slot = (slot + 1) & mask
+    slots[slot] = index + 1
+
+
+def pack_messages(messages):
+    slot_bits = max(1, (2 * len(messages) - 1).bit_length())
+    code_slots = [0] * (1 << slot_bits)
+    name_slots = [0] * (1 << slot_bits)
+
+    entries = []
+    strings = bytearray()
+    seen_codes = set()
+    for index, (code, name, text) in enumerate(messages):
+        name, text = name.encode('ascii'), text.encode('utf-8')
+        entries.extend((code, len(strings), len(name),
+                        len(strings) + len(name), len(text)))
+        strings += name + text
+
+        # Several facilities reuse the same code; the first one wins.
+        if code not in seen_codes:
+            seen_codes.add(code)
+            _insert(code_slots, code_hash(code, slot_bits), index)
+        _insert(name_slots, name_hash(name, slot_bits), index)
+
+    return b''.join((
+        struct.pack('<4sII', MESSAGES_MAGIC, len(messages), slot_bits),
+        struct.pack('<{}I'.format(len(entries)), *entries),
+        struct.pack('<{}I'.format(len(code_slots)), *code_slots),
+        struct.pack('<{}I'.format(len(name_slots)), *name_slots),
+        bytes(strings)))
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    print('wrote {} ({} bytes)'.format(os.path.normpath(path), len(data)),
+          file=sys.stderr)
+
+
+def main():
+    constants = load_constants()
+    _write(OUTPUT, pack_table(constants))
+    _write(MESSAGES_OUTPUT, pack_messages(load_messages(constants)))
+
+
+if __name__ == '__main__':
+    main()